@@ -9,6 +9,7 @@ from sqlmodel import SQLModel
 import app.core.models  # noqa: F401  # pyright: ignore[reportMissingTypeStubs]
 from alembic import context
 from app.core.config import settings
+from app.core.online_migration import configure_session
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -78,10 +79,18 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        # DDL 等待元数据锁时会阻塞其后的所有查询，超时后由 online_alter 退避重试
+        configure_session(
+            connection,
+            lock_wait_timeout=settings.MIGRATION_LOCK_WAIT_TIMEOUT,
+            statement_timeout=settings.MIGRATION_STATEMENT_TIMEOUT,
+        )
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
             compare_type=True,
+            # 每个迁移单独提交版本号，可以分阶段（expand / backfill / contract）升级
+            transaction_per_migration=True,
         )
 
         with context.begin_transaction():
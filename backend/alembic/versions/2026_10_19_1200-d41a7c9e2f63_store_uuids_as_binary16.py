@@ -0,0 +1,97 @@
+"""store_uuids_as_binary16
+
+Revision ID: d41a7c9e2f63
+Revises: 8c3f6a1e7b52
+Create Date: 2026-10-19 12:00:07.215384
+
+把 `sa.Uuid()`（MySQL 上为 CHAR(32) 十六进制）列转换为 BINARY(16)。
+
+每列的转换步骤：
+1. 新增可空的 BINARY(16) 列；
+2. 按主键分段（keyset）批量回填 UNHEX(旧列)，每批单独提交，不产生长事务与大范围锁；
+3. 一条 ALTER 语句删除旧列、把新列改名为原列名并恢复主键 / 唯一约束。
+
+第 3 步会重建表，对大表应在低峰期执行（或借助 gh-ost / pt-online-schema-change）。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41a7c9e2f63'
+down_revision: Union[str, Sequence[str], None] = '8c3f6a1e7b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10_000
+
+# (表, 列, 该列参与的唯一约束: (名称, 列...))
+_COLUMNS: list[tuple[str, str, tuple[str, ...] | None]] = [
+    ('user', 'id', None),
+    ('agent_thread', 'id', None),
+    ('llm_usage', 'id', None),
+    ('llm_usage', 'user_id', ('uk_llm_usage_user_model_date', 'user_id', 'model', 'usage_date')),
+]
+
+
+def _backfill(table: str, target: str, expression: str) -> None:
+    """按主键顺序分批执行 `target = expression`，每条语句自动提交"""
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        last = None
+        while True:
+            # 本批的主键上界；主键按字节序比较，分段不重不漏
+            after = 'WHERE id > :last' if last is not None else ''
+            upper = bind.execute(
+                sa.text(f'SELECT id FROM `{table}` {after} ORDER BY id LIMIT 1 OFFSET :offset'),
+                {'last': last, 'offset': BATCH_SIZE - 1},
+            ).scalar()
+            conditions = ['id > :last'] if last is not None else []
+            if upper is not None:
+                conditions.append('id <= :upper')
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+            bind.execute(
+                sa.text(f'UPDATE `{table}` SET `{target}` = {expression} {where}'),
+                {'last': last, 'upper': upper},
+            )
+            if upper is None:
+                return
+            last = upper
+
+
+def _swap(table: str, column: str, new_type: str, expression: str, unique: tuple[str, ...] | None) -> None:
+    tmp = f'{column}_new'
+    op.execute(f'ALTER TABLE `{table}` ADD COLUMN `{tmp}` {new_type} NULL')
+    _backfill(table, tmp, expression.format(column=f'`{column}`'))
+
+    clauses = []
+    if unique is not None:
+        clauses.append(f'DROP INDEX `{unique[0]}`')
+    if column == 'id':
+        clauses.append('DROP PRIMARY KEY')
+    clauses += [
+        f'DROP COLUMN `{column}`',
+        f'CHANGE COLUMN `{tmp}` `{column}` {new_type} NOT NULL FIRST'
+        if column == 'id'
+        else f'CHANGE COLUMN `{tmp}` `{column}` {new_type} NOT NULL',
+    ]
+    if column == 'id':
+        clauses.append('ADD PRIMARY KEY (`id`)')
+    if unique is not None:
+        columns = ', '.join(f'`{c}`' for c in unique[1:])
+        clauses.append(f'ADD CONSTRAINT `{unique[0]}` UNIQUE ({columns})')
+    op.execute(f"ALTER TABLE `{table}` {', '.join(clauses)}")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column, unique in _COLUMNS:
+        _swap(table, column, 'BINARY(16)', 'UNHEX({column})', unique)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column, unique in reversed(_COLUMNS):
+        _swap(table, column, 'CHAR(32)', 'LOWER(HEX({column}))', unique)
@@ -4,7 +4,7 @@ from typing import Annotated
 from fastapi import Depends
 from sqlmodel import Session
 
-from app.core.db import SessionLocal
+from app.core.db import ReadSessionLocal, SessionLocal
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -12,4 +12,11 @@ def get_db() -> Generator[Session, None, None]:
         yield session
 
 
+def get_read_db() -> Generator[Session, None, None]:
+    """只读路由使用：autocommit 连接，不开启事务，写入会抛出 ReadOnlySessionError"""
+    with ReadSessionLocal() as session:
+        yield session
+
+
 SessionDep = Annotated[Session, Depends(get_db)]
+ReadSessionDep = Annotated[Session, Depends(get_read_db)]
@@ -3,8 +3,15 @@ from http import HTTPStatus
 from fastapi import HTTPException, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
-
-from app.api.schemas.error import APIErrorType, APIException, APIExceptionResponse
+from sqlalchemy.exc import OperationalError
+
+from app.api.schemas.error import (
+    APIErrorType,
+    APIException,
+    APIExceptionResponse,
+    DeadlineExceededError,
+)
+from app.core.deadline import is_query_timeout
 from app.core.logger import logger
 
 
@@ -36,6 +43,10 @@ async def general_exception_handler(request: Request, exc: Exception) -> JSONRes
     if isinstance(exc, HTTPException):
         return APIExceptionResponse(APIException.from_http_exception(exc))
 
+    # MySQL 按 MAX_EXECUTION_TIME 中断了查询：请求预算已耗尽
+    if isinstance(exc, OperationalError) and is_query_timeout(exc):
+        return APIExceptionResponse(DeadlineExceededError())
+
     # 对于未捕获的未知异常，如果是调试模式，则抛出异常，让 FastAPI 显示详细的堆栈信息页面
     if request.app.debug:
         raise exc
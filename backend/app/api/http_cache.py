@@ -0,0 +1,78 @@
+"""
+HTTP 条件请求与缓存策略
+
+读接口根据资源的 id 与 updated_at 生成弱 ETag。请求的 `If-None-Match` 命中时直接返回
+304（不做响应模型序列化），否则在响应上设置 ETag 与该路由的 Cache-Control。
+
+MySQL DATETIME 只精确到秒，同一秒内的两次更新 updated_at 相同，因此调用方可以额外传入
+会出现在响应中的字段值一起参与计算。
+"""
+
+import hashlib
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Any
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """单个路由的 Cache-Control 策略"""
+
+    # 共享缓存（CDN / 代理）是否可以缓存
+    public: bool = False
+    # 客户端无需重新验证即可直接使用的秒数；0 表示每次都用 ETag 重新验证
+    max_age: int = 0
+    no_store: bool = False
+
+    @property
+    def header(self) -> str:
+        if self.no_store:
+            return "no-store"
+        directives = ["public" if self.public else "private"]
+        if self.max_age > 0:
+            directives.append(f"max-age={self.max_age}")
+        else:
+            directives.append("no-cache")
+        return ", ".join(directives)
+
+
+# 每次请求都向服务端验证，命中时只返回 304
+REVALIDATE = CachePolicy()
+
+
+def weak_etag(*parts: Any) -> str:
+    digest = hashlib.blake2b(
+        "\x1f".join(str(part) for part in parts).encode(), digest_size=12
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """按弱比较规则判断 If-None-Match 是否命中"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(request: Request, etag: str, policy: CachePolicy) -> Response | None:
+    """If-None-Match 命中时返回 304 响应，否则返回 None"""
+    if not etag_matches(request.headers.get("if-none-match"), etag):
+        return None
+    return Response(
+        status_code=HTTPStatus.NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": policy.header},
+    )
+
+
+def set_cache_headers(response: Response, etag: str, policy: CachePolicy) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = policy.header
@@ -1,9 +1,16 @@
 from fastapi import APIRouter
 
 from app.api.routes.auth.router import router as auth_router
+from app.api.routes.batch.router import router as batch_router
+from app.api.routes.metrics.router import router as metrics_router
 from app.api.routes.user.router import router as user_router
+from app.core.config import settings
 
 api_router = APIRouter()
 
 api_router.include_router(auth_router)
 api_router.include_router(user_router)
+api_router.include_router(batch_router)
+
+if settings.METRICS_ENABLED:
+    api_router.include_router(metrics_router)
@@ -1,4 +1,5 @@
+from .idempotency import IdempotencyMiddleware
 from .logging import LoggingMiddleware
 from .request_id import RequestIDMiddleware
 
-__all__ = ["LoggingMiddleware", "RequestIDMiddleware"]
+__all__ = ["IdempotencyMiddleware", "LoggingMiddleware", "RequestIDMiddleware"]
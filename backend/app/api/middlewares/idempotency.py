@@ -0,0 +1,309 @@
+"""
+Idempotency-Key 中间件
+
+带 `Idempotency-Key` 请求头的 POST / PATCH 请求，第一次完成时保存响应（状态码、响应头、
+响应体），之后同一个 key 的重试直接返回保存的响应，不再重复执行 argon2 与数据库写入：
+
+- 原请求仍在执行时，重复请求等待其完成后复用结果，而不是并发再执行一次
+- 同一个 key 搭配不同的请求（方法、路径、查询参数、请求体）返回 422
+- 5xx、408、429 以及流式响应不保存，客户端可以用同一个 key 重试
+- 可以按路径注册回放前的校验（`replay_checks`）：例如登录接口保存的令牌在回放前确认
+  仍未吊销，校验不通过时丢弃保存的响应并重新执行
+
+key 按请求方法、路径与 Authorization 头隔离，不同用户使用相同 key 互不影响。
+默认存储是每个 worker 内存中的 LRU + TTL；多 worker / 多实例部署可以实现
+`IdempotencyStore` 接入共享存储。
+"""
+
+import asyncio
+import hashlib
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable, Mapping
+from dataclasses import dataclass, field
+from http import HTTPStatus
+
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.types import ASGIApp
+
+from app.api.schemas.error import APIErrorType, APIException, APIExceptionResponse
+from app.core.config import settings
+from app.core.metrics import counter
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+IDEMPOTENT_METHODS = frozenset({"POST", "PATCH"})
+MAX_KEY_LENGTH = 255
+
+# 这些状态码表示暂时性失败，重试应当重新执行
+_UNSTORED_STATUS = frozenset({HTTPStatus.REQUEST_TIMEOUT, HTTPStatus.TOO_MANY_REQUESTS})
+# 由外层中间件按每次请求生成的响应头，不随保存的响应回放
+_PER_REQUEST_HEADERS = frozenset({b"x-request-id", b"x-process-time"})
+
+_idempotency_requests = counter(
+    "idempotency_requests_total",
+    "Requests carrying an Idempotency-Key, by outcome.",
+    ["outcome"],
+)
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    status_code: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+# 回放保存的响应之前调用，返回 False 时丢弃该响应并重新执行请求
+ReplayCheck = Callable[[StoredResponse], Awaitable[bool]]
+
+
+@dataclass(frozen=True)
+class Reservation:
+    """`IdempotencyStore.reserve` 的结果
+
+    - acquired 为 True：当前请求获得执行权，完成后必须调用 complete 或 release
+    - 否则 fingerprint 为已有请求的指纹；response 为空表示原请求仍在执行
+    """
+
+    acquired: bool
+    fingerprint: str | None = None
+    response: StoredResponse | None = None
+
+
+class IdempotencyStore(ABC):
+    """幂等响应存储接口，共享存储（如 Redis）实现这 4 个方法即可接入"""
+
+    @abstractmethod
+    async def reserve(self, key: str, fingerprint: str) -> Reservation:
+        """原子地查询 key：不存在（或已过期）时占用并返回 acquired=True"""
+
+    @abstractmethod
+    async def complete(self, key: str, response: StoredResponse) -> None:
+        """保存原请求的响应，并唤醒等待者"""
+
+    @abstractmethod
+    async def release(self, key: str) -> None:
+        """放弃占用（原请求失败或响应不可保存），等待者将重新竞争执行权"""
+
+    async def wait(self, key: str, timeout: float) -> None:  # noqa: ARG002
+        """等待 key 完成或被放弃，最多 timeout 秒
+
+        默认实现短暂休眠后由调用方重新 reserve（轮询），内存实现使用事件通知。
+        """
+        await asyncio.sleep(min(timeout, 0.05))
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    expires_at: float | None = None
+    response: StoredResponse | None = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    """单个 worker 内的有界存储：按最近使用淘汰，完成后 ttl 秒过期"""
+
+    def __init__(self, *, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+    async def reserve(self, key: str, fingerprint: str) -> Reservation:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at is not None:
+            if entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return Reservation(
+                acquired=False, fingerprint=entry.fingerprint, response=entry.response
+            )
+
+        self._entries[key] = _Entry(fingerprint)
+        while len(self._entries) > self.maxsize:
+            _, evicted = self._entries.popitem(last=False)
+            # 被淘汰的进行中条目：唤醒等待者，让其重新竞争
+            evicted.done.set()
+        return Reservation(acquired=True)
+
+    async def complete(self, key: str, response: StoredResponse) -> None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry.response = response
+        entry.expires_at = time.monotonic() + self.ttl
+        entry.done.set()
+
+    async def release(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry.done.set()
+
+    async def wait(self, key: str, timeout: float) -> None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        try:
+            await asyncio.wait_for(entry.done.wait(), timeout)
+        except TimeoutError:
+            pass
+
+
+def _scoped_key(request: Request, key: str) -> str:
+    scope = "\n".join(
+        (
+            request.method,
+            request.url.path,
+            request.headers.get("authorization", ""),
+            key,
+        )
+    )
+    return hashlib.sha256(scope.encode()).hexdigest()
+
+
+def _fingerprint(request: Request, body: bytes) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.url.path}?{request.url.query}\n".encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def _replay(stored: StoredResponse, *, replayed: bool = True) -> Response:
+    response = Response(content=stored.body, status_code=stored.status_code)
+    headers = [(k, v) for k, v in response.raw_headers if k == b"content-length"]
+    headers += stored.headers
+    if replayed:
+        headers.append((REPLAYED_HEADER.lower().encode(), b"true"))
+    response.raw_headers = headers
+    return response
+
+
+def _error(status_code: HTTPStatus, detail: str, error_type: APIErrorType) -> Response:
+    return APIExceptionResponse(APIException(status_code, detail, error_type))
+
+
+class IdempotencyMiddleware(BaseHTTPMiddleware):
+    """
+    按 Idempotency-Key 请求头去重写请求的中间件
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: IdempotencyStore | None = None,
+        replay_checks: Mapping[str, ReplayCheck] | None = None,
+    ):
+        super().__init__(app)
+        self.store = store or InMemoryIdempotencyStore(
+            maxsize=settings.IDEMPOTENCY_CACHE_SIZE, ttl=settings.IDEMPOTENCY_TTL
+        )
+        # 按请求路径（完整匹配）注册的回放校验
+        self.replay_checks = dict(replay_checks or {})
+
+    async def dispatch(
+        self, request: Request, call_next: RequestResponseEndpoint
+    ) -> Response:
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None or request.method not in IDEMPOTENT_METHODS:
+            return await call_next(request)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return _error(
+                HTTPStatus.BAD_REQUEST,
+                f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters",
+                APIErrorType.HTTP_STATUS_ERROR,
+            )
+
+        # 请求体读取后会被 Starlette 缓存，下游仍可正常读取
+        fingerprint = _fingerprint(request, await request.body())
+        scoped_key = _scoped_key(request, key)
+        give_up_at = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        waited = False
+        while True:
+            reservation = await self.store.reserve(scoped_key, fingerprint)
+            if reservation.acquired:
+                break
+            if reservation.fingerprint != fingerprint:
+                _idempotency_requests.inc(outcome="mismatch")
+                return _error(
+                    HTTPStatus.UNPROCESSABLE_ENTITY,
+                    f"{IDEMPOTENCY_HEADER} was already used with a different request",
+                    APIErrorType.IDEMPOTENCY_KEY_REUSED,
+                )
+            if reservation.response is not None:
+                check = self.replay_checks.get(request.url.path)
+                if check is not None and not await check(reservation.response):
+                    _idempotency_requests.inc(outcome="stale")
+                    await self.store.release(scoped_key)
+                    continue
+                _idempotency_requests.inc(outcome="waited" if waited else "replayed")
+                return _replay(reservation.response)
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0:
+                _idempotency_requests.inc(outcome="in_progress")
+                return _error(
+                    HTTPStatus.CONFLICT,
+                    "A request with the same Idempotency-Key is still in progress",
+                    APIErrorType.IDEMPOTENCY_IN_PROGRESS,
+                )
+            waited = True
+            await self.store.wait(scoped_key, remaining)
+
+        _idempotency_requests.inc(outcome="executed")
+        completed = False
+        try:
+            response, stored = await self._capture(await call_next(request))
+            if stored is not None:
+                await self.store.complete(scoped_key, stored)
+                completed = True
+            return response
+        finally:
+            if not completed:
+                await self.store.release(scoped_key)
+
+    async def _capture(
+        self, response: Response
+    ) -> tuple[Response, StoredResponse | None]:
+        """读取可保存的响应体，返回要发给客户端的响应与要保存的内容（不可保存时为 None）"""
+        if (
+            response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+            or response.status_code in _UNSTORED_STATUS
+            or response.headers.get("content-type", "").startswith("text/event-stream")
+        ):
+            return response, None
+
+        limit = settings.IDEMPOTENCY_MAX_BODY_BYTES
+        chunks: list[bytes] = []
+        size = 0
+        body_iterator = response.body_iterator  # type: ignore[attr-defined]
+        async for chunk in body_iterator:
+            data = chunk if isinstance(chunk, bytes) else chunk.encode()
+            chunks.append(data)
+            size += len(data)
+            if size > limit:
+                # 响应体过大不保存：把已读出的部分与剩余部分拼回去继续发送
+                async def rest() -> AsyncIterator[bytes]:
+                    for data in chunks:
+                        yield data
+                    async for chunk in body_iterator:
+                        yield chunk
+
+                return StreamingResponse(
+                    rest(), status_code=response.status_code, headers=response.headers
+                ), None
+
+        stored = StoredResponse(
+            status_code=response.status_code,
+            headers=[
+                (name, value)
+                for name, value in response.raw_headers
+                if name not in _PER_REQUEST_HEADERS and name != b"content-length"
+            ],
+            body=b"".join(chunks),
+        )
+        return _replay(stored, replayed=False), stored
@@ -117,6 +117,7 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         logger.bind(
             req=request_payload,
             resp=response_payload,
+            duration_ms=round(process_time, 2),
         ).info(
             f"{request.method} {request.url.path}: {response.status_code} ({process_time:.2f}ms)"
         )
@@ -5,6 +5,15 @@ from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoin
 from starlette.requests import Request
 from starlette.responses import Response
 
+from app.api.schemas.error import APIExceptionResponse, DeadlineExceededError
+from app.core.config import settings
+from app.core.deadline import (
+    RequestDeadline,
+    bind_deadline,
+    parse_timeout_header,
+    reset_deadline,
+)
+
 
 class RequestIDMiddleware(BaseHTTPMiddleware):
     """
@@ -14,12 +23,33 @@ class RequestIDMiddleware(BaseHTTPMiddleware):
     async def dispatch(
         self, request: Request, call_next: RequestResponseEndpoint
     ) -> Response:
-        # 始终由服务端生成唯一的 request_id，不信任客户端传入的 header
-        request_id = str(uuid.uuid7())  # type: ignore[attr-defined]
+        # 始终由服务端生成唯一的 request_id，不信任客户端传入的 header；
+        # 批量请求的子请求在 state 中预先带有派生的 request_id
+        request_id = getattr(request.state, "request_id", None) or str(
+            uuid.uuid7()  # type: ignore[attr-defined]
+        )
         request.state.request_id = request_id
 
         # 使用 contextualize，使得该请求生命周期内的所有日志（包括框架日志）都能访问到 request_id
+        # 截止时间：请求头优先，否则使用全局默认值（路由可通过 route_timeout 收紧）
+        timeout = parse_timeout_header(
+            request.headers.get(settings.REQUEST_TIMEOUT_HEADER),
+            maximum=settings.REQUEST_TIMEOUT_MAX,
+        )
+        deadline = RequestDeadline(
+            timeout if timeout is not None else settings.REQUEST_TIMEOUT_DEFAULT,
+            explicit=timeout is not None,
+        )
+
         with logger.contextualize(req_id=request_id):
-            response = await call_next(request)
+            if deadline.expired:
+                # 客户端已经放弃的请求直接失败，不进入路由
+                response: Response = APIExceptionResponse(DeadlineExceededError())
+            else:
+                token = bind_deadline(deadline)
+                try:
+                    response = await call_next(request)
+                finally:
+                    reset_deadline(token)
             response.headers["X-Request-ID"] = request_id
             return response
@@ -9,6 +9,8 @@ from uuid import UUID, uuid7  # type: ignore[attr-defined]
 
 from sqlmodel import Field, SQLModel
 
+from app.core.types import BinaryUUID
+
 # 软删除使用的时间戳，表示"未删除"状态
 # 使用固定的值而不是NULL，以支持联合唯一索引
 SOFT_DELETE_DATETIME = datetime(1970, 1, 1, 0, 0, 0, tzinfo=UTC)
@@ -38,7 +40,13 @@ class BaseSQLModel(SQLModel):
 
 
 class BaseUUIDModel(BaseSQLModel):
-    id: UUID = Field(default_factory=uuid7, primary_key=True, description="主键ID")
+    # BINARY(16) 存储，uuid7 保证按时间递增写入聚簇索引
+    id: UUID = Field(
+        default_factory=uuid7,
+        primary_key=True,
+        sa_type=BinaryUUID,
+        description="主键ID",
+    )
 
 
 class SoftDeleteModel(BaseSQLModel):
@@ -0,0 +1,171 @@
+"""
+访问令牌签名密钥环
+
+未配置 `JWT_KEYS_DIR` 时沿用 HS256 + `SECRET_KEY`。配置后目录中每个 `<kid>.pem` 是一把密钥
+（Ed25519 → EdDSA，RSA → RS256），启动时解析一次并常驻内存：
+
+- `JWT_ACTIVE_KID` 指定的私钥用于签名，令牌头部带 kid
+- 其余密钥（私钥或只有公钥）只用于校验，即轮换中正在退役的密钥
+- 所有非对称公钥通过 JWKS 接口发布，其他服务据此在本地校验，无需回调本服务
+
+轮换步骤（不会使未过期的令牌失效）：
+
+1. 把新密钥放进目录并重启——此时只发布、不签名；等待至少 `JWKS_MAX_AGE` 秒，
+   让下游缓存的 JWKS 包含新公钥
+2. 把 `JWT_ACTIVE_KID` 改为新 kid 并重启
+3. 经过 `ACCESS_TOKEN_EXPIRE_MINUTES` 后删除旧密钥文件
+
+从 HS256 切换过来时，不带 kid 的旧令牌在 `JWT_ACCEPT_HS256` 为 True 期间仍用 `SECRET_KEY`
+校验；旧令牌全部过期后应将其关闭。
+
+校验通过的令牌按原文缓存（`JWT_VERIFIED_CACHE_SIZE`），同一令牌的后续请求只做一次字典查找
+与过期检查，非对称签名的校验开销只在首次出现时发生。
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from cryptography.hazmat.primitives.serialization import (
+    load_pem_private_key,
+    load_pem_public_key,
+)
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+from jwt.exceptions import InvalidTokenError
+
+from app.core.config import settings
+from app.core.logger import logger
+
+HS256 = "HS256"
+_MIN_RSA_BITS = 2048
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str | None
+    algorithm: str
+    # 只用于校验的密钥为 None
+    private_key: Any
+    public_key: Any
+
+    def jwk(self) -> dict[str, Any] | None:
+        """公钥的 JWK；HMAC 密钥不发布"""
+        if self.algorithm == HS256:
+            return None
+        to_jwk = (
+            OKPAlgorithm.to_jwk if self.algorithm == "EdDSA" else RSAAlgorithm.to_jwk
+        )
+        jwk = to_jwk(self.public_key, as_dict=True)
+        return {**jwk, "kid": self.kid, "alg": self.algorithm, "use": "sig"}
+
+
+def load_key(path: Path) -> SigningKey:
+    """解析 PEM 文件，kid 取文件名（不含扩展名）"""
+    data = path.read_bytes()
+    try:
+        private_key = load_pem_private_key(data, password=None)
+        public_key = private_key.public_key()
+    except ValueError:
+        private_key = None
+        public_key = load_pem_public_key(data)
+    if isinstance(public_key, ed25519.Ed25519PublicKey):
+        algorithm = "EdDSA"
+    elif isinstance(public_key, rsa.RSAPublicKey):
+        if public_key.key_size < _MIN_RSA_BITS:
+            raise ValueError(
+                f"RSA key {path.name} is shorter than {_MIN_RSA_BITS} bits"
+            )
+        algorithm = "RS256"
+    else:
+        raise ValueError(f"Unsupported key type in {path.name}, use Ed25519 or RSA")
+    return SigningKey(path.stem, algorithm, private_key, public_key)
+
+
+class Keyring:
+    def __init__(
+        self,
+        *,
+        secret: str,
+        keys_dir: Path | None = None,
+        active_kid: str | None = None,
+        accept_hs256: bool = True,
+        verified_cache_size: int = 10000,
+    ):
+        self.verified_cache_size = verified_cache_size
+        self._lock = threading.Lock()
+        self._verified: OrderedDict[str, dict[str, Any]] = OrderedDict()
+
+        hmac_key = SigningKey(None, HS256, secret, secret)
+        self.keys: dict[str, SigningKey] = {}
+        if keys_dir is not None:
+            for path in sorted(keys_dir.glob("*.pem")):
+                key = load_key(path)
+                self.keys[path.stem] = key
+        if active_kid is None:
+            self.active = hmac_key
+        else:
+            active = self.keys.get(active_kid)
+            if active is None or active.private_key is None:
+                raise ValueError(
+                    f"No private key for JWT_ACTIVE_KID {active_kid!r} in {keys_dir}"
+                )
+            self.active = active
+        # 不带 kid 的令牌（HS256 签发）
+        self._legacy = hmac_key if accept_hs256 or active_kid is None else None
+
+        jwks = [jwk for key in self.keys.values() if (jwk := key.jwk()) is not None]
+        self.jwks = json.dumps({"keys": jwks}, separators=(",", ":")).encode()
+
+    def sign(self, claims: dict[str, Any]) -> str:
+        key = self.active
+        headers = None if key.kid is None else {"kid": key.kid}
+        return jwt.encode(
+            claims, key.private_key, algorithm=key.algorithm, headers=headers
+        )
+
+    def verify(self, token: str) -> dict[str, Any]:
+        """校验签名与过期时间并返回载荷（不可修改），失败时抛出 `jwt.InvalidTokenError`"""
+        payload = self._verified.get(token)
+        if payload is not None:
+            if payload["exp"] > time.time():
+                return payload
+            with self._lock:
+                self._verified.pop(token, None)
+
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self._legacy if kid is None else self.keys.get(kid)
+        if key is None:
+            raise InvalidTokenError("Unknown signing key")
+        # 每把密钥只接受它自己的算法，避免算法混淆
+        payload = jwt.decode(token, key.public_key, algorithms=[key.algorithm])
+
+        if self.verified_cache_size and isinstance(payload.get("exp"), int | float):
+            with self._lock:
+                self._verified[token] = payload
+                while len(self._verified) > self.verified_cache_size:
+                    self._verified.popitem(last=False)
+        return payload
+
+
+def _build_keyring() -> Keyring:
+    keyring = Keyring(
+        secret=settings.SECRET_KEY,
+        keys_dir=Path(settings.JWT_KEYS_DIR) if settings.JWT_KEYS_DIR else None,
+        active_kid=settings.JWT_ACTIVE_KID,
+        accept_hs256=settings.JWT_ACCEPT_HS256,
+        verified_cache_size=settings.JWT_VERIFIED_CACHE_SIZE,
+    )
+    logger.info(
+        f"JWT keyring loaded: signing with {keyring.active.algorithm} "
+        f"(kid={keyring.active.kid}), {len(keyring.keys)} published keys"
+    )
+    return keyring
+
+
+keyring = _build_keyring()
@@ -0,0 +1,23 @@
+from datetime import datetime
+from uuid import UUID
+
+from sqlmodel import Field, Index, UniqueConstraint
+
+from app.api.models import BaseUUIDModel
+from app.core.types import BinaryUUID
+
+
+class RevokedToken(BaseUUIDModel, table=True):
+    """被单独吊销的访问令牌，令牌过期后该行即可删除"""
+
+    __tablename__ = "revoked_token"
+    __table_args__ = (
+        UniqueConstraint("jti", name="uk_revoked_token_jti"),
+        # 各 worker 按 created_at 增量加载新吊销的令牌
+        Index("ix_revoked_token_created_at", "created_at"),
+        Index("ix_revoked_token_expires_at", "expires_at"),
+    )
+
+    jti: str = Field(max_length=64, description="令牌ID（JWT jti）")
+    user_id: UUID = Field(sa_type=BinaryUUID, description="令牌所属用户ID")
+    expires_at: datetime = Field(description="令牌过期时间")
@@ -0,0 +1,186 @@
+"""
+访问令牌吊销
+
+两种吊销方式：
+
+- 单个令牌：按 jti 写入 `revoked_token`，行在令牌过期后删除
+- 某个用户在 T 之前签发的全部令牌：写入 `user.tokens_valid_after`，认证时与令牌的 iat
+  比较。用户在认证依赖中本来就会加载，这项校验没有额外的 I/O
+
+每个 worker 在内存中维护已吊销 jti 的 Bloom 过滤器，按 `TOKEN_REVOCATION_REFRESH_INTERVAL`
+增量加载新吊销的 jti，并定期按未过期的行重建（清除已过期的 jti）。绝大多数请求的 jti
+不在过滤器中，不产生任何查询；只有命中时才查询 `revoked_token` 精确确认。
+
+其他 worker 上的吊销最多在一个刷新间隔后生效；执行吊销的 worker 立即生效。
+"""
+
+import asyncio
+import threading
+import time
+from datetime import UTC, datetime, timedelta
+from uuid import UUID, uuid7  # type: ignore[attr-defined]
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.mysql import insert
+from sqlmodel import Session, col, select
+
+from app.core.bloom import BloomFilter
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.metrics import counter
+
+from .models import RevokedToken
+from .schemas import TokenPayload
+
+# 增量加载的时间窗口向前多取一段，覆盖各 worker 之间的时钟偏差与晚提交的事务
+_REFRESH_OVERLAP = timedelta(seconds=30)
+
+_revocation_checks = counter(
+    "token_revocation_checks_total",
+    "Access token revocation checks, by outcome.",
+    ["outcome"],
+)
+
+
+def _utc(value: datetime) -> datetime:
+    # MySQL DATETIME 读出为 naive，按 UTC 解释
+    return value if value.tzinfo else value.replace(tzinfo=UTC)
+
+
+def issued_before_watermark(
+    payload: TokenPayload, tokens_valid_after: datetime | None
+) -> bool:
+    """令牌是否签发于用户的「全部吊销」时间点之前"""
+    if tokens_valid_after is None:
+        return False
+    # 没有 iat 的旧令牌视为最早签发
+    return (payload.iat or 0) < _utc(tokens_valid_after).timestamp()
+
+
+class RevocationList:
+    """已吊销 jti 的进程内 Bloom 过滤器，命中后查询数据库确认"""
+
+    def __init__(self, *, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._loaded_since: datetime | None = None
+        self._rebuilt_at = 0.0
+        # 已确认吊销的 jti，避免对同一个令牌反复查询
+        self._confirmed: set[str] = set()
+
+    def might_be_revoked(self, jti: str) -> bool:
+        """只查内存：False 表示一定未吊销"""
+        return jti in self._bloom
+
+    def is_revoked(self, jti: str, session: Session | None = None) -> bool:
+        """Bloom 未命中直接返回；命中时用给定会话（或新建只读会话）精确查询"""
+        if jti not in self._bloom:
+            _revocation_checks.inc(outcome="bloom_miss")
+            return False
+        if jti in self._confirmed:
+            _revocation_checks.inc(outcome="revoked")
+            return True
+        if session is None:
+            from app.core.db import ReadSessionLocal
+
+            with ReadSessionLocal() as read_session:
+                return self.is_revoked(jti, read_session)
+        expires_at = session.exec(
+            select(RevokedToken.expires_at).where(RevokedToken.jti == jti)
+        ).first()
+        revoked = expires_at is not None and _utc(expires_at) > datetime.now(UTC)
+        if revoked:
+            with self._lock:
+                self._confirmed.add(jti)
+        _revocation_checks.inc(outcome="revoked" if revoked else "false_positive")
+        return revoked
+
+    def revoke(
+        self, session: Session, *, jti: str, user_id: UUID, expires_at: datetime
+    ) -> None:
+        """吊销单个令牌：写入数据库并立即加入本 worker 的过滤器"""
+        now = datetime.now(UTC)
+        statement = insert(RevokedToken).values(
+            id=uuid7(),
+            jti=jti,
+            user_id=user_id,
+            expires_at=expires_at,
+            created_at=now,
+            updated_at=now,
+        )
+        session.exec(statement.prefix_with("IGNORE"))  # type: ignore[call-overload]
+        session.commit()
+        with self._lock:
+            self._bloom.add(jti)
+            self._confirmed.add(jti)
+
+    def refresh(self) -> int:
+        """增量加载上次刷新以来新吊销的 jti，需要时整体重建；返回加载的数量（阻塞调用）"""
+        from app.core.db import ReadSessionLocal
+
+        if (
+            self._loaded_since is None
+            or self._bloom.saturated
+            or time.monotonic() - self._rebuilt_at
+            >= settings.TOKEN_REVOCATION_REBUILD_INTERVAL
+        ):
+            return self.rebuild()
+
+        since = self._loaded_since
+        started = datetime.now(UTC)
+        with ReadSessionLocal() as session:
+            jtis = session.exec(
+                select(RevokedToken.jti).where(
+                    RevokedToken.created_at >= since - _REFRESH_OVERLAP
+                )
+            ).all()
+        with self._lock:
+            for jti in jtis:
+                self._bloom.add(jti)
+            self._loaded_since = started
+        return len(jtis)
+
+    def rebuild(self) -> int:
+        """删除已过期的行，按仍然有效的 jti 重建过滤器（阻塞调用）"""
+        from app.core.db import SessionLocal
+
+        started = datetime.now(UTC)
+        with SessionLocal() as session:
+            # 每个 worker 都会执行，删除是幂等的
+            session.exec(  # type: ignore[call-overload]
+                delete(RevokedToken).where(col(RevokedToken.expires_at) <= started)
+            )
+            session.commit()
+            jtis = session.exec(
+                select(RevokedToken.jti).where(RevokedToken.expires_at > started)
+            ).all()
+        bloom = BloomFilter(max(self.capacity, len(jtis) * 2), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        with self._lock:
+            # 重建期间本 worker 吊销的 jti 已确认，继续保留
+            for jti in self._confirmed:
+                bloom.add(jti)
+            self._bloom = bloom
+            self._confirmed.intersection_update(jtis)
+            self._loaded_since = started
+            self._rebuilt_at = time.monotonic()
+        logger.info(f"Token revocation filter rebuilt with {len(jtis)} entries")
+        return len(jtis)
+
+    async def run_refresher(self, interval: float) -> None:
+        """按间隔增量刷新，直到被取消"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception:
+                logger.exception("Refreshing token revocation list failed")
+
+
+revocation_list = RevocationList(
+    capacity=settings.TOKEN_REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE,
+)
@@ -1,22 +1,34 @@
-from datetime import timedelta
+import asyncio
+from datetime import UTC, datetime, timedelta
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
 
 from app.api.deps import SessionDep
+from app.api.http_cache import CachePolicy, not_modified, set_cache_headers, weak_etag
+from app.api.middlewares.idempotency import StoredResponse
+from app.api.routes.user.deps import CurrentUser, is_token_usable
 from app.api.routes.user.service import authenticate
 from app.api.schemas.error import APIException
 from app.core.config import settings
+from app.core.deadline import route_timeout
 
+from .deps import TokenDep
+from .keys import keyring
+from .revocation import revocation_list
 from .schemas import Token
-from .service import create_access_token
+from .service import create_access_token, decode_access_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+# 密钥环在进程生命周期内不变，响应体与 ETag 只计算一次
+_JWKS_ETAG = weak_etag(keyring.jwks.decode())
+_JWKS_POLICY = CachePolicy(public=True, max_age=settings.JWKS_MAX_AGE)
 
-@router.post("/access-token")
+
+@router.post("/access-token", dependencies=[Depends(route_timeout(10))])
 def login_for_access_token(
     session: SessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
 ) -> Token:
@@ -36,3 +48,57 @@ def login_for_access_token(
     return Token(
         access_token=create_access_token(user.id, expires_delta=access_token_expires)
     )
+
+
+async def access_token_replayable(stored: StoredResponse) -> bool:
+    """
+    Idempotent replays of a login must not hand out a token revoked since.
+    """
+    if stored.status_code != HTTPStatus.OK:
+        return True
+    try:
+        token = Token.model_validate_json(stored.body).access_token
+    except ValueError:
+        return True
+    return await asyncio.to_thread(is_token_usable, token)
+
+
+@router.post("/logout", status_code=HTTPStatus.NO_CONTENT)
+def logout(session: SessionDep, current_user: CurrentUser, token: TokenDep) -> None:
+    """
+    Revoke the access token used for this request.
+    """
+    payload = decode_access_token(token)
+    if payload.jti is None or payload.exp is None:
+        raise APIException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail="Token cannot be revoked individually, use revoke-all",
+        )
+    revocation_list.revoke(
+        session,
+        jti=payload.jti,
+        user_id=current_user.id,
+        expires_at=datetime.fromtimestamp(payload.exp, UTC),
+    )
+
+
+@router.post("/revoke-all", status_code=HTTPStatus.NO_CONTENT)
+def revoke_all_tokens(session: SessionDep, current_user: CurrentUser) -> None:
+    """
+    Revoke every access token issued to the current user until now.
+    """
+    current_user.tokens_valid_after = datetime.now(UTC)
+    session.add(current_user)
+    session.commit()
+
+
+@router.get("/jwks.json", response_class=Response)
+def jwks(request: Request) -> Response:
+    """
+    Public keys for verifying access tokens locally (JSON Web Key Set).
+    """
+    if (cached := not_modified(request, _JWKS_ETAG, _JWKS_POLICY)) is not None:
+        return cached
+    response = Response(content=keyring.jwks, media_type="application/jwk-set+json")
+    set_cache_headers(response, _JWKS_ETAG, _JWKS_POLICY)
+    return response
@@ -10,6 +10,10 @@ class Token(SQLModel):
 # Contents of JWT token
 class TokenPayload(SQLModel):
     sub: str | None = None
+    # 早期签发的令牌没有 jti / iat
+    jti: str | None = None
+    iat: float | None = None
+    exp: float | None = None
 
 
 class NewPassword(SQLModel):
@@ -1,15 +1,24 @@
 from datetime import datetime, timedelta, timezone
 from typing import Any
+from uuid import uuid4
 
-import jwt
+from .keys import keyring
+from .schemas import TokenPayload
 
-from app.core.config import settings
 
-ALGORITHM = "HS256"
+def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
+    now = datetime.now(timezone.utc)
+    expire = now + expires_delta
+    # jti 用于单独吊销；iat 保留微秒，与用户的 tokens_valid_after 比较
+    to_encode = {
+        "exp": expire,
+        "sub": str(subject),
+        "jti": uuid4().hex,
+        "iat": now.timestamp(),
+    }
+    return keyring.sign(to_encode)
 
 
-def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
-    expire = datetime.now(timezone.utc) + expires_delta
-    to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+def decode_access_token(token: str) -> TokenPayload:
+    """校验签名与过期时间并解析载荷，失败时抛出 `jwt.InvalidTokenError` 或 `ValidationError`"""
+    return TokenPayload(**keyring.verify(token))
@@ -0,0 +1,33 @@
+import asyncio
+
+from fastapi import APIRouter, Request
+
+from app.api.routes.auth.deps import OptionalTokenDep
+from app.api.routes.user.deps import get_current_user_read_only
+from app.api.routes.user.models import User
+from app.core.db import ReadSessionLocal
+
+from .schemas import BatchRequest, BatchResponse
+from .service import BATCH_PATH, run_batch
+
+router = APIRouter(tags=["batch"])
+
+
+def _authenticate(request: Request, token: str) -> User:
+    # 使用短暂的只读会话认证，连接在分发子请求之前就归还连接池，
+    # 而不是由请求级的 SessionDep 一直持有到所有子请求完成
+    with ReadSessionLocal() as session:
+        return get_current_user_read_only(request, session, token)
+
+
+@router.post(BATCH_PATH)
+async def batch(
+    request: Request, batch_in: BatchRequest, token: OptionalTokenDep
+) -> BatchResponse:
+    """
+    Execute several API calls in one round trip.
+    """
+    shared_user = None
+    if token:
+        shared_user = (token, await asyncio.to_thread(_authenticate, request, token))
+    return BatchResponse(responses=await run_batch(request, batch_in, shared_user))
@@ -0,0 +1,36 @@
+from typing import Any, Literal
+
+from pydantic import BaseModel, Field
+
+from app.api.schemas.response import APIResponseModel
+
+
+class BatchSubRequest(BaseModel):
+    id: str | None = Field(
+        default=None, max_length=64, description="子请求标识，默认为其在列表中的序号"
+    )
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str = Field(
+        pattern=r"^/", description="相对 API_V1_STR 的路径，可带查询参数，如 /user/me"
+    )
+    headers: dict[str, str] = Field(default_factory=dict)
+    body: Any | None = Field(default=None, description="JSON 请求体")
+    depends_on: list[str] = Field(
+        default_factory=list,
+        description="需等待完成的子请求 id，只能引用排在前面的子请求",
+    )
+
+
+class BatchRequest(BaseModel):
+    requests: list[BatchSubRequest] = Field(min_length=1)
+
+
+class BatchSubResponse(BaseModel):
+    id: str
+    status: int
+    request_id: str
+    body: APIResponseModel[Any]
+
+
+class BatchResponse(BaseModel):
+    responses: list[BatchSubResponse]
@@ -0,0 +1,224 @@
+"""
+批量请求
+
+子请求在进程内直接交给 ASGI 应用处理（不经过网络与 HTTP 解析），仍然走完整的中间件、
+依赖注入与异常处理，因此行为与单独调用一致：
+
+- 认证只做一次：批量入口解析出的用户通过请求 state 共享给携带相同 token 的子请求
+- 互不依赖的子请求并发执行；`depends_on` 指定的子请求先完成，且失败时不再执行（424）
+- 每个子请求的 request_id 由批量请求的 request_id 派生：`<batch>-<id>`
+- 子请求继承批量请求剩余的截止时间预算
+"""
+
+import asyncio
+import json
+from http import HTTPStatus
+from typing import Any
+from urllib.parse import urlsplit
+
+from starlette.requests import Request
+from starlette.types import Message
+
+from app.api.routes.user.deps import SHARED_USER_STATE
+from app.api.routes.user.models import User
+from app.api.schemas.error import APIErrorType, APIException
+from app.api.schemas.response import APIResponseModel
+from app.core.config import settings
+from app.core.deadline import remaining_time
+from app.core.logger import logger
+from app.core.metrics import counter
+
+from .schemas import BatchRequest, BatchSubRequest, BatchSubResponse
+
+BATCH_PATH = "/batch"
+
+_batch_subrequests = counter(
+    "batch_subrequests_total",
+    "Sub-requests dispatched by the batch endpoint.",
+    ["status"],
+)
+
+
+def _validate(batch: BatchRequest) -> list[str]:
+    if len(batch.requests) > settings.BATCH_MAX_REQUESTS:
+        raise APIException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail=f"A batch may contain at most {settings.BATCH_MAX_REQUESTS} requests",
+            error_type=APIErrorType.VALIDATION_ERROR,
+        )
+    ids: list[str] = []
+    for index, sub in enumerate(batch.requests):
+        sub_id = sub.id if sub.id is not None else str(index)
+        if sub_id in ids:
+            raise APIException(
+                status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+                detail=f"Duplicate sub-request id: {sub_id}",
+                error_type=APIErrorType.VALIDATION_ERROR,
+            )
+        # 只能依赖排在前面的子请求，从而不会出现环
+        for dependency in sub.depends_on:
+            if dependency not in ids:
+                raise APIException(
+                    status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+                    detail=f"Sub-request {sub_id} depends on unknown or later id {dependency}",
+                    error_type=APIErrorType.VALIDATION_ERROR,
+                )
+        ids.append(sub_id)
+    return ids
+
+
+def _envelope(status: int, content_type: str, body: bytes) -> APIResponseModel[Any]:
+    """把子响应转换为统一响应体：错误响应本身已是该格式，成功响应放入 data"""
+    content: Any = body.decode("utf-8", errors="replace")
+    if content_type.startswith("application/json") and body:
+        try:
+            content = json.loads(body)
+        except json.JSONDecodeError:
+            pass
+    if status < HTTPStatus.BAD_REQUEST:
+        return APIResponseModel[Any](data=content)
+    if isinstance(content, dict) and {"data", "message"} <= content.keys():
+        return APIResponseModel[Any].model_validate(content)
+    return APIResponseModel[Any](
+        data=None, message=str(content), error=APIErrorType.HTTP_STATUS_ERROR
+    )
+
+
+def _error_response(
+    sub_id: str, request_id: str, status: int, message: str
+) -> BatchSubResponse:
+    return BatchSubResponse(
+        id=sub_id,
+        status=status,
+        request_id=request_id,
+        body=APIResponseModel[Any](
+            data=None, message=message, error=APIErrorType.HTTP_STATUS_ERROR
+        ),
+    )
+
+
+async def _dispatch(
+    request: Request,
+    sub: BatchSubRequest,
+    *,
+    request_id: str,
+    shared_user: tuple[str, User] | None,
+) -> tuple[int, str, bytes]:
+    """在进程内执行一个子请求，返回状态码、Content-Type 与响应体"""
+    url = urlsplit(sub.path)
+    headers = {name.lower(): value for name, value in sub.headers.items()}
+    if "authorization" in request.headers:
+        headers.setdefault("authorization", request.headers["authorization"])
+    payload = b""
+    if sub.body is not None:
+        payload = json.dumps(sub.body).encode()
+        headers.setdefault("content-type", "application/json")
+    if (remaining := remaining_time()) is not None:
+        headers.setdefault(
+            settings.REQUEST_TIMEOUT_HEADER.lower(), f"{max(remaining, 0):.3f}"
+        )
+    headers["content-length"] = str(len(payload))
+    if "host" in request.headers:
+        headers.setdefault("host", request.headers["host"])
+
+    state: dict[str, Any] = {**request.scope.get("state", {}), "request_id": request_id}
+    if shared_user is not None:
+        state[SHARED_USER_STATE] = shared_user
+    path = settings.API_V1_STR + url.path
+    scope = {
+        **{k: request.scope[k] for k in ("http_version", "scheme", "server", "client")},
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "method": sub.method,
+        "root_path": request.scope.get("root_path", ""),
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": url.query.encode(),
+        "headers": [
+            (k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()
+        ],
+        "state": state,
+    }
+
+    request_sent = False
+    response_done = asyncio.Event()
+    status: int = HTTPStatus.INTERNAL_SERVER_ERROR
+    content_type = ""
+    chunks: list[bytes] = []
+
+    async def receive() -> Message:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        nonlocal status, content_type
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            for name, value in message.get("headers", []):
+                if name.lower() == b"content-type":
+                    content_type = value.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_done.set()
+
+    try:
+        await request.app(scope, receive, send)
+    except Exception:
+        # ServerErrorMiddleware 已发送 500 响应后仍会重新抛出异常
+        logger.exception(f"Batch sub-request {request_id} failed")
+        if not response_done.is_set():
+            return HTTPStatus.INTERNAL_SERVER_ERROR, "", b"Internal Server Error"
+    finally:
+        response_done.set()
+    return status, content_type, b"".join(chunks)
+
+
+async def run_batch(
+    request: Request, batch: BatchRequest, shared_user: tuple[str, User] | None
+) -> list[BatchSubResponse]:
+    ids = _validate(batch)
+    parent_id = getattr(request.state, "request_id", "batch")
+    semaphore = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+    tasks: dict[str, asyncio.Task[BatchSubResponse]] = {}
+
+    async def run(sub_id: str, sub: BatchSubRequest) -> BatchSubResponse:
+        request_id = f"{parent_id}-{sub_id}"
+        if sub.depends_on:
+            done = await asyncio.gather(*(tasks[d] for d in sub.depends_on))
+            failed = [r.id for r in done if r.status >= HTTPStatus.BAD_REQUEST]
+            if failed:
+                return _error_response(
+                    sub_id,
+                    request_id,
+                    HTTPStatus.FAILED_DEPENDENCY,
+                    f"Dependency failed: {', '.join(failed)}",
+                )
+        if urlsplit(sub.path).path.rstrip("/") == BATCH_PATH:
+            return _error_response(
+                sub_id, request_id, HTTPStatus.BAD_REQUEST, "Batches cannot be nested"
+            )
+
+        async with semaphore:
+            status, content_type, body = await _dispatch(
+                request, sub, request_id=request_id, shared_user=shared_user
+            )
+        _batch_subrequests.inc(status=str(status))
+        return BatchSubResponse(
+            id=sub_id,
+            status=status,
+            request_id=request_id,
+            body=_envelope(status, content_type, body),
+        )
+
+    for sub_id, sub in zip(ids, batch.requests, strict=True):
+        tasks[sub_id] = asyncio.create_task(run(sub_id, sub))
+    try:
+        return list(await asyncio.gather(*tasks.values()))
+    finally:
+        for task in tasks.values():
+            task.cancel()
@@ -0,0 +1,45 @@
+import secrets
+from http import HTTPStatus
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.api.routes.auth.deps import TokenDep
+from app.api.routes.user.deps import get_current_active_superuser_read_only
+from app.api.schemas.error import APIException
+from app.core.config import settings
+from app.core.metrics import render_prometheus
+
+router = APIRouter(tags=["metrics"])
+
+
+def verify_scrape_token(token: TokenDep) -> None:
+    """抓取端使用固定的 METRICS_TOKEN 作为 Bearer 令牌"""
+    expected = settings.METRICS_TOKEN or ""
+    if not secrets.compare_digest(token.encode(), expected.encode()):
+        raise APIException(
+            status_code=HTTPStatus.UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+# 配置了 METRICS_TOKEN 时按令牌校验，否则只允许超级用户访问
+_access = (
+    verify_scrape_token
+    if settings.METRICS_TOKEN
+    else get_current_active_superuser_read_only
+)
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+    dependencies=[Depends(_access)],
+)
+def read_metrics() -> str:
+    """
+    Prometheus text exposition of this worker's in-process metrics.
+    """
+    return render_prometheus()
@@ -0,0 +1,243 @@
+"""
+用户批量导入 / upsert
+
+逐行调用 `create_user` 时，每个用户都要做一次 argon2、一条 INSERT、一次提交和一次
+refresh SELECT。这里改为：
+
+- 密码哈希分片提交到进程池并行计算，并且提前一批提交，与当前批次的写入重叠
+- 每批一条多行 INSERT（upsert 模式为 `ON DUPLICATE KEY UPDATE`，命中
+  `(email, deleted_at)` 唯一键时更新未删除的同名用户），每批只提交一次
+- 单行错误（校验失败、重复邮箱）只记录，不中断导入
+"""
+
+import csv
+import json
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any, Literal
+from uuid import uuid7  # type: ignore[attr-defined]
+
+from pydantic import ValidationError
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, col, select
+
+from app.api.models import SOFT_DELETE_DATETIME
+
+from .cache import record_invalidations
+from .models import User
+from .schemas import UserCreate
+from .service import password_hash
+
+ImportFormat = Literal["ndjson", "csv"]
+
+# upsert 时覆盖的列；id 与 created_at 保持原值
+_UPSERT_COLUMNS = (
+    "hashed_password",
+    "full_name",
+    "avatar_url",
+    "is_active",
+    "is_superuser",
+    "updated_at",
+)
+
+
+@dataclass(frozen=True)
+class BulkRowError:
+    row: int
+    email: str | None
+    error: str
+
+
+@dataclass
+class BulkResult:
+    written: int = 0
+    errors: list[BulkRowError] = field(default_factory=list)
+    hash_seconds: float = 0.0
+    write_seconds: float = 0.0
+
+
+def read_user_rows(
+    lines: Iterable[str], fmt: ImportFormat
+) -> Iterator[tuple[int, dict[str, Any] | BulkRowError]]:
+    """逐行解析 NDJSON / CSV，返回 (行号, 字段) 或解析错误"""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            # 空字符串视为未提供，交给 schema 默认值处理
+            yield (
+                reader.line_num,
+                {k: v for k, v in record.items() if v not in ("", None)},
+            )
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield number, BulkRowError(number, None, f"Invalid JSON: {exc.msg}")
+            continue
+        if not isinstance(record, dict):
+            yield number, BulkRowError(number, None, "Row must be a JSON object")
+            continue
+        yield number, record
+
+
+def _hash_many(passwords: list[str]) -> list[str]:
+    # 在进程池子进程中执行
+    return [password_hash.hash(password) for password in passwords]
+
+
+def _submit_hashes(
+    executor: Executor, passwords: list[str], parts: int
+) -> list[Future[list[str]]]:
+    size = max(1, -(-len(passwords) // parts))
+    return [
+        executor.submit(_hash_many, passwords[i : i + size])
+        for i in range(0, len(passwords), size)
+    ]
+
+
+def _batches(
+    rows: Iterable[tuple[int, dict[str, Any] | BulkRowError]],
+    batch_size: int,
+    result: BulkResult,
+) -> Iterator[list[tuple[int, UserCreate]]]:
+    batch: list[tuple[int, UserCreate]] = []
+    for number, record in rows:
+        if isinstance(record, BulkRowError):
+            result.errors.append(record)
+            continue
+        try:
+            batch.append((number, UserCreate.model_validate(record)))
+        except ValidationError as exc:
+            message = "; ".join(
+                f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}"
+                for e in exc.errors()
+            )
+            result.errors.append(BulkRowError(number, record.get("email"), message))
+            continue
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _write_batch(
+    session: Session,
+    batch: list[tuple[int, UserCreate]],
+    hashes: list[str],
+    *,
+    upsert: bool,
+    result: BulkResult,
+) -> None:
+    now = datetime.now(UTC)
+    rows: dict[str, tuple[int, dict[str, Any]]] = {}
+    for (number, user), hashed in zip(batch, hashes, strict=True):
+        email = str(user.email)
+        if email in rows and not upsert:
+            result.errors.append(
+                BulkRowError(number, email, "Duplicate email in input")
+            )
+            continue
+        values = user.model_dump(exclude={"password"})
+        values.update(
+            id=uuid7(),
+            email=email,
+            hashed_password=hashed,
+            created_at=now,
+            updated_at=now,
+            deleted_at=SOFT_DELETE_DATETIME,
+        )
+        # upsert 模式下同一批内的重复邮箱以最后一行为准
+        rows[email] = (number, values)
+
+    if not upsert and rows:
+        existing = session.exec(
+            select(User.email).where(col(User.email).in_(list(rows)))
+        ).all()
+        for email in existing:
+            number, _ = rows.pop(email)
+            result.errors.append(
+                BulkRowError(number, email, "Email already registered")
+            )
+    if not rows:
+        return
+
+    try:
+        _insert(session, [row for _, row in rows.values()], upsert=upsert)
+    except IntegrityError:
+        # 与并发写入冲突：逐行重试以定位出错的行，其余行照常写入
+        session.rollback()
+        for number, row in rows.values():
+            try:
+                _insert(session, [row], upsert=upsert)
+            except IntegrityError as exc:
+                session.rollback()
+                result.errors.append(
+                    BulkRowError(number, row["email"], f"Integrity error: {exc.orig}")
+                )
+            else:
+                result.written += 1
+        return
+    result.written += len(rows)
+
+
+def _insert(session: Session, rows: list[dict[str, Any]], *, upsert: bool) -> None:
+    """一条多行 INSERT（upsert 模式为 ON DUPLICATE KEY UPDATE）并提交"""
+    statement = insert(User).values(rows)
+    if upsert:
+        statement = statement.on_duplicate_key_update(
+            {name: statement.inserted[name] for name in _UPSERT_COLUMNS}
+        )
+    session.exec(statement)  # type: ignore[call-overload]
+    if upsert:
+        # ON DUPLICATE KEY UPDATE 绕过了 ORM，需要显式记录被更新用户的缓存失效
+        # （新插入的用户不在缓存中，一并记录无害）
+        emails = [row["email"] for row in rows]
+        record_invalidations(
+            session,
+            session.exec(select(User.id).where(col(User.email).in_(emails))).all(),
+        )
+    session.commit()
+
+
+def create_users_bulk(
+    *,
+    session: Session,
+    rows: Iterable[tuple[int, dict[str, Any] | BulkRowError]],
+    executor: Executor,
+    workers: int,
+    batch_size: int = 1000,
+    upsert: bool = False,
+) -> BulkResult:
+    """批量创建（或 upsert）用户，rows 通常来自 `read_user_rows`，可以是惰性的流"""
+    result = BulkResult()
+    batches = _batches(rows, batch_size, result)
+    current = next(batches, None)
+    pending = (
+        _submit_hashes(executor, [u.password for _, u in current], workers)
+        if current
+        else []
+    )
+    while current is not None:
+        started = time.perf_counter()
+        hashes = [h for future in pending for h in future.result()]
+        result.hash_seconds += time.perf_counter() - started
+        # 先提交下一批的哈希计算，再写入当前批次，两者并行
+        following = next(batches, None)
+        pending = (
+            _submit_hashes(executor, [u.password for _, u in following], workers)
+            if following
+            else []
+        )
+        started = time.perf_counter()
+        _write_batch(session, current, hashes, upsert=upsert, result=result)
+        result.write_seconds += time.perf_counter() - started
+        current = following
+    return result
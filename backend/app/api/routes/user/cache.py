@@ -0,0 +1,220 @@
+"""
+当前用户缓存
+
+认证依赖每个请求都要按 token 的 sub 加载用户。这里在每个 worker 内缓存用户行的快照
+（不含 hashed_password），命中时直接在请求的会话中构造一个已持久化的 User 对象，不查询数据库：
+
+- 有界 LRU + TTL（`CURRENT_USER_CACHE_SIZE` / `CURRENT_USER_CACHE_TTL`）
+- 同一用户的并发未命中只有一个线程查询数据库，其余等待并共享结果
+- 通过 SessionLocal 修改或删除 User（更新资料、软删除、吊销全部令牌等）时，在同一事务中
+  写入 `user_invalidation`，提交后立即清除本 worker 的缓存
+- 各 worker 每隔 `CURRENT_USER_INVALIDATION_POLL_INTERVAL` 秒读取新的失效记录；其他 worker
+  上的缓存最多滞后一个轮询间隔，轮询失败时由 TTL 兜底
+
+绕过 ORM 的批量写入（Core UPDATE / INSERT ... ON DUPLICATE KEY UPDATE）需要调用
+`record_invalidations`。
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Any
+from uuid import UUID, uuid7  # type: ignore[attr-defined]
+
+from sqlalchemy import delete, event, insert
+from sqlalchemy.orm import make_transient_to_detached
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.core.db import ReadSessionLocal, SessionLocal
+from app.core.logger import logger
+from app.core.metrics import counter
+
+from .models import User, UserInvalidation
+
+# 轮询窗口向前多取一段，覆盖 worker 之间的时钟偏差与晚提交的事务
+_POLL_OVERLAP = timedelta(seconds=10)
+# 失效记录只需要保留到所有 worker 都已读取
+_LOG_RETENTION = timedelta(minutes=10)
+_PENDING_KEY = "user_cache_invalidations"
+_CACHED_COLUMNS = tuple(
+    column.key
+    for column in User.__table__.columns  # type: ignore[attr-defined]
+    if column.key != "hashed_password"
+)
+
+_lookups = counter(
+    "current_user_cache_total", "Current-user lookups, by outcome.", ["outcome"]
+)
+
+
+@dataclass
+class _Flight:
+    done: threading.Event = field(default_factory=threading.Event)
+    snapshot: dict[str, Any] | None = None
+    error: BaseException | None = None
+    invalidated: bool = False
+
+
+def _snapshot(user: User) -> dict[str, Any]:
+    return {key: getattr(user, key) for key in _CACHED_COLUMNS}
+
+
+def _materialize(session: Session, snapshot: dict[str, Any]) -> User:
+    # 未缓存的列（hashed_password）标记为过期，访问时才加载
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return session.merge(user, load=False)
+
+
+class CurrentUserCache:
+    def __init__(self, *, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[UUID, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._inflight: dict[UUID, _Flight] = {}
+        self._polled_since = datetime.now(UTC)
+        self._polls = 0
+
+    def get(self, session: Session, user_id: UUID) -> User | None:
+        """返回绑定到 session 的用户，未命中时加载（并发未命中合并为一次查询）"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                snapshot = entry[1]
+                flight = None
+                leader = False
+            else:
+                snapshot = None
+                flight = self._inflight.get(user_id)
+                leader = flight is None
+                if flight is None:
+                    flight = self._inflight[user_id] = _Flight()
+        if snapshot is not None:
+            _lookups.inc(outcome="hit")
+            return _materialize(session, snapshot)
+        assert flight is not None
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            _lookups.inc(outcome="shared")
+            return (
+                None
+                if flight.snapshot is None
+                else _materialize(session, flight.snapshot)
+            )
+
+        _lookups.inc(outcome="miss")
+        try:
+            user = session.get(User, user_id)
+            flight.snapshot = None if user is None else _snapshot(user)
+            return user
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(user_id, None)
+                # 加载期间被失效的结果可能已经过时，不写入缓存
+                if flight.snapshot is not None and not flight.invalidated:
+                    self._entries[user_id] = (
+                        time.monotonic() + self.ttl,
+                        flight.snapshot,
+                    )
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+            flight.done.set()
+
+    def invalidate(self, user_ids: Iterable[UUID]) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+                if (flight := self._inflight.get(user_id)) is not None:
+                    flight.invalidated = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def poll(self) -> int:
+        """读取其他 worker 写入的失效记录并清除对应缓存（阻塞调用）"""
+        started = datetime.now(UTC)
+        with ReadSessionLocal() as session:
+            user_ids = session.exec(
+                select(UserInvalidation.user_id).where(
+                    UserInvalidation.created_at >= self._polled_since - _POLL_OVERLAP
+                )
+            ).all()
+        self.invalidate(user_ids)
+        self._polled_since = started
+        self._polls += 1
+        if self._polls % 600 == 0:
+            with SessionLocal() as session:
+                session.exec(  # type: ignore[call-overload]
+                    delete(UserInvalidation).where(
+                        col(UserInvalidation.created_at) < started - _LOG_RETENTION
+                    )
+                )
+                session.commit()
+        return len(user_ids)
+
+    async def run_poller(self, interval: float) -> None:
+        """按间隔轮询失效记录，直到被取消"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.poll)
+            except Exception:
+                # 轮询失败期间缓存由 TTL 兜底，清空以免超出失效窗口
+                self.clear()
+                logger.exception("Polling user invalidations failed")
+
+
+current_user_cache = CurrentUserCache(
+    maxsize=settings.CURRENT_USER_CACHE_SIZE, ttl=settings.CURRENT_USER_CACHE_TTL
+)
+
+
+def record_invalidations(session: Session, user_ids: Iterable[UUID]) -> None:
+    """在 session 的当前事务中写入失效记录，提交后清除本 worker 的缓存"""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    now = datetime.now(UTC)
+    session.connection().execute(
+        insert(UserInvalidation),
+        [
+            {"id": uuid7(), "user_id": user_id, "created_at": now, "updated_at": now}
+            for user_id in user_ids
+        ],
+    )
+    session.info.setdefault(_PENDING_KEY, set()).update(user_ids)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _record_user_changes(session: Session, flush_context: Any) -> None:  # noqa: ARG001
+    user_ids = {
+        obj.id
+        for obj in (*session.dirty, *session.deleted)
+        if isinstance(obj, User) and obj.id is not None
+    }
+    record_invalidations(session, user_ids)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _evict_committed(session: Session) -> None:
+    if user_ids := session.info.pop(_PENDING_KEY, None):
+        current_user_cache.invalidate(user_ids)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -2,45 +2,104 @@ from http import HTTPStatus
 from typing import Annotated
 from uuid import UUID
 
-import jwt
-from fastapi import Depends
+from fastapi import Depends, Request
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
+from sqlmodel import Session
 
-from app.api.deps import SessionDep
-from app.api.routes.auth.deps import TokenDep
-from app.api.routes.auth.schemas import TokenPayload
-from app.api.routes.auth.service import ALGORITHM
+from app.api.deps import ReadSessionDep, SessionDep
+from app.api.routes.auth.deps import OptionalTokenDep, TokenDep
+from app.api.routes.auth.revocation import issued_before_watermark, revocation_list
+from app.api.routes.auth.service import decode_access_token
+from app.api.routes.user.cache import current_user_cache
 from app.api.routes.user.models import User
 from app.api.schemas.error import APIException
-from app.core.config import settings
+from app.core.db import ReadSessionLocal
 
+# 批量请求入口把已认证的 (token, user) 放在子请求的 state 中
+SHARED_USER_STATE = "shared_user"
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
+
+def _load_current_user(request: Request, session: Session, token: str) -> User:
+    # 批量子请求复用入口已解析的用户，不再重复校验 token 与查询数据库
+    shared = getattr(request.state, SHARED_USER_STATE, None)
+    if shared is not None and shared[0] == token:
+        return session.merge(shared[1], load=False)
+    return _authenticate(session, token)
+
+
+def _authenticate(session: Session, token: str) -> User:
+    credentials_error = APIException(
+        status_code=HTTPStatus.FORBIDDEN,
+        detail="Could not validate credentials",
+    )
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        token_data = TokenPayload(**payload)
+        token_data = decode_access_token(token)
     except (InvalidTokenError, ValidationError):
-        raise APIException(
-            status_code=HTTPStatus.FORBIDDEN,
-            detail="Could not validate credentials",
-        )
+        raise credentials_error
+    # 未吊销的令牌只查内存中的 Bloom 过滤器，命中时才查询数据库
+    if token_data.jti and revocation_list.is_revoked(token_data.jti, session):
+        raise credentials_error
 
-    user = session.get(User, UUID(token_data.sub))  # 显式将 sub 转换为 UUID
+    # 显式将 sub 转换为 UUID；命中本 worker 的缓存时不查询数据库
+    user = current_user_cache.get(session, UUID(token_data.sub))
     if not user:
         raise APIException(status_code=HTTPStatus.NOT_FOUND, detail="User not found")
+    if issued_before_watermark(token_data, user.tokens_valid_after):
+        raise credentials_error
     if not user.is_active:
         raise APIException(status_code=HTTPStatus.BAD_REQUEST, detail="Inactive user")
     return user
 
 
+def is_token_usable(token: str) -> bool:
+    """令牌此刻能否通过认证（未过期、未吊销、用户仍然有效），阻塞调用"""
+    with ReadSessionLocal() as session:
+        try:
+            _authenticate(session, token)
+        except APIException:
+            return False
+    return True
+
+
+def get_current_user(request: Request, session: SessionDep, token: TokenDep) -> User:
+    return _load_current_user(request, session, token)
+
+
+def get_current_user_read_only(
+    request: Request, session: ReadSessionDep, token: TokenDep
+) -> User:
+    """只读路由使用：用户从 ReadSessionDep 加载，与路由共用同一个只读会话"""
+    return _load_current_user(request, session, token)
+
+
 CurrentUser = Annotated[User, Depends(get_current_user)]
+ReadCurrentUser = Annotated[User, Depends(get_current_user_read_only)]
 
 
-def get_current_active_superuser(current_user: CurrentUser) -> User:
-    if not current_user.is_superuser:
+def get_optional_current_user(
+    request: Request, session: SessionDep, token: OptionalTokenDep
+) -> User | None:
+    if token is None:
+        return None
+    return _load_current_user(request, session, token)
+
+
+OptionalCurrentUser = Annotated[User | None, Depends(get_optional_current_user)]
+
+
+def _require_superuser(user: User) -> User:
+    if not user.is_superuser:
         raise APIException(
             status_code=HTTPStatus.FORBIDDEN,
             detail="The user doesn't have enough privileges",
         )
-    return current_user
+    return user
+
+
+def get_current_active_superuser(current_user: CurrentUser) -> User:
+    return _require_superuser(current_user)
+
+
+def get_current_active_superuser_read_only(current_user: ReadCurrentUser) -> User:
+    return _require_superuser(current_user)
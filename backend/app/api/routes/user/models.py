@@ -1,7 +1,13 @@
+from datetime import datetime
+from uuid import UUID
+
 from pydantic import EmailStr
-from sqlmodel import Field, SQLModel, UniqueConstraint
+from sqlalchemy import Column
+from sqlalchemy.dialects.mysql import DATETIME
+from sqlmodel import Field, Index, SQLModel, UniqueConstraint
 
 from app.api.models import BaseUUIDModel, SoftDeleteModel
+from app.core.types import BinaryUUID
 
 
 class UserBase(SQLModel):
@@ -17,6 +23,24 @@ class UserBase(SQLModel):
 class User(UserBase, SoftDeleteModel, BaseUUIDModel, table=True):
     __table_args__ = (
         UniqueConstraint("email", "deleted_at", name="uk_user_email_deleted_at"),
+        # 管理端按状态筛选后按 id 翻页：InnoDB 二级索引隐含主键，等值前缀下即按 id 有序
+        Index("ix_user_is_active_deleted_at", "is_active", "deleted_at"),
+        Index("ix_user_is_superuser_deleted_at", "is_superuser", "deleted_at"),
     )
 
     hashed_password: str = Field(max_length=255, description="加密后的密码")
+    # 早于该时间签发的访问令牌全部失效（「退出所有设备」）；用户在认证时已加载，校验无需额外查询
+    tokens_valid_after: datetime | None = Field(
+        default=None,
+        sa_column=Column(DATETIME(fsp=6), nullable=True),
+        description="令牌有效起始时间",
+    )
+
+
+class UserInvalidation(BaseUUIDModel, table=True):
+    """用户行变更记录：各 worker 轮询该表，清除本地缓存中对应的当前用户"""
+
+    __tablename__ = "user_invalidation"
+    __table_args__ = (Index("ix_user_invalidation_created_at", "created_at"),)
+
+    user_id: UUID = Field(sa_type=BinaryUUID, description="用户ID")
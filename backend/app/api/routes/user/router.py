@@ -1,18 +1,93 @@
-from typing import Any
+from typing import Annotated, Any, Literal
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
-from .deps import CurrentUser
+from app.api.deps import ReadSessionDep
+from app.api.http_cache import REVALIDATE, not_modified, set_cache_headers
+
+from .deps import (
+    ReadCurrentUser,
+    get_current_active_superuser_read_only,
+)
+from .export import MEDIA_TYPES, ExportFormat, export_users, gzip_stream
 from .schemas import (
     UserPublic,
+    UsersPublic,
 )
+from .service import UserFilters, count_users, list_users, user_etag
 
 router = APIRouter(prefix="/user", tags=["user"])
 
 
 @router.get("/me", response_model=UserPublic)
-def read_user_me(current_user: CurrentUser) -> Any:
+def read_user_me(
+    request: Request, response: Response, current_user: ReadCurrentUser
+) -> Any:
     """
     Get current user.
     """
+    # 用户已在认证依赖中加载，ETag 校验不需要额外查询
+    etag = user_etag(current_user)
+    if (cached := not_modified(request, etag, REVALIDATE)) is not None:
+        return cached
+    set_cache_headers(response, etag, REVALIDATE)
     return current_user
+
+
+@router.get("/export", dependencies=[Depends(get_current_active_superuser_read_only)])
+async def export_users_file(
+    format: ExportFormat = "ndjson",
+    include_deleted: bool = False,
+    gzip: bool = False,
+) -> StreamingResponse:
+    """
+    Stream all users as NDJSON or CSV, optionally gzip-compressed.
+    """
+    filename = f"users.{format}"
+    body = export_users(fmt=format, include_deleted=include_deleted)
+    media_type = MEDIA_TYPES[format]
+    if gzip:
+        body = gzip_stream(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get(
+    "/",
+    dependencies=[Depends(get_current_active_superuser_read_only)],
+    response_model=UsersPublic,
+)
+def read_users(
+    session: ReadSessionDep,
+    limit: Annotated[int, Query(ge=1, le=200)] = 50,
+    cursor: Annotated[str | None, Query(max_length=64)] = None,
+    order: Literal["asc", "desc"] = "desc",
+    is_active: bool | None = None,
+    is_superuser: bool | None = None,
+    email_prefix: Annotated[str | None, Query(max_length=255)] = None,
+    exact_count: bool = False,
+) -> Any:
+    """
+    Retrieve users, newest first by default.
+
+    Pass `next_cursor` from the previous page as `cursor` to continue. `count`
+    is estimated from table statistics unless `exact_count` is set.
+    """
+    filters = UserFilters(
+        is_active=is_active, is_superuser=is_superuser, email_prefix=email_prefix
+    )
+    users, next_cursor = list_users(
+        session=session, filters=filters, limit=limit, cursor=cursor, order=order
+    )
+    return UsersPublic(
+        data=[UserPublic.model_validate(user) for user in users],
+        next_cursor=next_cursor,
+        count=count_users(session=session, filters=filters, exact=exact_count),
+        count_exact=exact_count,
+    )
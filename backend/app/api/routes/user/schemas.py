@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Annotated
 from uuid import UUID
 
@@ -42,3 +43,18 @@ class UpdatePassword(SQLModel):
 
 class UserPublic(UserBase):
     id: UUID
+
+
+class UsersPublic(SQLModel):
+    data: list[UserPublic]
+    # 下一页游标，为空表示没有更多数据
+    next_cursor: str | None = None
+    count: int
+    # count 为精确值（exact_count=true）还是来自表统计信息的估算值
+    count_exact: bool = False
+
+
+class UserExport(UserPublic):
+    created_at: datetime
+    updated_at: datetime
+    deleted_at: datetime
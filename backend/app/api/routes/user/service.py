@@ -1,7 +1,19 @@
-from typing import Any
+import base64
+import binascii
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Any, Literal
+from uuid import UUID
 
 from pwdlib import PasswordHash
-from sqlmodel import Session, select
+from sqlalchemy import func, inspect, text
+from sqlalchemy.orm import InstanceState
+from sqlmodel import Session, col, select
+
+from app.api.http_cache import weak_etag
+from app.api.models import SOFT_DELETE_DATETIME
+from app.api.schemas.error import APIException
+from app.core.deadline import check_deadline
 
 from .models import User
 from .schemas import UserCreate, UserUpdate
@@ -10,20 +22,37 @@ password_hash = PasswordHash.recommended()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
+    # argon2 计算代价高，请求已超时则不再开始
+    check_deadline("password_hash")
     return password_hash.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
+    check_deadline("password_hash")
     return password_hash.hash(password)
 
 
+def _load_server_values(session: Session, db_obj: User) -> None:
+    """只重新加载 flush 后过期的列（server_default / server_onupdate 等服务端计算的列）
+
+    其余列的值都在客户端生成，SessionLocal 设置了 expire_on_commit=False，提交后内存中的
+    对象仍然有效；User 目前没有服务端计算的列，这里不会产生额外的查询。
+    """
+    state = inspect(db_obj)
+    if not isinstance(state, InstanceState):
+        return
+    expired = state.expired_attributes
+    if expired:
+        session.refresh(db_obj, attribute_names=list(expired))
+
+
 def create_user(*, session: Session, user_create: UserCreate) -> User:
     db_obj = User.model_validate(
         user_create, update={"hashed_password": get_password_hash(user_create.password)}
     )
     session.add(db_obj)
     session.commit()
-    session.refresh(db_obj)
+    _load_server_values(session, db_obj)
     return db_obj
 
 
@@ -37,7 +66,7 @@ def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
     db_user.sqlmodel_update(user_data, update=extra_data)
     session.add(db_user)
     session.commit()
-    session.refresh(db_user)
+    _load_server_values(session, db_user)
     return db_user
 
 
@@ -54,3 +83,122 @@ def authenticate(*, session: Session, email: str, password: str) -> User | None:
     if not verify_password(password, db_user.hashed_password):
         return None
     return db_user
+
+
+def user_etag(user: User) -> str:
+    """由 id、updated_at 与公开字段生成弱 ETag（updated_at 只精确到秒）"""
+    return weak_etag(
+        user.id,
+        user.updated_at.isoformat(),
+        user.email,
+        user.full_name,
+        user.avatar_url,
+        user.is_active,
+        user.is_superuser,
+    )
+
+
+_CURSOR_VERSION = 1
+_ORDERS = {"desc": 0, "asc": 1}
+
+
+@dataclass(frozen=True)
+class UserFilters:
+    is_active: bool | None = None
+    is_superuser: bool | None = None
+    email_prefix: str | None = None
+
+    @property
+    def empty(self) -> bool:
+        return (
+            self.is_active is None
+            and self.is_superuser is None
+            and not self.email_prefix
+        )
+
+
+def encode_cursor(last_id: UUID, order: Literal["asc", "desc"]) -> str:
+    raw = bytes([_CURSOR_VERSION, _ORDERS[order]]) + last_id.bytes
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, order: Literal["asc", "desc"]) -> UUID:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    except (binascii.Error, ValueError):
+        raw = b""
+    if len(raw) != 18 or raw[0] != _CURSOR_VERSION or raw[1] != _ORDERS[order]:
+        raise APIException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor")
+    return UUID(bytes=raw[2:])
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _filtered(statement: Any, filters: UserFilters) -> Any:
+    if filters.is_active is not None:
+        statement = statement.where(User.is_active == filters.is_active)
+    if filters.is_superuser is not None:
+        statement = statement.where(User.is_superuser == filters.is_superuser)
+    if filters.email_prefix:
+        # 前缀匹配可以使用 (email, deleted_at) 唯一索引做范围扫描
+        statement = statement.where(
+            col(User.email).like(f"{_escape_like(filters.email_prefix)}%", escape="\\")
+        )
+    return statement
+
+
+def list_users(
+    *,
+    session: Session,
+    filters: UserFilters,
+    limit: int,
+    cursor: str | None = None,
+    order: Literal["asc", "desc"] = "desc",
+) -> tuple[list[User], str | None]:
+    """按 uuid7 主键做 keyset 分页，翻页代价与页码无关"""
+    statement = _filtered(select(User), filters)
+    if cursor is not None:
+        last_id = decode_cursor(cursor, order)
+        statement = statement.where(
+            col(User.id) < last_id if order == "desc" else col(User.id) > last_id
+        )
+    statement = statement.order_by(
+        col(User.id).desc() if order == "desc" else col(User.id).asc()
+    ).limit(limit + 1)
+    users = list(session.exec(statement).all())
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1].id, order)
+    return users, next_cursor
+
+
+def count_users(*, session: Session, filters: UserFilters, exact: bool) -> int:
+    """精确计数需要扫描全部匹配行；默认返回 MySQL 统计信息给出的估算值"""
+    statement = _filtered(select(func.count()).select_from(User), filters)
+    if exact or session.get_bind().dialect.name != "mysql":
+        return session.exec(statement).one()
+    if filters.empty:
+        table_rows = session.exec(
+            text(  # type: ignore[call-overload]
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+            ).bindparams(table=User.__tablename__)
+        ).scalar()
+        return int(table_rows or 0)
+    # 带筛选条件时使用优化器对该查询的行数估算（rows * filtered%）
+    rows_statement = _filtered(select(User.id), filters).where(
+        User.deleted_at == SOFT_DELETE_DATETIME
+    )
+    compiled = rows_statement.compile(dialect=session.get_bind().dialect)
+    plan = (
+        session.connection()
+        .exec_driver_sql(f"EXPLAIN {compiled}", compiled.params)
+        .mappings()
+        .first()
+    )
+    if plan is None:
+        return 0
+    return int((plan["rows"] or 0) * float(plan["filtered"] or 100) / 100)
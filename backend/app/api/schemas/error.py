@@ -14,6 +14,10 @@ class APIErrorType(str, Enum):
 
     HTTP_STATUS_ERROR = "HTTP_STATUS_ERROR"  # 默认 HTTP 状态码异常
     VALIDATION_ERROR = "VALIDATION_ERROR"  # 请求参数校验异常
+    DEADLINE_EXCEEDED = "DEADLINE_EXCEEDED"  # 请求已超过截止时间
+    QUOTA_EXCEEDED = "QUOTA_EXCEEDED"  # 超出 LLM token 配额
+    IDEMPOTENCY_KEY_REUSED = "IDEMPOTENCY_KEY_REUSED"  # 幂等键被用于不同的请求
+    IDEMPOTENCY_IN_PROGRESS = "IDEMPOTENCY_IN_PROGRESS"  # 同一幂等键的请求仍在执行
 
 
 class APIException(HTTPException):
@@ -49,6 +53,17 @@ class APIException(HTTPException):
         )
 
 
+class DeadlineExceededError(APIException):
+    """请求截止时间已过，后续的数据库 / LLM / 密码哈希等工作不再执行"""
+
+    def __init__(self, detail: str | None = None):
+        super().__init__(
+            status_code=HTTPStatus.GATEWAY_TIMEOUT,
+            detail=detail or "Request deadline exceeded",
+            error_type=APIErrorType.DEADLINE_EXCEEDED,
+        )
+
+
 class APIExceptionResponse(JSONResponse):
     def __init__(
         self,
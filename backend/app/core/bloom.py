@@ -0,0 +1,51 @@
+"""
+Bloom 过滤器
+
+用于「绝大多数查询结果为不存在」的场景：不在过滤器中则一定不存在，无需 I/O；
+命中时可能是误判，需要再做一次精确查询。不支持删除，元素过期后通过重建清除。
+"""
+
+import hashlib
+import math
+
+_MASK64 = (1 << 64) - 1
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be positive and 0 < error_rate < 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # m = -n·ln(p) / ln(2)²，k = m/n · ln(2)
+        self.num_bits = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> list[int]:
+        # 双重哈希：一次 128 位摘要拆成两个 64 位值，g_i = h1 + i·h2
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [
+            ((h1 + i * h2) & _MASK64) % self.num_bits for i in range(self.num_hashes)
+        ]
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    @property
+    def saturated(self) -> bool:
+        """写入数超过容量后误判率会高于设定值，应当按更大的容量重建"""
+        return self.count > self.capacity
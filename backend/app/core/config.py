@@ -27,6 +27,16 @@ class Settings(BaseSettings):
     APP_NAME: str = "FastAPI Starter"
     API_V1_STR: str = "/api/v1"
 
+    # server（`start` 生产启动器使用）
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    # None 表示按可用 CPU（含 cgroup 限额）自动计算
+    SERVER_WORKERS: int | None = None
+    SERVER_KEEPALIVE: int = 5
+    SERVER_BACKLOG: int = 2048
+    # 启动时预热连接池、SQL 编译缓存、模型客户端与 argon2，完成后才开始接收请求
+    WARMUP_ENABLED: bool = True
+
     # logging
     LOG_SAVE_IN_LOCAL_FILE: bool = True
     LOG_REQUEST_BODY: bool = False
@@ -35,10 +45,63 @@ class Settings(BaseSettings):
     LOG_BODY_MAX_CONTENT_LENGTH: int = 65536
     LOG_BODY_SKIP_MULTIPART: bool = True
 
+    # request deadline
+    # 客户端通过该请求头（秒）声明愿意等待的时间
+    REQUEST_TIMEOUT_HEADER: str = "X-Request-Timeout"
+    # 未提供请求头时的默认预算（秒），None 表示不限制
+    REQUEST_TIMEOUT_DEFAULT: float | None = None
+    REQUEST_TIMEOUT_MAX: float = 300.0
+
+    # idempotency（Idempotency-Key 请求头）
+    IDEMPOTENCY_ENABLED: bool = True
+    # 每个 worker 保存的响应条数与保存时长（秒）
+    IDEMPOTENCY_CACHE_SIZE: int = 10000
+    IDEMPOTENCY_TTL: float = 24 * 3600
+    # 超过该大小的响应体不保存
+    IDEMPOTENCY_MAX_BODY_BYTES: int = 1024 * 1024
+    # 重复请求等待原请求完成的最长时间（秒），超时返回 409
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 30.0
+
+    # batch（POST {API_V1_STR}/batch）
+    BATCH_MAX_REQUESTS: int = 20
+    BATCH_MAX_CONCURRENCY: int = 8
+
+    # metrics（{API_V1_STR}/metrics）：设置 METRICS_TOKEN 时抓取端以 Bearer 令牌访问，否则仅限超级用户
+    METRICS_ENABLED: bool = False
+    METRICS_TOKEN: str | None = None
+
+    # 同一台机器上各 worker 共享的内存缓存（app.core.shared_cache），目前用于匿名 LLM 配额计数
+    # 由 `uv run start` 在启动前与退出后清理
+    # 占用约 SHARED_CACHE_SLOTS × (32 + KEY_BYTES + VALUE_BYTES，按 64 对齐) 字节
+    SHARED_CACHE_ENABLED: bool = False
+    SHARED_CACHE_NAME: str = "fastapi-shared-cache"
+    SHARED_CACHE_SLOTS: int = 16384
+    SHARED_CACHE_KEY_BYTES: int = 64
+    SHARED_CACHE_VALUE_BYTES: int = 448
+
     # security
     SECRET_KEY: str = secrets.token_urlsafe(32)
     # 60 minutes * 24 hours * 8 days = 8 days
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    # 令牌吊销：各 worker 按间隔（秒）增量加载已吊销的 jti，并定期重建过滤器清除过期项
+    TOKEN_REVOCATION_REFRESH_INTERVAL: float = 5.0
+    TOKEN_REVOCATION_REBUILD_INTERVAL: float = 3600.0
+    TOKEN_REVOCATION_BLOOM_CAPACITY: int = 100_000
+    TOKEN_REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    # 认证时加载的当前用户在每个 worker 内缓存；其他 worker 上的修改最多滞后一个轮询间隔（秒）
+    CURRENT_USER_CACHE_SIZE: int = 10000
+    CURRENT_USER_CACHE_TTL: float = 60.0
+    CURRENT_USER_INVALIDATION_POLL_INTERVAL: float = 1.0
+    # 非对称签名：目录中每个 <kid>.pem 是一把 Ed25519 / RSA 密钥，JWT_ACTIVE_KID 用于签名，
+    # 其余只用于校验；未配置时使用 HS256 + SECRET_KEY。轮换步骤见 app/api/routes/auth/keys.py
+    JWT_KEYS_DIR: str | None = None
+    JWT_ACTIVE_KID: str | None = None
+    # 是否继续接受不带 kid 的 HS256 令牌（切换到非对称签名后的过渡期）
+    JWT_ACCEPT_HS256: bool = True
+    # 每个 worker 缓存的已校验令牌数，0 表示不缓存
+    JWT_VERIFIED_CACHE_SIZE: int = 10000
+    # JWKS 接口的 Cache-Control max-age（秒）
+    JWKS_MAX_AGE: int = 86400
 
     # cors
     FRONTEND_HOST: str = "http://localhost:3000"
@@ -60,6 +123,28 @@ class Settings(BaseSettings):
     DB_USER: str
     DB_PASSWORD: str
     DB_NAME: str
+    # 连接池：预热时会建立 DB_POOL_SIZE 个连接
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    # 只读请求（ReadSessionDep）使用的 autocommit 连接池
+    DB_READ_POOL_SIZE: int = 10
+    DB_POOL_RECYCLE: int = 3600
+    # 软删除清理：deleted_at 早于保留期的行被物理删除
+    # PURGE_ENABLED 时由进程内后台任务按 PURGE_INTERVAL（秒）执行，也可使用 `purge-deleted` 命令
+    PURGE_ENABLED: bool = False
+    PURGE_RETENTION_DAYS: int = 30
+    PURGE_INTERVAL: float = 3600.0
+    # 每段扫描的主键窗口大小与段间休眠（秒）
+    PURGE_BATCH_SIZE: int = 1000
+    PURGE_THROTTLE: float = 0.1
+    # 迁移（app.core.online_migration）：DDL 等待锁的秒数与重试次数，只读语句的超时（秒）
+    MIGRATION_LOCK_WAIT_TIMEOUT: int = 5
+    MIGRATION_DDL_RETRIES: int = 5
+    MIGRATION_STATEMENT_TIMEOUT: float = 60.0
+    # backfill 每段的行数与段间休眠（秒），进度检查点文件
+    MIGRATION_BACKFILL_BATCH_SIZE: int = 5000
+    MIGRATION_BACKFILL_THROTTLE: float = 0.05
+    MIGRATION_CHECKPOINT_PATH: str = ".migration-checkpoint.json"
 
     @computed_field  # type: ignore[prop-decorator]
     @property
@@ -87,6 +172,30 @@ class Settings(BaseSettings):
     # LLM
     OPENAI_API_KEY: str
     OPENAI_BASE_URL: str | None = None
+    # 首包迟迟未到时发送对冲请求；延迟取最近首包耗时的分位数并夹在区间内
+    LLM_HEDGE_ENABLED: bool = True
+    LLM_HEDGE_PERCENTILE: float = 0.95
+    LLM_HEDGE_MIN_DELAY: float = 0.5
+    LLM_HEDGE_MAX_DELAY: float = 5.0
+    # 按模型熔断：失败（含超过慢调用阈值）比例达到阈值后打开，冷却后放行一次探测
+    LLM_CIRCUIT_FAILURE_RATE: float = 0.5
+    LLM_CIRCUIT_SLOW_CALL_SECONDS: float = 10.0
+    LLM_CIRCUIT_OPEN_SECONDS: float = 30.0
+    # token 用量在内存中聚合，按该间隔（秒）批量写入 llm_usage
+    LLM_USAGE_FLUSH_INTERVAL: float = 10.0
+    # 每个用户每天（UTC）的 token 配额，None 表示不限制
+    LLM_DAILY_TOKEN_QUOTA: int | None = None
+    # 匿名调用按客户端地址分别计数的每日配额（启用 SHARED_CACHE_ENABLED 时各 worker 共享计数，否则各自计数），None 表示不限制
+    LLM_ANONYMOUS_DAILY_TOKEN_QUOTA: int | None = None
+
+    # agent threads
+    # 每个 worker 在内存中缓存的活跃线程数
+    AGENT_THREAD_CACHE_SIZE: int = 256
+    # 线程消息数超过阈值后，后台压缩为最近的 AGENT_THREAD_KEEP_MESSAGES 条
+    AGENT_THREAD_COMPACT_THRESHOLD: int = 200
+    AGENT_THREAD_KEEP_MESSAGES: int = 100
+    # 流式响应期间检测客户端断开的轮询间隔（秒），断开后取消智能体运行与上游请求
+    AGENT_DISCONNECT_POLL_INTERVAL: float = 0.5
 
     # 有些配置(如密码)必须非默认值，否则抛出异常
     def _check_default_secret(self, var_name: str, value: str | None) -> None:
@@ -1,5 +1,10 @@
 from sqlalchemy import event
-from sqlalchemy.orm import ORMExecuteState, sessionmaker, with_loader_criteria
+from sqlalchemy.orm import (
+    ORMExecuteState,
+    UOWTransaction,
+    sessionmaker,
+    with_loader_criteria,
+)
 from sqlmodel import Session, create_engine, select
 
 from app.api.models import SOFT_DELETE_DATETIME, SoftDeleteModel
@@ -10,14 +15,60 @@ from app.core import (
     models as _models,  # noqa: F401  # 导入所有 table=True 模型以确保映射已注册
 )
 from app.core.config import settings
+from app.core.deadline import install_sql_deadline
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+)
+# 只读请求使用的独立连接池：连接建立时即为 autocommit，每条 SELECT 单独成为一个
+# 一致性读（效果等同 READ COMMITTED），没有 BEGIN / ROLLBACK 往返，也不会长时间持有
+# read view 拖慢 undo log 清理。归还连接时无事务可回滚，因此关闭 reset-on-return；
+# skip_autocommit_rollback（SQLAlchemy 2.0.43+）让 Session 关闭时也不再发出 ROLLBACK。
+read_engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    pool_size=settings.DB_READ_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_reset_on_return=None,
+    isolation_level="AUTOCOMMIT",
+    skip_autocommit_rollback=True,
+)
+
+
+@event.listens_for(read_engine, "connect")
+def _set_read_only(dbapi_connection, connection_record):  # noqa: ARG001
+    # 会话级只读：InnoDB 不为其分配事务 ID，任何写入都会被服务端拒绝
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(
+            "SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED, READ ONLY"
+        )
+    finally:
+        cursor.close()
+
+
+# SELECT 语句带上当前请求剩余预算的 MAX_EXECUTION_TIME 提示
+install_sql_deadline(engine)
+install_sql_deadline(read_engine)
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
 # otherwise, SQLModel might fail to initialize relationships properly
 # for more details: https://github.com/fastapi/full-stack-fastapi-template/issues/28
 
-SessionLocal = sessionmaker(bind=engine, class_=Session)
+# 提交后不过期已加载的对象：主键（uuid7）与时间戳都在客户端生成，内存中的值即数据库中的值，
+# 提交后再访问属性不会触发整行重新加载。只有服务端计算的列需要显式 refresh。
+SessionLocal = sessionmaker(bind=engine, class_=Session, expire_on_commit=False)
+# 只读会话：不 autoflush，flush 或 ORM 写语句都会抛出 ReadOnlySessionError
+ReadSessionLocal = sessionmaker(
+    bind=read_engine, class_=Session, autoflush=False, expire_on_commit=False
+)
+
+
+class ReadOnlySessionError(RuntimeError):
+    """在只读会话中尝试写入"""
 
 
 def _iter_subclasses(cls: type) -> list[type]:
@@ -49,7 +100,25 @@ def _soft_delete_mapped_models() -> list[type]:
 _SOFT_DELETE_MODELS: tuple[type, ...] = tuple(_soft_delete_mapped_models())
 
 
+@event.listens_for(ReadSessionLocal, "do_orm_execute")
+def _reject_writes(execute_state: ORMExecuteState):
+    # 文本 SQL 由连接上的 READ ONLY 会话设置兜底
+    if execute_state.is_insert or execute_state.is_update or execute_state.is_delete:
+        raise ReadOnlySessionError(
+            f"Write statement in a read-only session: {execute_state.statement}"
+        )
+
+
+@event.listens_for(ReadSessionLocal, "before_flush")
+def _reject_flush(session: Session, flush_context: UOWTransaction, instances):  # noqa: ARG001
+    if session.new or session.dirty or session.deleted:
+        raise ReadOnlySessionError(
+            "Cannot flush pending changes in a read-only session"
+        )
+
+
 @event.listens_for(SessionLocal, "do_orm_execute")
+@event.listens_for(ReadSessionLocal, "do_orm_execute")
 def _add_filtering_criteria(execute_state: ORMExecuteState):
     """
     自动为查询添加软删除过滤条件。
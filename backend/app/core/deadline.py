@@ -0,0 +1,152 @@
+"""
+请求截止时间（deadline）
+
+每个请求在 RequestIDMiddleware 中绑定一个 `RequestDeadline`，超时预算来自请求头
+`X-Request-Timeout`（秒），未提供时使用路由默认值（`route_timeout`）或全局默认值。
+下游工作在开始前检查剩余预算：
+
+- SQL：SELECT 语句注入 MySQL `MAX_EXECUTION_TIME` 提示，预算耗尽时不再执行语句
+- LLM 调用与 argon2 哈希：截止时间已过则直接失败，不占用上游与 CPU
+
+超时统一抛出 `DeadlineExceededError`（504, `DEADLINE_EXCEEDED`）。
+"""
+
+import re
+import time
+from collections.abc import Callable
+from contextvars import ContextVar, Token
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.api.schemas.error import DeadlineExceededError
+from app.core.metrics import counter
+
+# MySQL 因 MAX_EXECUTION_TIME 中断查询时的错误码
+MYSQL_QUERY_TIMEOUT_ERRNO = 3024
+
+_deadline_exceeded = counter(
+    "request_deadline_exceeded_total",
+    "Work refused or interrupted because the request deadline passed.",
+    ["stage"],
+)
+
+_SELECT_RE = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+
+
+class RequestDeadline:
+    """单个请求的截止时间
+
+    该对象在请求开始时放入上下文变量，之后只修改其属性：FastAPI 在线程池中执行
+    同步依赖与路由时使用的是上下文副本，共享同一个对象才能让路由级默认值生效。
+    """
+
+    def __init__(self, timeout: float | None, *, explicit: bool = False):
+        self.expires_at = time.monotonic() + timeout if timeout is not None else None
+        # 由客户端请求头指定的预算优先于路由默认值
+        self.explicit = explicit
+
+    def apply_default(self, timeout: float) -> None:
+        if self.explicit:
+            return
+        expires_at = time.monotonic() + timeout
+        if self.expires_at is None or expires_at < self.expires_at:
+            self.expires_at = expires_at
+
+    def remaining(self) -> float | None:
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+
+_current_deadline: ContextVar[RequestDeadline | None] = ContextVar(
+    "request_deadline", default=None
+)
+
+
+def parse_timeout_header(value: str | None, *, maximum: float) -> float | None:
+    """解析超时请求头（秒），非法值按未提供处理"""
+    if value is None:
+        return None
+    try:
+        timeout = float(value)
+    except ValueError:
+        return None
+    if timeout != timeout:  # NaN
+        return None
+    return min(timeout, maximum)
+
+
+def bind_deadline(deadline: RequestDeadline) -> Token[RequestDeadline | None]:
+    return _current_deadline.set(deadline)
+
+
+def reset_deadline(token: Token[RequestDeadline | None]) -> None:
+    _current_deadline.reset(token)
+
+
+def current_deadline() -> RequestDeadline | None:
+    return _current_deadline.get()
+
+
+def remaining_time() -> float | None:
+    """当前请求剩余的秒数；没有截止时间时返回 None"""
+    deadline = _current_deadline.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+def check_deadline(stage: str) -> None:
+    """截止时间已过时抛出 `DeadlineExceededError`，在开始昂贵工作前调用"""
+    deadline = _current_deadline.get()
+    if deadline is not None and deadline.expired:
+        _deadline_exceeded.inc(stage=stage)
+        raise DeadlineExceededError(f"Request deadline exceeded before {stage}")
+
+
+def route_timeout(seconds: float) -> Callable[[], Any]:
+    """路由级默认超时，用法：`dependencies=[Depends(route_timeout(5))]`
+
+    只会收紧截止时间；请求头显式指定的预算优先。
+    """
+
+    async def _apply() -> None:
+        deadline = _current_deadline.get()
+        if deadline is not None:
+            deadline.apply_default(seconds)
+        check_deadline("request")
+
+    return _apply
+
+
+def install_sql_deadline(engine: Engine) -> None:
+    """让该引擎上的语句遵守当前请求的截止时间"""
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def _apply_deadline(conn, cursor, statement, parameters, context, executemany):  # noqa: ARG001
+        remaining = remaining_time()
+        if remaining is None:
+            return statement, parameters
+        if remaining <= 0:
+            _deadline_exceeded.inc(stage="sql")
+            raise DeadlineExceededError(
+                "Request deadline exceeded before SQL execution"
+            )
+        if conn.dialect.name == "mysql" and _SELECT_RE.match(statement):
+            ms = max(1, int(remaining * 1000))
+            statement = _SELECT_RE.sub(
+                f"SELECT /*+ MAX_EXECUTION_TIME({ms}) */", statement, count=1
+            )
+        return statement, parameters
+
+
+def is_query_timeout(exc: BaseException) -> bool:
+    """是否为 MySQL 因 MAX_EXECUTION_TIME 中断查询产生的错误"""
+    orig = getattr(exc, "orig", None)
+    args: tuple[Any, ...] = getattr(orig, "args", ())
+    return bool(args) and args[0] == MYSQL_QUERY_TIMEOUT_ERRNO
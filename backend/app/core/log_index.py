@@ -0,0 +1,352 @@
+"""
+日志文件索引
+
+`setup_logger` 把 JSON 行写入 `logs/{ENV}.log`，每 10 MB 轮转并压缩。这里为活动文件与已轮转的
+归档维护一个 SQLite 侧索引（`logs/.{ENV}.index.sqlite3`），记录每一行的位置、时间、级别与
+req_id；LoggingMiddleware 的请求日志行另外记录路径、状态码与耗时：
+
+- 增量维护：活动文件只解析上次索引之后新增的完整行；归档不可变，第一次出现时索引一次；
+  活动文件被轮转（inode 或开头内容变化）后重新索引，被 retention 删除的归档从索引中移除
+- 活动文件通过 mmap 按偏移直接读取
+- 归档由 `app.core.logger.compress_log` 压缩为多个独立 gzip 成员拼接的 .gz（与 gzip / zcat
+  兼容）；索引记录每个成员的压缩区间，读取一行只解压它所在的成员
+- 此前按 zip 压缩的归档仍可索引，读取时整体解压
+
+命令行：`uv run logsearch`（scripts/logsearch.py）。
+"""
+
+import json
+import mmap
+import os
+import re
+import sqlite3
+import zipfile
+import zlib
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    head BLOB NOT NULL,
+    indexed_to INTEGER NOT NULL
+);
+-- gzip 归档中每个成员：解压后的起始偏移 → 压缩文件中的区间
+CREATE TABLE IF NOT EXISTS blocks (
+    file_id INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    PRIMARY KEY (file_id, offset)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS lines (
+    file_id INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    req_id TEXT,
+    path TEXT,
+    status INTEGER,
+    duration_ms REAL,
+    PRIMARY KEY (file_id, offset)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_lines_req_id ON lines (req_id) WHERE req_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_lines_path_ts ON lines (path, ts) WHERE path IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_lines_ts ON lines (ts);
+"""
+
+_INSERT_LINES = "INSERT OR REPLACE INTO lines VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_HEAD_BYTES = 256
+# 早于 duration_ms 字段的请求日志只能从消息中解析耗时
+_MESSAGE_DURATION = re.compile(r"\(([\d.]+)ms\)$")
+
+Row = tuple[int, int, int, int, int, str | None, str | None, int | None, float | None]
+
+
+def _parse(line: bytes) -> tuple[Any, ...] | None:
+    """(ts, level, req_id, path, status, duration_ms)；不是 loguru 序列化行时返回 None"""
+    try:
+        record = json.loads(line)["record"]
+        ts = int(record["time"]["timestamp"])
+        level = record["level"]["no"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    extra = record.get("extra") or {}
+    req, resp = extra.get("req"), extra.get("resp")
+    path = status = duration = None
+    if isinstance(req, dict) and isinstance(resp, dict):
+        path = req.get("path")
+        status = resp.get("status_code")
+        duration = extra.get("duration_ms")
+        if duration is None and (
+            match := _MESSAGE_DURATION.search(record.get("message", ""))
+        ):
+            duration = float(match.group(1))
+    return ts, level, extra.get("req_id"), path, status, duration
+
+
+def _scan(
+    file_id: int, data: Any, start: int, end: int, base: int = 0
+) -> Iterator[Row]:
+    """逐行解析 data[start:end]（必须以换行结束），偏移加上 base"""
+    position = start
+    while position < end:
+        newline = data.find(b"\n", position, end)
+        if newline < 0:
+            break
+        parsed = _parse(data[position:newline])
+        if parsed is not None:
+            yield (file_id, base + position, newline - position, *parsed)
+        position = newline + 1
+
+
+def _since_clause(since: int | None, until: int | None) -> tuple[list[str], list[Any]]:
+    clauses, params = [], []
+    if since is not None:
+        clauses.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("ts < ?")
+        params.append(until)
+    return clauses, params
+
+
+class LogIndex:
+    def __init__(self, log_dir: Path, env: str, index_path: Path | None = None):
+        self.log_dir = log_dir
+        self.env = env
+        self.active_path = log_dir / f"{env}.log"
+        self.index_path = index_path or log_dir / f".{env}.index.sqlite3"
+        self._db = sqlite3.connect(self.index_path)
+        # 索引可以随时重建，不需要持久性保证
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = OFF")
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "LogIndex":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    # ---- 维护 ----
+
+    def _archives(self) -> list[Path]:
+        return sorted(
+            [
+                *self.log_dir.glob(f"{self.env}.*.log.gz"),
+                *self.log_dir.glob(f"{self.env}.*.log.zip"),
+            ]
+        )
+
+    def _drop(self, file_id: int) -> None:
+        for table in ("lines", "blocks"):
+            self._db.execute(f"DELETE FROM {table} WHERE file_id = ?", (file_id,))
+        self._db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _register(
+        self, path: Path, kind: str, stat: os.stat_result, head: bytes
+    ) -> int:
+        cursor = self._db.execute(
+            "INSERT INTO files (name, kind, inode, size, head, indexed_to) "
+            "VALUES (?, ?, ?, ?, ?, 0)",
+            (path.name, kind, stat.st_ino, stat.st_size, head),
+        )
+        return cursor.lastrowid  # type: ignore[return-value]
+
+    def update(self) -> int:
+        """索引新增的行，返回新增的行数"""
+        known = {
+            name: (file_id, inode, size, head, indexed_to)
+            for file_id, name, inode, size, head, indexed_to in self._db.execute(
+                "SELECT id, name, inode, size, head, indexed_to FROM files"
+            )
+        }
+        added = 0
+        with self._db:
+            present = {self.active_path.name}
+            if self.active_path.exists():
+                added += self._update_active(known.get(self.active_path.name))
+            for path in self._archives():
+                present.add(path.name)
+                entry = known.get(path.name)
+                stat = path.stat()
+                if entry is not None and entry[2] == stat.st_size:
+                    continue
+                if entry is not None:
+                    self._drop(entry[0])
+                added += self._index_archive(path, stat)
+            for name, entry in known.items():
+                if name not in present:
+                    self._drop(entry[0])
+        return added
+
+    def _update_active(self, entry: tuple[Any, ...] | None) -> int:
+        stat = self.active_path.stat()
+        if stat.st_size == 0:
+            # 刚轮转出的空文件：旧的偏移已经不属于它
+            if entry is not None:
+                self._drop(entry[0])
+            return 0
+        with (
+            self.active_path.open("rb") as file,
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data,
+        ):
+            head = bytes(data[:_HEAD_BYTES])
+            if entry is not None:
+                file_id, inode, _, known_head, indexed_to = entry
+                # 轮转后是一个新文件：inode 或开头内容变化，或者比已索引的位置还短
+                if (
+                    inode != stat.st_ino
+                    or stat.st_size < indexed_to
+                    or head[: len(known_head)] != known_head
+                ):
+                    self._drop(file_id)
+                    entry = None
+            if entry is None:
+                file_id = self._register(self.active_path, "active", stat, head)
+                indexed_to = 0
+            # 只索引完整的行，正在写入的最后一行留到下次
+            end = data.rfind(b"\n", indexed_to) + 1
+            if end <= indexed_to:
+                return 0
+            rows = list(_scan(file_id, data, indexed_to, end))
+        self._db.executemany(_INSERT_LINES, rows)
+        self._db.execute(
+            "UPDATE files SET size = ?, head = ?, indexed_to = ? WHERE id = ?",
+            (stat.st_size, head, end, file_id),
+        )
+        return len(rows)
+
+    def _index_archive(self, path: Path, stat: os.stat_result) -> int:
+        data = path.read_bytes()
+        rows: list[Row] = []
+        if path.suffix == ".zip":
+            file_id = self._register(path, "zip", stat, data[:_HEAD_BYTES])
+            with zipfile.ZipFile(path) as archive:
+                content = archive.read(archive.namelist()[0])
+            rows.extend(_scan(file_id, content, 0, content.rfind(b"\n") + 1))
+        else:
+            file_id = self._register(path, "gzip", stat, data[:_HEAD_BYTES])
+            blocks = []
+            start = offset = 0
+            view = memoryview(data)
+            while start < len(data):
+                member = zlib.decompressobj(wbits=31)
+                content = member.decompress(view[start:])
+                if not member.eof:
+                    break
+                end = len(data) - len(member.unused_data)
+                blocks.append((file_id, offset, start, end))
+                rows.extend(_scan(file_id, content, 0, len(content), base=offset))
+                offset += len(content)
+                start = end
+            self._db.executemany("INSERT INTO blocks VALUES (?, ?, ?, ?)", blocks)
+        self._db.executemany(_INSERT_LINES, rows)
+        self._db.execute(
+            "UPDATE files SET indexed_to = ? WHERE id = ?", (stat.st_size, file_id)
+        )
+        return len(rows)
+
+    # ---- 查询 ----
+
+    def by_request(
+        self, req_id: str, *, since: int | None = None, until: int | None = None
+    ) -> list[bytes]:
+        """某个请求的所有日志行（含批量请求派生的 `<req_id>-<n>` 子请求），按时间排序"""
+        clauses, params = _since_clause(since, until)
+        # '.' 紧跟在 '-' 之后，区间覆盖所有以 "<req_id>-" 开头的值
+        clauses.insert(0, "(req_id = ? OR (req_id >= ? AND req_id < ?))")
+        params[:0] = [req_id, f"{req_id}-", f"{req_id}."]
+        return self._fetch(clauses, params, limit=None)
+
+    def requests(
+        self,
+        *,
+        path: str | None = None,
+        api_prefix: str = "",
+        status: tuple[int, int] | None = None,
+        min_ms: float | None = None,
+        since: int | None = None,
+        until: int | None = None,
+        limit: int | None = 100,
+    ) -> list[bytes]:
+        """请求日志行；path 为前缀，也会按 api_prefix + path 匹配"""
+        clauses, params = _since_clause(since, until)
+        clauses.append("path IS NOT NULL")
+        if path:
+            prefixes = {path, api_prefix + path} if api_prefix else {path}
+            clauses.append(
+                "(" + " OR ".join("(path >= ? AND path < ?)" for _ in prefixes) + ")"
+            )
+            for prefix in prefixes:
+                params += [prefix, prefix + "\U0010ffff"]
+        if status is not None:
+            clauses.append("status BETWEEN ? AND ?")
+            params += list(status)
+        if min_ms is not None:
+            clauses.append("duration_ms >= ?")
+            params.append(min_ms)
+        return self._fetch(clauses, params, limit=limit)
+
+    def _fetch(
+        self, clauses: list[str], params: list[Any], *, limit: int | None
+    ) -> list[bytes]:
+        sql = (
+            "SELECT lines.file_id, files.kind, files.name, offset, length FROM lines "
+            "JOIN files ON files.id = lines.file_id "
+            f"WHERE {' AND '.join(clauses)} ORDER BY ts, files.name, offset"
+        )
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return list(self._read(self._db.execute(sql, params)))
+
+    def _read(
+        self, matches: Iterable[tuple[int, str, str, int, int]]
+    ) -> Iterator[bytes]:
+        # 活动文件映射一次；gzip 按块、zip 按整个文件解压一次
+        mapped: dict[int, mmap.mmap] = {}
+        blocks: dict[tuple[int, int], bytes] = {}
+        archives: dict[int, bytes] = {}
+        try:
+            for file_id, kind, name, offset, length in matches:
+                path = self.log_dir / name
+                if kind == "active":
+                    if file_id not in mapped:
+                        with path.open("rb") as file:
+                            mapped[file_id] = mmap.mmap(
+                                file.fileno(), 0, access=mmap.ACCESS_READ
+                            )
+                    yield mapped[file_id][offset : offset + length]
+                elif kind == "gzip":
+                    block_offset, start, end = self._db.execute(
+                        "SELECT offset, start, end FROM blocks WHERE file_id = ? "
+                        "AND offset <= ? ORDER BY offset DESC LIMIT 1",
+                        (file_id, offset),
+                    ).fetchone()
+                    key = (file_id, block_offset)
+                    if key not in blocks:
+                        with path.open("rb") as file:
+                            file.seek(start)
+                            blocks[key] = zlib.decompress(
+                                file.read(end - start), wbits=31
+                            )
+                    relative = offset - block_offset
+                    yield blocks[key][relative : relative + length]
+                else:
+                    if file_id not in archives:
+                        with zipfile.ZipFile(path) as archive:
+                            archives[file_id] = archive.read(archive.namelist()[0])
+                    yield archives[file_id][offset : offset + length]
+        finally:
+            for mapping in mapped.values():
+                mapping.close()
@@ -1,4 +1,6 @@
+import gzip
 import logging
+import os
 import sys
 from types import FrameType
 
@@ -6,6 +8,9 @@ from loguru import logger
 
 from app.core.config import settings
 
+# 归档中每个 gzip 成员的大致大小（解压后）
+ARCHIVE_BLOCK_BYTES = 256 * 1024
+
 
 class InterceptHandler(logging.Handler):
     """
@@ -29,6 +34,19 @@ class InterceptHandler(logging.Handler):
         )
 
 
+def compress_log(path: str) -> None:
+    """
+    把轮转出的日志压缩为多个独立 gzip 成员拼接的 .gz（与 gzip / zcat 兼容）
+
+    每个成员以完整的行结束，日志索引（app.core.log_index）读取某一行时只需解压它所在的成员
+    """
+    with open(path, "rb") as source, open(f"{path}.gz", "wb") as target:
+        while block := source.read(ARCHIVE_BLOCK_BYTES):
+            block += source.readline()
+            target.write(gzip.compress(block, mtime=0))
+    os.remove(path)
+
+
 def setup_logger() -> None:
     """
     设置日志记录器
@@ -50,7 +68,7 @@ def setup_logger() -> None:
             serialize=True,
             rotation="10 MB",
             retention="7 days",
-            compression="zip",
+            compression=compress_log,
             backtrace=True,
             diagnose=True,
         )
@@ -9,4 +9,6 @@ Alembic 生成迁移时依赖 `SQLModel.metadata`。
 
 # ruff: noqa: F401
 
-from app.api.routes.user.models import User
+from app.api.routes.auth.models import RevokedToken
+from app.api.routes.user.models import User, UserInvalidation
+from app.llm.models import AgentThread, LLMUsage
@@ -0,0 +1,274 @@
+"""
+大表在线迁移辅助
+
+迁移中直接用 `op.execute("UPDATE ...")` 回填大表时，一条语句会长时间持有整张表的行锁并产生
+巨大的 undo；DDL 排队等待元数据锁期间还会阻塞其后的所有查询。这里提供给迁移脚本使用的辅助：
+
+- `backfill`：按主键顺序分段执行 UPDATE，每段单独提交；段间休眠、定期输出进度，
+  进度写入检查点文件，中断后重新执行迁移从断点继续
+- `online_alter`：ALTER TABLE 附带 `ALGORITHM` / `LOCK` 子句——MySQL 无法按要求在线完成时
+  直接报错，而不是悄悄锁表；等待元数据锁超时后退避重试
+- 阶段：迁移模块可以声明 `phase = "expand" | "backfill" | "contract"`（默认 expand），
+  `uv run migrate-phase <phase>` 只升级到第一个更晚阶段的迁移之前
+
+      expand    只做兼容旧代码的新增（加列、加表、加索引），发布新代码之前执行
+      backfill  回填数据，新旧代码同时在线时执行
+      contract  删除旧列、收紧约束，所有实例都切换到新代码之后执行
+
+`alembic/env.py` 为迁移连接设置锁等待与语句超时（`configure_session`），并让每个迁移单独提交
+版本号，已完成的迁移不会因为后面的迁移失败而重跑。
+
+回填的表需要以 BINARY(16) 的 `id` 为主键（本项目所有表都是如此）。
+"""
+
+import itertools
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Any, TypeVar
+from uuid import UUID
+
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import Connection, text
+from sqlalchemy.exc import OperationalError
+
+from alembic import op
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.purge import Checkpoint, is_lock_wait_timeout
+
+PHASES = ("expand", "backfill", "contract")
+# 最后一段的主键上界（BINARY(16) 按字节序比较）
+_MAX_ID = b"\xff" * 16
+
+T = TypeVar("T")
+
+
+@dataclass
+class BackfillStats:
+    rows: int = 0
+    chunks: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+
+
+def configure_session(
+    connection: Connection, *, lock_wait_timeout: int, statement_timeout: float
+) -> None:
+    """设置迁移连接的锁等待（元数据锁与行锁）与语句超时"""
+    connection.exec_driver_sql(
+        f"SET SESSION lock_wait_timeout = {int(lock_wait_timeout)}"
+    )
+    connection.exec_driver_sql(
+        f"SET SESSION innodb_lock_wait_timeout = {int(lock_wait_timeout)}"
+    )
+    # MySQL 的 max_execution_time 只作用于只读 SELECT（如回填的分段边界查询）
+    connection.exec_driver_sql(
+        f"SET SESSION max_execution_time = {int(statement_timeout * 1000)}"
+    )
+    # 会话变量在提交后仍然有效；不提交的话 alembic 会沿用这个隐式事务而不再提交
+    connection.commit()
+
+
+def _retry_on_lock_timeout(
+    fn: Callable[[], T], *, retries: int, what: str
+) -> tuple[T, int]:
+    """锁等待超时时指数退避重试，返回 (结果, 重试次数)"""
+    delay = 1.0
+    for attempt in itertools.count():
+        try:
+            return fn(), attempt
+        except OperationalError as exc:
+            if not is_lock_wait_timeout(exc) or attempt >= retries:
+                raise
+            logger.warning(
+                f"{what}: lock wait timeout, retrying in {delay:.0f}s "
+                f"({attempt + 1}/{retries})"
+            )
+            time.sleep(delay)
+            delay = min(delay * 2, 30.0)
+    raise AssertionError("unreachable")
+
+
+def online_alter(
+    table: str,
+    *clauses: str,
+    algorithm: str = "INPLACE",
+    lock: str | None = "NONE",
+) -> None:
+    """在迁移中执行 `ALTER TABLE table clauses..., ALGORITHM=..., LOCK=...`
+
+    加列优先使用 `algorithm="INSTANT", lock=None`（只改元数据）；无法在线完成的变更
+    （例如修改列类型）应拆成「加新列 → backfill → 切换」。
+    """
+    options = [f"ALGORITHM={algorithm}"] + ([f"LOCK={lock}"] if lock else [])
+    sql = f"ALTER TABLE `{table}` {', '.join([*clauses, *options])}"
+    bind = op.get_bind()
+    _retry_on_lock_timeout(
+        lambda: bind.exec_driver_sql(sql),
+        retries=settings.MIGRATION_DDL_RETRIES,
+        what=f"ALTER TABLE {table}",
+    )
+
+
+def backfill(
+    table: str,
+    assignments: str,
+    *,
+    where: str | None = None,
+    params: dict[str, Any] | None = None,
+    name: str | None = None,
+    batch_size: int | None = None,
+    throttle: float | None = None,
+    checkpoint: Checkpoint | None = None,
+    connection: Connection | None = None,
+    progress_interval: float = 10.0,
+) -> BackfillStats:
+    """按主键顺序分段执行 `UPDATE table SET assignments WHERE where`，每段单独提交
+
+    在迁移中直接调用（内部切换到 autocommit）；迁移之外使用时传入 AUTOCOMMIT 连接。
+    assignments / where 是 SQL 片段，必须可重复执行：从检查点继续时最后一段可能再执行一次。
+    name 是检查点中的键，同一张表有多个回填时需要区分。
+    """
+
+    def run(conn: Connection) -> BackfillStats:
+        return _backfill(
+            conn,
+            table=table,
+            assignments=assignments,
+            where=where,
+            params=params or {},
+            key=name or f"{table}: {assignments}",
+            batch_size=batch_size or settings.MIGRATION_BACKFILL_BATCH_SIZE,
+            throttle=settings.MIGRATION_BACKFILL_THROTTLE
+            if throttle is None
+            else throttle,
+            checkpoint=checkpoint
+            or Checkpoint(Path(settings.MIGRATION_CHECKPOINT_PATH)),
+            progress_interval=progress_interval,
+        )
+
+    if connection is not None:
+        return run(connection)
+    with op.get_context().autocommit_block():
+        return run(op.get_bind())
+
+
+def _backfill(
+    conn: Connection,
+    *,
+    table: str,
+    assignments: str,
+    where: str | None,
+    params: dict[str, Any],
+    key: str,
+    batch_size: int,
+    throttle: float,
+    checkpoint: Checkpoint,
+    progress_interval: float,
+) -> BackfillStats:
+    stats = BackfillStats()
+    started = last_report = time.monotonic()
+    resumed = checkpoint.get(key)
+    last = resumed.bytes if resumed else b""
+    if resumed:
+        logger.info(f"Backfill {key!r}: resuming after id {resumed}")
+    # 估算值，只用于进度百分比
+    estimate = (
+        conn.execute(
+            text(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+            ),
+            {"table": table},
+        ).scalar()
+        or 0
+    )
+
+    boundary = text(
+        f"SELECT id FROM `{table}` WHERE id > :last ORDER BY id LIMIT 1 OFFSET :offset"
+    )
+    condition = f" AND ({where})" if where else ""
+    update = text(
+        f"UPDATE `{table}` SET {assignments} WHERE id > :last AND id <= :upper{condition}"
+    )
+    while True:
+        upper = conn.execute(
+            boundary, {"last": last, "offset": batch_size - 1}
+        ).scalar()
+        bounds = {"last": last, "upper": upper if upper is not None else _MAX_ID}
+        result, retries = _retry_on_lock_timeout(
+            partial(conn.execute, update, {**params, **bounds}),
+            retries=settings.MIGRATION_DDL_RETRIES,
+            what=f"Backfill {key!r}",
+        )
+        stats.rows += result.rowcount
+        stats.chunks += 1
+        stats.retries += retries
+        if upper is None:
+            break
+        last = upper
+        checkpoint.set(key, UUID(bytes=last))
+
+        now = time.monotonic()
+        if now - last_report >= progress_interval:
+            last_report = now
+            scanned = stats.chunks * batch_size
+            percent = f", ~{min(99, scanned * 100 // estimate)}%" if estimate else ""
+            logger.info(
+                f"Backfill {key!r}: {stats.rows} rows updated in {stats.chunks} chunks"
+                f"{percent} ({scanned / (now - started):.0f} rows/s scanned)"
+            )
+        if throttle > 0:
+            time.sleep(throttle)
+
+    checkpoint.set(key, None)
+    stats.seconds = time.monotonic() - started
+    logger.info(
+        f"Backfill {key!r} finished: {stats.rows} rows in {stats.chunks} chunks, "
+        f"{stats.seconds:.1f}s, {stats.retries} lock retries"
+    )
+    return stats
+
+
+def migration_phase(module: Any) -> str:
+    phase = getattr(module, "phase", "expand")
+    if phase not in PHASES:
+        raise ValueError(f"Unknown migration phase {phase!r} in {module.__name__}")
+    return phase
+
+
+def plan_phase(pending: Sequence[tuple[str, str]], phase: str) -> str | None:
+    """pending 为按升级顺序排列的 (revision, phase)，返回只执行到 phase 为止的目标版本"""
+    rank = PHASES.index(phase)
+    target = None
+    for revision, revision_phase in pending:
+        if PHASES.index(revision_phase) > rank:
+            break
+        target = revision
+    return target
+
+
+def phase_target(config: Config, phase: str) -> str | None:
+    """按数据库当前版本计算 `alembic upgrade` 的目标；没有可执行的迁移时返回 None"""
+    from app.core.db import engine
+
+    script = ScriptDirectory.from_config(config)
+    with engine.connect() as conn:
+        current = MigrationContext.configure(conn).get_current_revision()
+    pending = [
+        revision
+        for revision in script.iterate_revisions(
+            script.get_current_head(), current or "base"
+        )
+        if revision.revision != current
+    ]
+    pending.reverse()
+    return plan_phase(
+        [(revision.revision, migration_phase(revision.module)) for revision in pending],
+        phase,
+    )
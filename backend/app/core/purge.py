@@ -0,0 +1,294 @@
+"""
+软删除数据清理
+
+`SoftDeleteModel` 的删除只是写入 deleted_at，行一直留在表、唯一索引与每次过滤查询中。
+这里定期把 deleted_at 早于保留期的行物理删除（可选先归档为 NDJSON）：
+
+- 按主键顺序逐段扫描：每段只读取主键窗口内的 `PURGE_BATCH_SIZE` 行（一致性读，不加锁），
+  在内存中挑出过期行，再按主键列表删除，每段一个短事务
+- 删除时重新校验 deleted_at，期间被恢复的行不会误删；线上请求不会读写已删除的行，
+  主键等值删除只锁这些行本身，不会阻塞线上写入
+- 本连接的锁等待超时设为 1 秒，万一冲突由清理任务让步，跳过该段，下一轮再处理
+- 段与段之间休眠 `PURGE_THROTTLE` 秒，限制对主库与复制延迟的影响
+- 进度（每张表最后处理的主键）写入检查点文件，中断后从断点继续
+- 通过 MySQL `GET_LOCK` 保证多个 worker / 实例中同一时间只有一个在清理
+
+命令行：`uv run purge-deleted`；进程内：设置 `PURGE_ENABLED=true` 后由 lifespan 定期执行。
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import Connection, Table, delete, func, select
+from sqlalchemy.exc import OperationalError
+
+from app.api.models import SOFT_DELETE_DATETIME
+from app.core.config import settings
+from app.core.db import _SOFT_DELETE_MODELS, engine
+from app.core.logger import logger
+from app.core.metrics import counter
+
+PURGE_LOCK_NAME = "soft_delete_purge"
+# MySQL 锁等待超时的错误码
+MYSQL_LOCK_WAIT_TIMEOUT_ERRNO = 1205
+
+_purged_rows = counter(
+    "soft_delete_purged_rows_total",
+    "Soft-deleted rows removed by the purge job.",
+    ["table"],
+)
+_skipped_chunks = counter(
+    "soft_delete_purge_skipped_chunks_total",
+    "Purge chunks skipped because of a lock wait timeout.",
+    ["table"],
+)
+
+
+@dataclass
+class TableProgress:
+    scanned: int = 0
+    purged: int = 0
+    skipped_chunks: int = 0
+    done: bool = False
+
+
+@dataclass
+class PurgeStats:
+    cutoff: datetime
+    tables: dict[str, TableProgress] = field(default_factory=dict)
+
+    @property
+    def purged(self) -> int:
+        return sum(progress.purged for progress in self.tables.values())
+
+
+class Checkpoint:
+    """每张表（或每个回填任务）最后处理完的主键；path 为空时只保存在内存中"""
+
+    def __init__(self, path: Path | None = None):
+        self.path = path
+        self._positions: dict[str, str] = {}
+        if path is not None and path.exists():
+            self._positions = json.loads(path.read_text())
+
+    def get(self, table: str) -> UUID | None:
+        value = self._positions.get(table)
+        return UUID(value) if value else None
+
+    def set(self, table: str, last_id: UUID | None) -> None:
+        if last_id is None:
+            self._positions.pop(table, None)
+        else:
+            self._positions[table] = str(last_id)
+        if self.path is not None:
+            # 先写临时文件再替换，中断时不会留下半个检查点
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(json.dumps(self._positions))
+            tmp.replace(self.path)
+
+
+def is_lock_wait_timeout(exc: OperationalError) -> bool:
+    """驱动错误是否为 InnoDB 锁等待超时（可以重试该语句）"""
+    args: tuple[Any, ...] = getattr(exc.orig, "args", ())
+    return bool(args) and args[0] == MYSQL_LOCK_WAIT_TIMEOUT_ERRNO
+
+
+def _archive(archive_dir: Path, table: Table, rows: list[dict[str, Any]]) -> None:
+    # 归档先于删除落盘；删除失败后重试可能产生重复的归档行
+    with (archive_dir / f"{table.name}.ndjson").open("a", encoding="utf-8") as out:
+        for row in rows:
+            out.write(json.dumps(row, default=str, ensure_ascii=False) + "\n")
+        out.flush()
+
+
+def _purge_chunk(
+    conn: Connection,
+    table: Table,
+    after: UUID | None,
+    *,
+    cutoff: datetime,
+    batch_size: int,
+    archive_dir: Path | None,
+) -> tuple[UUID | None, int, int]:
+    """处理主键 > after 的下一段，返回 (本段最后的主键, 扫描行数, 删除行数)"""
+    window = (
+        select(table.c.id, table.c.deleted_at).order_by(table.c.id).limit(batch_size)
+    )
+    if after is not None:
+        window = window.where(table.c.id > after)
+    rows = conn.execute(window).all()
+    if not rows:
+        conn.rollback()
+        return None, 0, 0
+    expired = [
+        row.id for row in rows if SOFT_DELETE_DATETIME < _aware(row.deleted_at) < cutoff
+    ]
+    purged = 0
+    if expired:
+        if archive_dir is not None:
+            records = conn.execute(
+                select(table).where(table.c.id.in_(expired)).order_by(table.c.id)
+            ).mappings()
+            _archive(archive_dir, table, [dict(record) for record in records])
+        result = conn.execute(
+            delete(table).where(
+                table.c.id.in_(expired),
+                table.c.deleted_at != SOFT_DELETE_DATETIME,
+                table.c.deleted_at < cutoff,
+            )
+        )
+        purged = result.rowcount
+    conn.commit()
+    return rows[-1].id, len(rows), purged
+
+
+def _aware(value: datetime) -> datetime:
+    # MySQL DATETIME 读出为 naive，按 UTC 解释
+    return value if value.tzinfo else value.replace(tzinfo=UTC)
+
+
+def purge_soft_deleted(
+    *,
+    retention: timedelta,
+    batch_size: int,
+    throttle: float,
+    checkpoint: Checkpoint | None = None,
+    archive_dir: Path | None = None,
+    tables: list[str] | None = None,
+    on_progress: Callable[[str, TableProgress], None] | None = None,
+    stop: threading.Event | None = None,
+) -> PurgeStats | None:
+    """清理所有软删除表中过期的行（阻塞调用）
+
+    已有其他进程在清理时返回 None；stop 被设置后在当前段结束时退出，下次从检查点继续。
+    """
+    checkpoint = checkpoint or Checkpoint()
+    stats = PurgeStats(cutoff=datetime.now(UTC) - retention)
+    if archive_dir is not None:
+        archive_dir.mkdir(parents=True, exist_ok=True)
+
+    with engine.connect() as conn:
+        if not conn.execute(select(func.get_lock(PURGE_LOCK_NAME, 0))).scalar():
+            conn.rollback()
+            logger.info("Soft-delete purge already running elsewhere, skipping")
+            return None
+        try:
+            conn.exec_driver_sql("SET SESSION innodb_lock_wait_timeout = 1")
+            for model in _SOFT_DELETE_MODELS:
+                table: Table = model.__table__  # type: ignore[attr-defined]
+                if tables is not None and table.name not in tables:
+                    continue
+                stats.tables[table.name] = _purge_table(
+                    conn,
+                    table,
+                    checkpoint,
+                    cutoff=stats.cutoff,
+                    batch_size=batch_size,
+                    throttle=throttle,
+                    archive_dir=archive_dir,
+                    on_progress=on_progress,
+                    stop=stop,
+                )
+                if stop is not None and stop.is_set():
+                    break
+        finally:
+            # 连接会回到连接池，恢复会话变量，避免影响线上请求
+            conn.rollback()
+            conn.exec_driver_sql("SET SESSION innodb_lock_wait_timeout = DEFAULT")
+            conn.execute(select(func.release_lock(PURGE_LOCK_NAME)))
+            conn.commit()
+    return stats
+
+
+def _purge_table(
+    conn: Connection,
+    table: Table,
+    checkpoint: Checkpoint,
+    *,
+    cutoff: datetime,
+    batch_size: int,
+    throttle: float,
+    archive_dir: Path | None,
+    on_progress: Callable[[str, TableProgress], None] | None,
+    stop: threading.Event | None,
+) -> TableProgress:
+    progress = TableProgress()
+    after = checkpoint.get(table.name)
+    while stop is None or not stop.is_set():
+        try:
+            last_id, scanned, purged = _purge_chunk(
+                conn,
+                table,
+                after,
+                cutoff=cutoff,
+                batch_size=batch_size,
+                archive_dir=archive_dir,
+            )
+        except OperationalError as exc:
+            if not is_lock_wait_timeout(exc):
+                raise
+            # 与线上请求冲突时让步：跳过这一段，留给下一轮
+            conn.rollback()
+            progress.skipped_chunks += 1
+            _skipped_chunks.inc(table=table.name)
+            last_id, scanned, purged = _window_end(conn, table, after, batch_size), 0, 0
+        if last_id is None:
+            progress.done = True
+            checkpoint.set(table.name, None)
+            break
+        after = last_id
+        progress.scanned += scanned
+        progress.purged += purged
+        _purged_rows.inc(purged, table=table.name)
+        checkpoint.set(table.name, after)
+        if on_progress is not None:
+            on_progress(table.name, progress)
+        if throttle:
+            time.sleep(throttle)
+    logger.info(
+        f"Purged {progress.purged} soft-deleted rows from {table.name} "
+        f"(scanned {progress.scanned}, skipped {progress.skipped_chunks} chunks)"
+    )
+    return progress
+
+
+def _window_end(
+    conn: Connection, table: Table, after: UUID | None, batch_size: int
+) -> UUID | None:
+    window = select(table.c.id).order_by(table.c.id).limit(batch_size)
+    if after is not None:
+        window = window.where(table.c.id > after)
+    ids = conn.execute(window).scalars().all()
+    conn.rollback()
+    return ids[-1] if ids else None
+
+
+async def run_purger(interval: float) -> None:
+    """按间隔在后台线程中执行清理，直到被取消"""
+    checkpoint = Checkpoint()
+    # 取消不会中断线程，通过事件让进行中的清理在当前段结束后退出
+    stop = threading.Event()
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(
+                    purge_soft_deleted,
+                    retention=timedelta(days=settings.PURGE_RETENTION_DAYS),
+                    batch_size=settings.PURGE_BATCH_SIZE,
+                    throttle=settings.PURGE_THROTTLE,
+                    checkpoint=checkpoint,
+                    stop=stop,
+                )
+            except Exception:
+                logger.exception("Soft-delete purge failed")
+    finally:
+        stop.set()
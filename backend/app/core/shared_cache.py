@@ -0,0 +1,353 @@
+"""
+跨 worker 共享内存缓存
+
+`fastapi run --workers N` / `uv run start` 下每个 worker 都有自己的进程内缓存，同一份热数据
+要未命中 N 次、占用 N 份内存。这里用 `multiprocessing.shared_memory` 在同一台机器的所有
+worker 之间共享一张定长的开放寻址哈希表，适合小而热、读多写少的数据（认证用户记录、
+限流计数、幂等结果等）。
+
+存储布局：头部之后是 `SHARED_CACHE_SLOTS` 个定长槽位，每个槽位为
+
+    seq(u64) | key_hash(u64) | expires_at(f64) | key_len(u16) | value_len(u16) | crc32(u32)
+    | key（SHARED_CACHE_KEY_BYTES）| value（SHARED_CACHE_VALUE_BYTES）
+
+- 键按哈希落到起始槽位，向后线性探测最多 `MAX_PROBE` 个槽位；窗口内没有空位时淘汰
+  最早过期的一项。查找总是扫描整个窗口，因此删除不需要墓碑
+- 读：seqlock，不加锁。读取 seq（奇数表示正在写入则重试）→ 复制整个槽位 → 再读 seq，
+  两次一致且 crc32 校验通过才采用；版本不一致时重试，多次失败按未命中处理
+- 写：对锁文件做字节范围锁（`fcntl.lockf`），先锁键的起始槽位（同一个键的写入串行），
+  再锁目标槽位；写入前后各把该槽位的 seq 加一。扫描时有槽位正被写入、无法判断键是否在
+  其中时重新扫描，重试多次仍不行则抛出 `CacheBusyError`（`set` 放弃本次写入）
+
+缓存中的数据可以随时丢失（重启、淘汰、过期），调用方必须能回源。
+共享内存段在 worker 退出后仍然存在，由 `uv run start` 在启动前与退出后删除。
+"""
+
+import fcntl
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from functools import cache
+from hashlib import blake2b
+from multiprocessing import shared_memory
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.logger import logger
+
+MAX_PROBE = 8
+_MAGIC = 0x53434143  # "SCAC"
+_LAYOUT_VERSION = 1
+# magic, layout version, slots, key bytes, value bytes
+_HEADER = struct.Struct("<IIQII")
+_HEADER_SIZE = 64
+_SLOT_HEADER = struct.Struct("<QQdHHI")
+_SEQ = struct.Struct("<Q")
+_INT = struct.Struct("<q")
+_READ_RETRIES = 16
+_WRITE_RETRIES = 100
+
+
+class CacheBusyError(RuntimeError):
+    """写入时键所在的探测窗口持续被其他写入者占用"""
+
+
+def _hash(key: bytes) -> int:
+    return int.from_bytes(blake2b(key, digest_size=8).digest(), "little")
+
+
+def _mapped(shm: shared_memory.SharedMemory) -> memoryview:
+    buf = shm.buf
+    if buf is None:
+        raise RuntimeError(f"Shared memory {shm.name!r} is not mapped")
+    return buf
+
+
+class SharedCache:
+    """定长、开放寻址、seqlock 读的共享内存哈希表"""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        slots: int,
+        key_bytes: int = 64,
+        value_bytes: int = 448,
+    ):
+        if slots < MAX_PROBE or key_bytes <= 0 or not 0 < value_bytes < 1 << 16:
+            raise ValueError("invalid shared cache geometry")
+        self.name = name
+        self.slots = slots
+        self.key_bytes = key_bytes
+        self.value_bytes = value_bytes
+        # 按 64 字节对齐，避免相邻槽位落在同一缓存行
+        self.slot_size = -(-(_SLOT_HEADER.size + key_bytes + value_bytes) // 64) * 64
+        self._shm = self._open(_HEADER_SIZE + slots * self.slot_size)
+        self._buf = _mapped(self._shm)
+        # fcntl 锁按进程持有，同一进程内的线程之间另外用线程锁互斥
+        self._thread_lock = threading.Lock()
+        lock_path = Path(tempfile.gettempdir()) / f"{name}.lock"
+        self._lock_fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+
+    def _open(self, size: int) -> shared_memory.SharedMemory:
+        # track=False：不让 resource_tracker 在创建它的 worker 退出时删除共享内存
+        try:
+            shm = shared_memory.SharedMemory(
+                self.name, create=True, size=size, track=False
+            )
+        except FileExistsError:
+            shm = shared_memory.SharedMemory(self.name, track=False)
+        else:
+            _HEADER.pack_into(
+                _mapped(shm),
+                0,
+                _MAGIC,
+                _LAYOUT_VERSION,
+                self.slots,
+                self.key_bytes,
+                self.value_bytes,
+            )
+            return shm
+        # 其他 worker 可能刚创建、尚未写入头部
+        deadline = time.monotonic() + 1
+        while True:
+            header = _HEADER.unpack_from(_mapped(shm), 0)
+            if header[0] == _MAGIC or time.monotonic() > deadline:
+                break
+            time.sleep(0.001)
+        expected = (
+            _MAGIC,
+            _LAYOUT_VERSION,
+            self.slots,
+            self.key_bytes,
+            self.value_bytes,
+        )
+        if header != expected or shm.size < size:
+            shm.close()
+            raise RuntimeError(
+                f"Shared memory {self.name!r} exists with a different layout; "
+                "change SHARED_CACHE_NAME or remove the stale segment"
+            )
+        return shm
+
+    def close(self) -> None:
+        self._shm.close()
+        os.close(self._lock_fd)
+
+    def unlink(self) -> None:
+        """删除共享内存段（通常只在所有 worker 退出后由启动器调用）"""
+        self._shm.unlink()
+
+    # ---- 读 ----
+
+    def _offset(self, slot: int) -> int:
+        return _HEADER_SIZE + slot * self.slot_size
+
+    def _window(self, key_hash: int) -> Iterator[int]:
+        home = key_hash % self.slots
+        for i in range(MAX_PROBE):
+            yield (home + i) % self.slots
+
+    def _read_slot(self, slot: int) -> tuple[int, bytes] | None:
+        """一致地读取整个槽位，返回 (seq, 槽位内容)；持续被写入时返回 None"""
+        offset = self._offset(slot)
+        end = offset + self.slot_size
+        buf = self._buf
+        for _ in range(_READ_RETRIES):
+            (seq,) = _SEQ.unpack_from(buf, offset)
+            if seq & 1:
+                continue
+            raw = bytes(buf[offset:end])
+            if _SEQ.unpack_from(buf, offset)[0] == seq:
+                return seq, raw
+        return None
+
+    def _match(self, raw: bytes, key: bytes, key_hash: int, now: float) -> bytes | None:
+        _, stored_hash, expires_at, key_len, value_len, crc = _SLOT_HEADER.unpack_from(
+            raw
+        )
+        if stored_hash != key_hash or key_len != len(key):
+            return None
+        if expires_at and expires_at <= now:
+            return None
+        start = _SLOT_HEADER.size
+        if raw[start : start + key_len] != key:
+            return None
+        value_start = start + self.key_bytes
+        value = raw[value_start : value_start + value_len]
+        if zlib.crc32(value, zlib.crc32(key)) != crc:
+            return None
+        return value
+
+    def get(self, key: bytes) -> bytes | None:
+        key_hash = _hash(key)
+        now = time.time()
+        for slot in self._window(key_hash):
+            read = self._read_slot(slot)
+            if read is None:
+                continue
+            value = self._match(read[1], key, key_hash, now)
+            if value is not None:
+                return value
+        return None
+
+    # ---- 写 ----
+
+    @contextmanager
+    def _locked(self, index: int) -> Iterator[None]:
+        fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, 1, index)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, index)
+
+    def _write_slot(
+        self,
+        slot: int,
+        seq: int,
+        key: bytes,
+        key_hash: int,
+        value: bytes,
+        expires_at: float,
+    ) -> None:
+        offset = self._offset(slot)
+        buf = self._buf
+        # seq 为奇数期间读者会重试
+        _SEQ.pack_into(buf, offset, seq + 1)
+        start = offset + _SLOT_HEADER.size
+        buf[start : start + len(key)] = key
+        value_start = start + self.key_bytes
+        buf[value_start : value_start + len(value)] = value
+        crc = zlib.crc32(value, zlib.crc32(key)) if key else 0
+        _SLOT_HEADER.pack_into(
+            buf, offset, seq + 1, key_hash, expires_at, len(key), len(value), crc
+        )
+        _SEQ.pack_into(buf, offset, seq + 2)
+
+    def _update(
+        self,
+        key: bytes,
+        compute: Callable[[bytes | None], bytes | None],
+        ttl: float | None,
+    ) -> bytes | None:
+        """在写锁内读取当前值并写入 compute 的结果（None 表示删除）"""
+        if len(key) > self.key_bytes:
+            raise ValueError(f"key longer than {self.key_bytes} bytes")
+        key_hash = _hash(key)
+        home = key_hash % self.slots
+        with self._thread_lock, self._locked(home):
+            for _ in range(_WRITE_RETRIES):
+                now = time.time()
+                current: bytes | None = None
+                target: tuple[int, int] | None = None  # (slot, seq)
+                free: tuple[int, int] | None = None
+                victim: tuple[float, int, int] | None = None
+                busy = False
+                for slot in self._window(key_hash):
+                    read = self._read_slot(slot)
+                    if read is None:
+                        busy = True
+                        continue
+                    seq, raw = read
+                    value = self._match(raw, key, key_hash, now)
+                    if value is not None:
+                        current, target = value, (slot, seq)
+                        break
+                    _, _, expires_at, key_len, _, _ = _SLOT_HEADER.unpack_from(raw)
+                    if key_len == 0 or (expires_at and expires_at <= now):
+                        free = free or (slot, seq)
+                    elif victim is None or (expires_at or float("inf")) < victim[0]:
+                        victim = (expires_at or float("inf"), slot, seq)
+                # 键可能就在正被写入的槽位中，此时按不存在处理会丢失更新
+                if target is None and busy:
+                    time.sleep(0)
+                    continue
+
+                new_value = compute(current)
+                if new_value is None:
+                    if target is None:
+                        return None
+                    slot, seq = target
+                    with self._locked(self.slots + slot):
+                        if _SEQ.unpack_from(self._buf, self._offset(slot))[0] != seq:
+                            continue
+                        self._write_slot(slot, seq, b"", 0, b"", 0.0)
+                    return None
+
+                if len(new_value) > self.value_bytes:
+                    raise ValueError(f"value longer than {self.value_bytes} bytes")
+                if target is None:
+                    target = free or (victim[1:] if victim else None)
+                assert target is not None  # 窗口内每个槽位都已读出
+                slot, seq = target
+                expires_at = now + ttl if ttl else 0.0
+                with self._locked(self.slots + slot):
+                    # 扫描之后槽位被其他键的写入者改动过，重新扫描
+                    if _SEQ.unpack_from(self._buf, self._offset(slot))[0] != seq:
+                        continue
+                    self._write_slot(slot, seq, key, key_hash, new_value, expires_at)
+                return new_value
+        raise CacheBusyError(f"Probe window of {key!r} stayed busy")
+
+    def get_int(self, key: bytes) -> int:
+        """读取 `incr` 维护的计数，不存在时为 0"""
+        value = self.get(key)
+        return _INT.unpack(value)[0] if value is not None else 0
+
+    def set(self, key: bytes, value: bytes, ttl: float | None = None) -> None:
+        """写入失败（`CacheBusyError`）时放弃：缓存中的数据本来就可能丢失"""
+        try:
+            self._update(key, lambda _: value, ttl)
+        except CacheBusyError:
+            logger.warning(f"Shared cache busy, dropped write of {key!r}")
+
+    def delete(self, key: bytes) -> None:
+        self._update(key, lambda _: None, None)
+
+    def incr(self, key: bytes, amount: int = 1, ttl: float | None = None) -> int:
+        """原子地加上 amount 并返回新值；键不存在或已过期时从 0 开始（限流计数）
+
+        与 `delete` 一样，无法完成时抛出 `CacheBusyError`，不会悄悄丢失更新。
+        """
+        result = self._update(
+            key,
+            lambda current: _INT.pack(
+                (_INT.unpack(current)[0] if current else 0) + amount
+            ),
+            ttl,
+        )
+        assert result is not None
+        return _INT.unpack(result)[0]
+
+
+def remove_segment(name: str) -> bool:
+    """删除名为 name 的共享内存段，返回是否存在；worker 仍在使用时只是解除名称关联"""
+    try:
+        shm = shared_memory.SharedMemory(name, track=False)
+    except FileNotFoundError:
+        return False
+    shm.close()
+    shm.unlink()
+    return True
+
+
+@cache
+def get_shared_cache() -> SharedCache | None:
+    """按 Settings 打开（或创建）本机共享缓存；未启用或打开失败时返回 None"""
+    if not settings.SHARED_CACHE_ENABLED:
+        return None
+    try:
+        return SharedCache(
+            settings.SHARED_CACHE_NAME,
+            slots=settings.SHARED_CACHE_SLOTS,
+            key_bytes=settings.SHARED_CACHE_KEY_BYTES,
+            value_bytes=settings.SHARED_CACHE_VALUE_BYTES,
+        )
+    except (OSError, RuntimeError):
+        logger.exception("Opening the shared cache failed, continuing without it")
+        return None
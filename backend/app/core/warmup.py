@@ -0,0 +1,103 @@
+"""
+启动预热
+
+在 lifespan 启动阶段（uvicorn 开始 accept 之前）执行，把首个请求才会付出的一次性
+开销提前：
+
+- 数据库连接池：读写池与只读池分别同时检出 `DB_POOL_SIZE` / `DB_READ_POOL_SIZE` 个
+  连接，让池中保有最小数量的已建立连接
+- SQL：执行一遍热点查询，填充 SQLAlchemy 的 mapper 配置与语句编译缓存
+- 模型客户端：实例化各档位的 chat client（含 HTTP 连接池）
+- argon2：计算一次哈希，完成参数初始化与内存分配
+
+单个阶段失败只记录日志，不阻止服务启动。
+"""
+
+import time
+from collections.abc import Callable
+from uuid import UUID
+
+from sqlalchemy import Engine
+from sqlmodel import select
+
+from app.api.routes.user.models import User
+from app.api.routes.user.service import get_password_hash, get_user_by_email
+from app.core.config import settings
+from app.core.db import SessionLocal, engine, read_engine
+from app.core.logger import logger
+from app.core.metrics import gauge
+from app.llm.chat_client import ChatClientContext, get_chat_client
+from app.llm.models import AgentThread
+
+_warmup_seconds = gauge(
+    "app_warmup_seconds", "Duration of each startup warmup stage.", ["stage"]
+)
+
+# 预热查询使用的占位参数，不会命中真实数据
+_WARMUP_ID = UUID(int=0)
+_WARMUP_EMAIL = "warmup@invalid"
+_WARMUP_THREAD_ID = "__warmup__"
+
+
+def warm_db_pool(pool_engine: Engine, size: int) -> None:
+    connections = []
+    try:
+        # 必须同时持有，否则同一个连接会被反复检出
+        for _ in range(size):
+            connection = pool_engine.connect()
+            connections.append(connection)
+            connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+def warm_statements() -> None:
+    with SessionLocal() as session:
+        get_user_by_email(session=session, email=_WARMUP_EMAIL)
+        session.get(User, _WARMUP_ID)
+        session.exec(
+            select(AgentThread.version).where(
+                AgentThread.thread_id == _WARMUP_THREAD_ID
+            )
+        ).first()
+        session.exec(
+            select(AgentThread).where(AgentThread.thread_id == _WARMUP_THREAD_ID)
+        ).first()
+
+
+def warm_chat_clients() -> None:
+    for context in ChatClientContext:
+        get_chat_client(context)
+
+
+def warm_password_hash() -> None:
+    get_password_hash("warmup")
+
+
+def run_warmup(pool_size: int) -> dict[str, float]:
+    """依次执行各预热阶段，返回每个阶段的耗时（秒）"""
+    stages: list[tuple[str, Callable[[], None]]] = [
+        ("db_pool", lambda: warm_db_pool(engine, pool_size)),
+        ("read_db_pool", lambda: warm_db_pool(read_engine, settings.DB_READ_POOL_SIZE)),
+        ("sql", warm_statements),
+        ("chat_clients", warm_chat_clients),
+        ("password_hash", warm_password_hash),
+    ]
+    durations: dict[str, float] = {}
+    for name, stage in stages:
+        started = time.perf_counter()
+        try:
+            stage()
+        except Exception:
+            logger.exception(f"Warmup stage {name} failed")
+            continue
+        durations[name] = time.perf_counter() - started
+        _warmup_seconds.set(durations[name], stage=name)
+    logger.info(
+        "Warmup finished: "
+        + ", ".join(
+            f"{name}={seconds * 1000:.0f}ms" for name, seconds in durations.items()
+        )
+    )
+    return durations
@@ -1,12 +1,24 @@
 from __future__ import annotations
 
+from collections.abc import AsyncGenerator, Callable
 from textwrap import dedent
-from typing import Annotated
+from typing import Annotated, Any
 
+from ag_ui.core import BaseEvent, StateSnapshotEvent
 from agent_framework import ChatAgent, ChatClientProtocol, ai_function
 from agent_framework_ag_ui import AgentFrameworkAgent
 from pydantic import Field
 
+from app.llm import state as proverbs_state
+from app.llm.state import (
+    SharedState,
+    SharedStateContextProvider,
+    StateReducerError,
+    bind_shared_state,
+    current_shared_state,
+)
+from app.llm.tools import cached_ai_function, tool_stats_middleware
+
 STATE_SCHEMA: dict[str, object] = {
     "proverbs": {
         "type": "array",
@@ -15,37 +27,89 @@ STATE_SCHEMA: dict[str, object] = {
     }
 }
 
-PREDICT_STATE_CONFIG: dict[str, dict[str, str]] = {
-    "proverbs": {
-        "tool": "update_proverbs",
-        "tool_argument": "proverbs",
-    }
-}
+
+def _apply(action: Callable[..., list[proverbs_state.JsonPatchOp]], *args: Any) -> str:
+    """Apply one reducer action to the run's canonical state and queue its patch."""
+    shared = current_shared_state()
+    try:
+        ops = action(shared.proverbs, *args)
+    except StateReducerError as exc:
+        return f"No change: {exc}"
+    shared.pending.extend(ops)
+    return f"Done. Tracking {len(shared.proverbs)} item(s)."
+
+
+@ai_function(
+    name="add_proverb",
+    description="Insert exactly one proverb. Omit `index` to append it to the end.",
+)
+def add_proverb(
+    proverb: Annotated[str, Field(description="The proverb text.")],
+    index: Annotated[
+        int | None,
+        Field(ge=0, description="0-based position to insert at. Omit to append."),
+    ] = None,
+) -> str:
+    """Insert a single proverb."""
+    return _apply(proverbs_state.add_proverb, proverb, index)
+
+
+@ai_function(name="remove_proverb", description="Remove the proverb at `index`.")
+def remove_proverb(
+    index: Annotated[int, Field(ge=0, description="0-based position in the list.")],
+) -> str:
+    """Remove a single proverb."""
+    return _apply(proverbs_state.remove_proverb, index)
+
+
+@ai_function(
+    name="move_proverb",
+    description="Move the proverb at `from_index` so that it ends up at `to_index`.",
+)
+def move_proverb(
+    from_index: Annotated[
+        int, Field(ge=0, description="0-based position of the proverb to move.")
+    ],
+    to_index: Annotated[
+        int, Field(ge=0, description="0-based position it should end up at.")
+    ],
+) -> str:
+    """Reorder a single proverb."""
+    return _apply(proverbs_state.move_proverb, from_index, to_index)
+
+
+@ai_function(
+    name="replace_proverb",
+    description="Replace the text of the proverb at `index`.",
+)
+def replace_proverb(
+    index: Annotated[int, Field(ge=0, description="0-based position in the list.")],
+    proverb: Annotated[str, Field(description="The new proverb text.")],
+) -> str:
+    """Rewrite a single proverb in place."""
+    return _apply(proverbs_state.replace_proverb, index, proverb)
 
 
 @ai_function(
     name="update_proverbs",
     description=(
-        "Replace the entire list of proverbs with the provided values. "
-        "Always include every proverb you want to keep."
+        "Replace the entire list of proverbs. Only use this for bulk rewrites "
+        "(e.g. sorting or clearing everything); prefer the single-item tools."
     ),
 )
 def update_proverbs(
     proverbs: Annotated[
         list[str],
-        Field(
-            description=(
-                "The complete source of truth for the user's proverbs. "
-                "Maintain ordering and include the full list on each call."
-            )
-        ),
+        Field(description="The complete new list of proverbs, in order."),
     ],
 ) -> str:
-    """Persist the provided set of proverbs."""
-    return f"Proverbs updated. Tracking {len(proverbs)} item(s)."
+    """Replace every proverb at once."""
+    return _apply(proverbs_state.set_proverbs, proverbs)
 
 
-@ai_function(
+@cached_ai_function(
+    ttl=600,
+    key=lambda location: location.strip().lower(),
     name="get_weather",
     description="Share a quick weather update for a location. Use this to render the frontend weather card.",
 )
@@ -75,6 +139,41 @@ def go_to_moon() -> str:
     return "Mission control requested. Awaiting human approval for the lunar launch."
 
 
+class ProverbsAgent(AgentFrameworkAgent):
+    """AG-UI wrapper that owns the canonical shared state of each run.
+
+    State tools mutate the run's ``SharedState`` through the reducer, and the
+    queued JSON Patch ops are streamed as ``StateDeltaEvent`` right after the
+    event that produced them. Full snapshots are only sent when the client has
+    no base state to patch.
+
+    The schema is deliberately not handed to ``AgentFrameworkAgent``: the
+    framework would echo the whole state back on every run and inject a prompt
+    telling the model to resend every item.
+    """
+
+    def __init__(self, *, shared_state_schema: dict[str, Any], **kwargs: Any):
+        super().__init__(**kwargs)
+        self.shared_state_schema = shared_state_schema
+
+    async def run_agent(
+        self, input_data: dict[str, Any]
+    ) -> AsyncGenerator[BaseEvent, None]:
+        shared = SharedState.from_input(
+            input_data.get("state"), self.shared_state_schema
+        )
+        bind_shared_state(shared)
+
+        async for event in super().run_agent(input_data):
+            if isinstance(event, StateSnapshotEvent):
+                # Snapshots built by the framework only know the input state;
+                # always send the canonical one instead.
+                event = shared.snapshot_event()
+            yield event
+            if update := shared.flush_event():
+                yield update
+
+
 def create_agent(chat_client: ChatClientProtocol) -> AgentFrameworkAgent:
     """Instantiate the CopilotKit demo agent backed by Microsoft Agent Framework."""
     base_agent = ChatAgent(
@@ -84,15 +183,16 @@ def create_agent(chat_client: ChatClientProtocol) -> AgentFrameworkAgent:
             You help users brainstorm, organize, and refine proverbs while coordinating UI updates.
 
             State sync:
-            - The current list of proverbs is provided in the conversation context.
-            - When you add, remove, or reorder proverbs, call `update_proverbs` with the full list.
-              Never send partial updates—always include every proverb that should exist.
-            - CRITICAL: When asked to "add" a proverb, you must:
-              1. First, identify ALL existing proverbs from the conversation history
-              2. Create EXACTLY ONE new proverb (never more than one unless explicitly requested)
-              3. Call update_proverbs with: [all existing proverbs] + [the one new proverb]
-              Example: Current: ["A", "B"] -> After adding: ["A", "B", "C"] (NOT ["A", "B", "C", "D", "E"])
+            - The current list of proverbs is provided in the conversation context. Indices are 0-based.
+            - Change the list with the single-item tools; the server applies each change to the
+              canonical list, so NEVER resend proverbs that are not changing:
+              - `add_proverb` inserts one proverb (omit `index` to append).
+              - `remove_proverb`, `move_proverb` and `replace_proverb` address items by index.
+            - Call the tools in order when making several changes; every call sees the result of the
+              previous one, so indices shift after an add, remove or move.
+            - When asked to "add" a proverb, create EXACTLY ONE new proverb unless explicitly requested.
             - When asked to "remove" a proverb, remove exactly ONE item unless user specifies otherwise.
+            - Only use `update_proverbs` (full list) for bulk rewrites such as sorting or clearing all items.
 
             Tool usage rules:
             - When user asks to go to the moon, you MUST call the `go_to_moon` tool immediately. Do NOT ask for approval
@@ -101,6 +201,7 @@ def create_agent(chat_client: ChatClientProtocol) -> AgentFrameworkAgent:
             Frontend integrations:
             - `get_weather` renders a weather card in the UI. Only call this tool when the user explicitly
               asks for weather. Do NOT call it after unrelated tasks or approvals.
+            - For several locations, issue all `get_weather` calls in the same turn; they run concurrently.
             - `go_to_moon` requires explicit user approval before you proceed. Only use it when a
               user asks to launch or travel to the moon. Always call the tool instead of asking manually.
 
@@ -113,14 +214,25 @@ def create_agent(chat_client: ChatClientProtocol) -> AgentFrameworkAgent:
             """.strip()
         ),
         chat_client=chat_client,
-        tools=[update_proverbs, get_weather, go_to_moon],
+        context_providers=SharedStateContextProvider(),
+        middleware=[tool_stats_middleware],
+        # 同一轮的多个工具调用由框架并发执行（需要审批的工具除外，会先走审批流程）
+        allow_multiple_tool_calls=True,
+        tools=[
+            add_proverb,
+            remove_proverb,
+            move_proverb,
+            replace_proverb,
+            update_proverbs,
+            get_weather,
+            go_to_moon,
+        ],
     )
 
-    return AgentFrameworkAgent(
+    return ProverbsAgent(
         agent=base_agent,
         name="CopilotKitMicrosoftAgentFrameworkAgent",
         description="Manages proverbs, weather snippets, and human-in-the-loop moon launches.",
-        state_schema=STATE_SCHEMA,
-        predict_state_config=PREDICT_STATE_CONFIG,
+        shared_state_schema=STATE_SCHEMA,
         require_confirmation=False,  # Allow immediate state updates with follow-up messages
     )
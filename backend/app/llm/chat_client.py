@@ -1,9 +1,10 @@
 from enum import Enum
+from functools import cache
 
 from agent_framework import ChatClientProtocol
-from agent_framework.openai import OpenAIChatClient
 
 from app.core.config import settings
+from app.llm.resilience import ResiliencePolicy, ResilientChatClient
 
 
 class ChatClientContext(Enum):
@@ -12,21 +13,45 @@ class ChatClientContext(Enum):
     MAX = "max"
 
 
-def get_chat_client(
-    context: ChatClientContext = ChatClientContext.FLASH,
-) -> ChatClientProtocol:
-    model_id: str
+# 主模型熔断或调用失败时，依次回退到的档位
+_FALLBACK_TIERS: dict[ChatClientContext, tuple[ChatClientContext, ...]] = {
+    ChatClientContext.FLASH: (ChatClientContext.PLUS,),
+    ChatClientContext.PLUS: (ChatClientContext.FLASH,),
+    ChatClientContext.MAX: (ChatClientContext.PLUS,),
+}
 
+
+def get_model_id(context: ChatClientContext) -> str:
     match context:
         case ChatClientContext.PLUS:
-            model_id = "qwen-plus"
+            return "qwen-plus"
         case ChatClientContext.FLASH:
-            model_id = "qwen-flash"
+            return "qwen-flash"
         case ChatClientContext.MAX:
-            model_id = "qwen-max"
+            return "qwen-max"
+
+
+def get_resilience_policy() -> ResiliencePolicy:
+    return ResiliencePolicy(
+        hedge_enabled=settings.LLM_HEDGE_ENABLED,
+        hedge_percentile=settings.LLM_HEDGE_PERCENTILE,
+        hedge_min_delay=settings.LLM_HEDGE_MIN_DELAY,
+        hedge_max_delay=settings.LLM_HEDGE_MAX_DELAY,
+        breaker_failure_rate=settings.LLM_CIRCUIT_FAILURE_RATE,
+        slow_call_seconds=settings.LLM_CIRCUIT_SLOW_CALL_SECONDS,
+        open_seconds=settings.LLM_CIRCUIT_OPEN_SECONDS,
+    )
 
-    return OpenAIChatClient(
-        model_id=model_id,
+
+@cache
+def get_chat_client(
+    context: ChatClientContext = ChatClientContext.FLASH,
+) -> ChatClientProtocol:
+    # 每个档位一个客户端，进程内复用其 HTTP 连接池
+    return ResilientChatClient(
+        model_id=get_model_id(context),
+        fallback_model_ids=[get_model_id(tier) for tier in _FALLBACK_TIERS[context]],
+        policy=get_resilience_policy(),
         api_key=settings.OPENAI_API_KEY,
         base_url=settings.OPENAI_BASE_URL,
     )
@@ -0,0 +1,386 @@
+"""AG-UI streaming endpoint backed by the server-side thread store.
+
+Replaces ``agent_framework_ag_ui.add_agent_framework_fastapi_endpoint``. The
+request body is the usual ``RunAgentInput``, but ``messages`` may contain only
+the messages added since the last ``thread_saved`` event the client received,
+and ``state`` may be omitted: the stored thread fills in the rest.
+
+Requests may carry the usual bearer token. Authenticated runs are accounted
+to the user and refused up front once the user's daily token quota is spent;
+anonymous runs are limited the same way per client address, under their own
+quota. Stored threads belong to the user that created them, so anonymous runs
+never use the thread store: they receive no ``thread_saved`` event and keep
+sending the full history.
+
+The run is produced by its own task while the response watches the client
+connection. When the client goes away the task is cancelled, which unwinds
+the agent run, pending tool coroutines and the upstream completion request
+instead of letting them run to the end unread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import json
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Any
+from uuid import UUID
+
+from ag_ui.core import (
+    BaseEvent,
+    CustomEvent,
+    MessagesSnapshotEvent,
+    RunFinishedEvent,
+    TextMessageContentEvent,
+    TextMessageStartEvent,
+    ToolCallArgsEvent,
+    ToolCallResultEvent,
+    ToolCallStartEvent,
+)
+from ag_ui.encoder import EventEncoder
+from agent_framework_ag_ui import AgentFrameworkAgent
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.security.utils import get_authorization_scheme_param
+from jwt.exceptions import InvalidTokenError
+from pydantic import ValidationError
+
+from app.api.routes.auth.revocation import revocation_list
+from app.api.routes.auth.service import decode_access_token
+from app.api.schemas.error import APIException
+from app.core.config import settings
+from app.core.deadline import check_deadline
+from app.core.logger import logger
+from app.core.metrics import counter
+from app.llm.state import current_shared_state
+from app.llm.thread_store import Message, ThreadStore, merge_messages
+from app.llm.usage import RunUsage, bind_run_usage, observe_run, usage_tracker
+
+THREAD_SAVED_EVENT = "thread_saved"
+
+_runs_cancelled = counter(
+    "agent_runs_cancelled_total",
+    "Agent runs cancelled before completion, by reason.",
+    ["reason"],
+)
+_tokens_saved = counter(
+    "agent_tokens_saved_estimated_total",
+    "Estimated completion tokens not generated thanks to cancelled runs.",
+)
+
+
+class _RunLength:
+    """Moving average of streamed content chunks per completed run.
+
+    OpenAI-compatible providers stream roughly one token per content chunk,
+    so the gap between this average and what a cancelled run had streamed is
+    used as the estimate of tokens saved.
+    """
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self.value: float | None = None
+
+    def observe(self, chunks: int) -> None:
+        if self.value is None:
+            self.value = float(chunks)
+        else:
+            self.value += self.alpha * (chunks - self.value)
+
+    def saved(self, streamed: int) -> float:
+        if self.value is None:
+            return 0.0
+        return max(0.0, self.value - streamed)
+
+
+_run_length = _RunLength()
+
+
+class _RunRecorder:
+    """Collect the messages a run produced, in AG-UI message format.
+
+    The framework ends runs that produced text with a ``MessagesSnapshotEvent``
+    holding the whole history, which is then used as is. Runs that stop at a
+    tool call (e.g. waiting for approval) have no snapshot, so the messages are
+    rebuilt from the streamed events instead.
+    """
+
+    def __init__(self, input_messages: list[Message]):
+        self.input_messages = input_messages
+        self.snapshot: list[Message] | None = None
+        self._produced: OrderedDict[str, Message] = OrderedDict()
+        self._tool_calls: dict[str, dict[str, Any]] = {}
+        self.content_chunks = 0
+        self.finished = False
+
+    def _assistant(self, message_id: str) -> Message:
+        message = self._produced.get(message_id)
+        if message is None:
+            message = self._produced[message_id] = {
+                "id": message_id,
+                "role": "assistant",
+            }
+        return message
+
+    def record(self, event: BaseEvent) -> None:
+        match event:
+            case MessagesSnapshotEvent():
+                self.snapshot = [
+                    m.model_dump(mode="json", by_alias=True, exclude_none=True)
+                    for m in event.messages
+                ]
+            case TextMessageStartEvent():
+                self._assistant(event.message_id).setdefault("content", "")
+            case TextMessageContentEvent():
+                self.content_chunks += 1
+                message = self._assistant(event.message_id)
+                message["content"] = message.get("content", "") + event.delta
+            case ToolCallStartEvent():
+                call: dict[str, Any] = {
+                    "id": event.tool_call_id,
+                    "type": "function",
+                    "function": {"name": event.tool_call_name, "arguments": ""},
+                }
+                self._tool_calls[event.tool_call_id] = call
+                parent = self._assistant(event.parent_message_id or event.tool_call_id)
+                parent.setdefault("toolCalls", []).append(call)
+            case ToolCallArgsEvent():
+                if pending := self._tool_calls.get(event.tool_call_id):
+                    pending["function"]["arguments"] += event.delta
+            case ToolCallResultEvent():
+                self._produced[event.message_id] = {
+                    "id": event.message_id,
+                    "role": "tool",
+                    "toolCallId": event.tool_call_id,
+                    "content": event.content,
+                }
+            case RunFinishedEvent():
+                self.finished = True
+
+    def messages(self) -> list[Message]:
+        if self.snapshot is not None:
+            return self.snapshot
+        return self.input_messages + list(self._produced.values())
+
+
+def _final_state(input_data: dict[str, Any]) -> dict[str, Any] | None:
+    # ProverbsAgent 在当前请求上下文中绑定了规范状态；其他 agent 则沿用输入状态
+    try:
+        return copy.deepcopy(current_shared_state().values)
+    except RuntimeError:
+        return input_data.get("state")
+
+
+async def _request_user_id(request: Request) -> UUID | None:
+    """User of an optional bearer token; a token that is present must be valid.
+
+    The user row is not loaded here, so only per-token revocation applies;
+    the per-user watermark is enforced by routes that load the user.
+    """
+    scheme, token = get_authorization_scheme_param(request.headers.get("Authorization"))
+    if not token or scheme.lower() != "bearer":
+        return None
+    credentials_error = APIException(
+        HTTPStatus.FORBIDDEN, "Could not validate credentials"
+    )
+    try:
+        payload = decode_access_token(token)
+        user_id = UUID(payload.sub)
+    except (InvalidTokenError, ValidationError, ValueError, TypeError):
+        raise credentials_error
+    # Only a Bloom filter hit needs the (blocking) exact lookup.
+    if (
+        payload.jti
+        and revocation_list.might_be_revoked(payload.jti)
+        and await asyncio.to_thread(revocation_list.is_revoked, payload.jti)
+    ):
+        raise credentials_error
+    return user_id
+
+
+class _Done:
+    pass
+
+
+@dataclass
+class _Failure:
+    exc: Exception
+
+
+async def stream_until_disconnect(
+    events: AsyncIterator[str],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    *,
+    poll_interval: float,
+    on_disconnect: Callable[[], None] | None = None,
+) -> AsyncIterator[str]:
+    """Relay ``events`` until they end or the client disconnects.
+
+    ``events`` is consumed by a single producer task, so context variables
+    bound by the run stay visible to every step of it. The connection is
+    polled rather than detected on the next write, because a run can go
+    silent for a long time while the model thinks or a tool executes.
+    """
+    queue: asyncio.Queue[str | _Done | _Failure] = asyncio.Queue(maxsize=16)
+
+    async def produce() -> None:
+        try:
+            async for chunk in events:
+                await queue.put(chunk)
+        except Exception as exc:
+            await queue.put(_Failure(exc))
+        else:
+            await queue.put(_Done())
+
+    async def watch() -> None:
+        while not await is_disconnected():
+            await asyncio.sleep(poll_interval)
+
+    producer = asyncio.create_task(produce())
+    watcher = asyncio.create_task(watch())
+    get: asyncio.Future[str | _Done | _Failure] | None = None
+    try:
+        while True:
+            get = asyncio.ensure_future(queue.get())
+            await asyncio.wait({get, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if not get.done():
+                break
+            item = get.result()
+            if isinstance(item, _Done):
+                break
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        # 客户端断开（或服务器取消了响应）时，producer 仍在运行
+        interrupted = not producer.done()
+        tasks = [t for t in (producer, watcher, get) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if interrupted and on_disconnect is not None:
+            on_disconnect()
+
+
+def add_agent_endpoint(
+    app: FastAPI,
+    agent: AgentFrameworkAgent,
+    path: str,
+    thread_store: ThreadStore | None = None,
+) -> None:
+    """Register the AG-UI endpoint for ``agent`` at ``path``."""
+
+    async def event_stream(
+        input_data: dict[str, Any],
+        thread_id: str | None,
+        user_id: UUID | None,
+        base_version: int | None,
+        recorder: _RunRecorder,
+        usage: RunUsage,
+    ) -> AsyncIterator[str]:
+        encoder = EventEncoder()
+        # 在 producer 任务的上下文中绑定，整个工具循环的模型调用都记到本次运行
+        bind_run_usage(usage)
+        async for event in agent.run_agent(input_data):
+            recorder.record(event)
+            if (
+                thread_store is not None
+                and thread_id
+                and user_id is not None
+                and isinstance(event, RunFinishedEvent)
+            ):
+                messages = recorder.messages()
+                try:
+                    record = await thread_store.save(
+                        thread_id,
+                        user_id,
+                        messages,
+                        _final_state(input_data),
+                        version=base_version,
+                    )
+                except Exception:
+                    logger.exception(f"Saving agent thread {thread_id} failed")
+                else:
+                    yield encoder.encode(
+                        CustomEvent(
+                            name=THREAD_SAVED_EVENT,
+                            value={
+                                "threadId": thread_id,
+                                "version": record.version,
+                                "lastMessageId": messages[-1].get("id")
+                                if messages
+                                else None,
+                            },
+                        )
+                    )
+            yield encoder.encode(event)
+        if recorder.finished:
+            _run_length.observe(recorder.content_chunks)
+            observe_run(usage)
+
+    @app.post(path)
+    async def agent_endpoint(request: Request) -> StreamingResponse:
+        """Run the agent and stream AG-UI events as server-sent events."""
+        try:
+            input_data = await request.json()
+        except json.JSONDecodeError:
+            raise APIException(HTTPStatus.BAD_REQUEST, "Request body must be JSON")
+        if not isinstance(input_data, dict) or not isinstance(
+            input_data.get("messages", []), list
+        ):
+            raise APIException(HTTPStatus.BAD_REQUEST, "Invalid RunAgentInput")
+
+        user_id = await _request_user_id(request)
+        client = request.client.host if request.client else None
+        # 只读内存中的用量，不增加数据库往返
+        usage_tracker.check_quota(user_id, client)
+
+        thread_id = input_data.get("threadId") or input_data.get("thread_id")
+        base_version: int | None = None
+        if thread_store is not None and thread_id and user_id is not None:
+            stored = await thread_store.load(thread_id, user_id)
+            if stored is not None:
+                base_version = stored.version
+                input_data["messages"] = merge_messages(
+                    stored.messages, input_data.get("messages") or []
+                )
+                if not input_data.get("state") and stored.state is not None:
+                    input_data["state"] = copy.deepcopy(stored.state)
+
+        logger.info(
+            f"Agent run {input_data.get('runId', '-')} on thread {thread_id or '-'} "
+            f"with {len(input_data.get('messages') or [])} message(s)"
+        )
+        check_deadline("llm")
+        recorder = _RunRecorder(input_data.get("messages") or [])
+
+        def on_disconnect() -> None:
+            _runs_cancelled.inc(reason="client_disconnect")
+            saved = _run_length.saved(recorder.content_chunks)
+            _tokens_saved.inc(saved)
+            logger.info(
+                f"Client disconnected, cancelled agent run {input_data.get('runId', '-')} "
+                f"after {recorder.content_chunks} chunk(s), ~{saved:.0f} token(s) saved"
+            )
+
+        return StreamingResponse(
+            stream_until_disconnect(
+                event_stream(
+                    input_data,
+                    thread_id,
+                    user_id,
+                    base_version,
+                    recorder,
+                    RunUsage(user_id, client),
+                ),
+                request.is_disconnected,
+                poll_interval=settings.AGENT_DISCONNECT_POLL_INTERVAL,
+                on_disconnect=on_disconnect,
+            ),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
@@ -0,0 +1,55 @@
+from datetime import date
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import JSON, Column
+from sqlmodel import Field, UniqueConstraint
+
+from app.api.models import BaseUUIDModel, SoftDeleteModel
+from app.core.types import BinaryUUID
+
+
+class AgentThread(SoftDeleteModel, BaseUUIDModel, table=True):
+    """服务端保存的 AG-UI 会话线程，客户端每次只需发送新增消息"""
+
+    __tablename__ = "agent_thread"
+    __table_args__ = (
+        UniqueConstraint(
+            "thread_id", "deleted_at", name="uk_agent_thread_thread_id_deleted_at"
+        ),
+    )
+
+    thread_id: str = Field(max_length=255, description="AG-UI 线程ID")
+    # 增加归属之前保存的线程没有所属用户，任何人都无法再读取
+    user_id: UUID | None = Field(
+        default=None, sa_type=BinaryUUID, nullable=True, description="所属用户ID"
+    )
+    messages: list[dict[str, Any]] = Field(
+        default_factory=list,
+        sa_column=Column(JSON, nullable=False),
+        description="AG-UI 格式的完整消息历史",
+    )
+    state: dict[str, Any] | None = Field(
+        default=None, sa_column=Column(JSON, nullable=True), description="共享状态"
+    )
+    version: int = Field(default=1, description="每次写入递增，用于校验缓存")
+    compacted_messages: int = Field(default=0, description="压缩时丢弃的消息数")
+
+
+class LLMUsage(BaseUUIDModel, table=True):
+    """按用户、模型、日期聚合的 token 用量，由内存聚合器批量写入"""
+
+    __tablename__ = "llm_usage"
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id", "model", "usage_date", name="uk_llm_usage_user_model_date"
+        ),
+    )
+
+    # 匿名调用记在全零 UUID 下
+    user_id: UUID = Field(sa_type=BinaryUUID, description="用户ID")
+    model: str = Field(max_length=100, description="模型ID")
+    usage_date: date = Field(description="用量日期（UTC）")
+    prompt_tokens: int = Field(default=0, description="输入 token 数")
+    completion_tokens: int = Field(default=0, description="输出 token 数")
+    requests: int = Field(default=0, description="模型调用次数")
@@ -0,0 +1,595 @@
+"""Hedged requests, circuit breaking and tier fallback for chat completions.
+
+``ResilientChatClient`` only overrides the raw provider call
+(``_inner_get_streaming_response`` / ``_inner_get_response``). Function
+invocation, chat middleware and instrumentation still run once per turn above
+it, so a hedged or retried call never executes a tool twice.
+
+- Hedging: when the first chunk of a call has not arrived within a delay taken
+  from the recent time-to-first-token distribution of the model, a duplicate
+  request is sent and whichever answers first wins. The loser is cancelled,
+  which closes its HTTP stream.
+- Circuit breaker: per model, over a sliding window of calls. Errors and calls
+  slower than ``slow_call_seconds`` count as failures; once their rate crosses
+  the threshold the breaker opens, and after ``open_seconds`` a single probe is
+  let through to decide whether to close it again.
+- Fallback: if the call fails before anything was streamed, or the breaker of
+  the model is open, the turn moves on to the next tier's model.
+
+Calls that end because the request deadline passed or the client went away
+say nothing about the health of the model and are left out of the breaker.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import math
+import time
+from collections import deque
+from collections.abc import (
+    AsyncGenerator,
+    AsyncIterable,
+    Callable,
+    MutableSequence,
+    Sequence,
+)
+from contextlib import aclosing
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, cast
+
+from agent_framework import (
+    ChatMessage,
+    ChatOptions,
+    ChatResponse,
+    ChatResponseUpdate,
+    UsageContent,
+)
+from agent_framework.exceptions import (
+    ServiceContentFilterException,
+    ServiceInvalidRequestError,
+    ServiceResponseException,
+)
+from agent_framework.openai import OpenAIChatClient
+from openai import APIStatusError
+
+from app.api.schemas.error import DeadlineExceededError
+from app.core.deadline import check_deadline, remaining_time
+from app.core.logger import logger
+from app.core.metrics import counter, gauge, histogram
+from app.llm.usage import usage_tracker
+
+_llm_requests = counter(
+    "llm_requests_total",
+    "Upstream chat completion attempts, by model and outcome.",
+    ["model", "outcome"],
+)
+_llm_ttft = histogram(
+    "llm_time_to_first_chunk_seconds",
+    "Time until the first streamed chunk (or full response) of the winning attempt.",
+    ["model"],
+)
+_llm_hedges = counter(
+    "llm_hedged_requests_total", "Hedged duplicate requests sent.", ["model"]
+)
+_llm_hedge_wins = counter(
+    "llm_hedge_wins_total", "Calls won by the hedged duplicate.", ["model"]
+)
+_llm_fallbacks = counter(
+    "llm_fallbacks_total",
+    "Turns moved to another model tier.",
+    ["from_model", "to_model", "reason"],
+)
+_circuit_state = gauge(
+    "llm_circuit_state",
+    "Circuit breaker state per model (0=closed, 1=half-open, 2=open).",
+    ["model"],
+)
+_circuit_transitions = counter(
+    "llm_circuit_transitions_total",
+    "Circuit breaker state transitions.",
+    ["model", "state"],
+)
+
+
+class CircuitOpenError(ServiceResponseException):
+    """Every candidate model was skipped because its circuit breaker is open."""
+
+
+@dataclass(frozen=True)
+class ResiliencePolicy:
+    hedge_enabled: bool = True
+    # 对冲延迟取最近首包耗时的该分位数，并夹在 [min, max] 之间
+    hedge_percentile: float = 0.95
+    hedge_min_delay: float = 0.5
+    hedge_max_delay: float = 5.0
+    # 样本不足时使用的对冲延迟
+    hedge_default_delay: float = 2.0
+    hedge_min_samples: int = 20
+    breaker_window: int = 20
+    breaker_min_calls: int = 5
+    breaker_failure_rate: float = 0.5
+    slow_call_seconds: float = 10.0
+    open_seconds: float = 30.0
+    # SDK 自带的退避重试会推迟回退，交给熔断/回退处理
+    max_retries: int = 0
+
+
+class CircuitState(Enum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker over the last ``window`` calls of a model."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        window: int,
+        min_calls: int,
+        failure_rate: float,
+        slow_call_seconds: float,
+        open_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self._clock = clock
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.state = CircuitState.CLOSED
+        _circuit_state.set(self.state.value, model=name)
+
+    def _transition(self, state: CircuitState) -> None:
+        if state is self.state:
+            return
+        logger.warning(
+            f"LLM circuit for {self.name}: {self.state.name} -> {state.name}"
+        )
+        self.state = state
+        _circuit_state.set(state.value, model=self.name)
+        _circuit_transitions.inc(model=self.name, state=state.name.lower())
+        if state is CircuitState.OPEN:
+            self._opened_at = self._clock()
+        if state is CircuitState.CLOSED:
+            self._outcomes.clear()
+
+    def allow(self) -> bool:
+        """Whether a call may be sent now; reserves the probe slot when half-open."""
+        if self.state is CircuitState.OPEN:
+            if self._clock() - self._opened_at < self.open_seconds:
+                return False
+            self._transition(CircuitState.HALF_OPEN)
+        if self.state is CircuitState.HALF_OPEN:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def record(
+        self, *, ok: bool, duration: float | None = None, probe: bool = False
+    ) -> None:
+        """Count a finished call; ``probe`` marks the call reserved by ``allow()``.
+
+        Only the probe decides a half-open breaker. Calls that started while
+        closed but finish after it opened belong to the old window and are
+        dropped.
+        """
+        failed = not ok or (duration is not None and duration > self.slow_call_seconds)
+        if probe:
+            self._probe_in_flight = False
+            if self.state is CircuitState.HALF_OPEN:
+                self._transition(CircuitState.OPEN if failed else CircuitState.CLOSED)
+            return
+        if self.state is not CircuitState.CLOSED:
+            return
+        self._outcomes.append(failed)
+        if (
+            len(self._outcomes) >= self.min_calls
+            and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate
+        ):
+            self._transition(CircuitState.OPEN)
+
+    def release(self) -> None:
+        """Give back a probe slot whose call ended without a verdict (cancelled)."""
+        self._probe_in_flight = False
+
+
+class LatencyWindow:
+    """The last ``size`` latency samples, for percentile-based hedge delays."""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, value: float) -> None:
+        self._samples.append(value)
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self._samples)
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+# 熔断器与延迟样本按模型在进程内共享，同一模型的不同客户端实例看到同一份健康状况
+_breakers: dict[str, CircuitBreaker] = {}
+_latencies: dict[str, LatencyWindow] = {}
+
+
+def _breaker(model: str, policy: ResiliencePolicy) -> CircuitBreaker:
+    breaker = _breakers.get(model)
+    if breaker is None:
+        breaker = _breakers[model] = CircuitBreaker(
+            model,
+            window=policy.breaker_window,
+            min_calls=policy.breaker_min_calls,
+            failure_rate=policy.breaker_failure_rate,
+            slow_call_seconds=policy.slow_call_seconds,
+            open_seconds=policy.open_seconds,
+        )
+    return breaker
+
+
+def _latency(model: str) -> LatencyWindow:
+    return _latencies.setdefault(model, LatencyWindow())
+
+
+def reset_state() -> None:
+    """Forget all breaker and latency state (used by tests)."""
+    _breakers.clear()
+    _latencies.clear()
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    """Errors caused by the request itself would fail on every tier too."""
+    if isinstance(exc, ServiceContentFilterException | ServiceInvalidRequestError):
+        return False
+    inner = exc.__cause__
+    if isinstance(inner, APIStatusError):
+        status = inner.status_code
+        return not (400 <= status < 500 and status not in (408, 409, 429))
+    return True
+
+
+def _deadline_expired(exc: BaseException) -> bool:
+    """The call failed because the request ran out of time, not because of the model."""
+    if isinstance(exc, DeadlineExceededError):
+        return True
+    remaining = remaining_time()
+    return remaining is not None and remaining <= 0
+
+
+def _with_deadline(chat_options: ChatOptions) -> ChatOptions:
+    """Pass the remaining request budget to the SDK as the HTTP timeout."""
+    remaining = remaining_time()
+    if remaining is None:
+        return chat_options
+    options = copy.copy(chat_options)
+    # additional_properties 会原样并入 chat.completions.create 的参数
+    options.additional_properties = {
+        **chat_options.additional_properties,
+        "timeout": max(remaining, 0.001),
+    }
+    return options
+
+
+class _End:
+    pass
+
+
+@dataclass
+class _Failure:
+    exc: Exception
+
+
+class ResilientChatClient(OpenAIChatClient):
+    """``OpenAIChatClient`` with hedging, per-model circuit breakers and fallback."""
+
+    def __init__(
+        self,
+        *,
+        fallback_model_ids: Sequence[str] = (),
+        policy: ResiliencePolicy | None = None,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self.fallback_model_ids = tuple(fallback_model_ids)
+        self.policy = policy or ResiliencePolicy()
+        if self.client is not None:
+            self.client = self.client.with_options(max_retries=self.policy.max_retries)
+
+    def _candidates(self, chat_options: ChatOptions) -> list[str]:
+        primary = chat_options.model_id or self.model_id
+        if not primary:
+            raise ValueError("model_id must be a non-empty string")
+        # 调用方显式指定了其他模型时不做跨档位回退
+        if chat_options.model_id and chat_options.model_id != self.model_id:
+            return [primary]
+        return [primary, *(m for m in self.fallback_model_ids if m != primary)]
+
+    def _hedge_delay(self, model: str) -> float | None:
+        policy = self.policy
+        if not policy.hedge_enabled:
+            return None
+        window = _latency(model)
+        if len(window) < policy.hedge_min_samples:
+            return policy.hedge_default_delay
+        delay = window.percentile(policy.hedge_percentile)
+        return min(max(delay, policy.hedge_min_delay), policy.hedge_max_delay)
+
+    def _options_for(self, chat_options: ChatOptions, model: str) -> ChatOptions:
+        if chat_options.model_id == model:
+            return chat_options
+        options = copy.deepcopy(chat_options)
+        options.model_id = model
+        return options
+
+    async def _inner_get_streaming_response(
+        self,
+        *,
+        messages: MutableSequence[ChatMessage],
+        chat_options: ChatOptions,
+        **kwargs: Any,
+    ) -> AsyncIterable[ChatResponseUpdate]:
+        last_error: Exception | None = None
+        candidates = self._candidates(chat_options)
+        for i, model in enumerate(candidates):
+            # 请求截止时间已过：客户端不会再等这个回答，不再占用上游
+            check_deadline("llm")
+            breaker = _breaker(model, self.policy)
+            if not breaker.allow():
+                self._count_fallback(candidates, i, "circuit_open")
+                continue
+            probe = breaker.state is CircuitState.HALF_OPEN
+            started = time.perf_counter()
+            ttft: float | None = None
+            try:
+                async for update in self._hedged_stream(
+                    model, messages, self._options_for(chat_options, model)
+                ):
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                    yield update
+            except (asyncio.CancelledError, GeneratorExit):
+                if probe:
+                    breaker.release()
+                raise
+            except Exception as exc:
+                if _deadline_expired(exc) or not _is_retryable(exc):
+                    if probe:
+                        breaker.release()
+                    raise
+                breaker.record(ok=False, probe=probe)
+                # 已经向下游输出过内容的调用无法换模型重来
+                if ttft is not None:
+                    raise
+                last_error = exc
+                self._count_fallback(candidates, i, "error")
+                continue
+            # 流式调用以首包耗时判断是否过慢，总耗时取决于回答长度
+            breaker.record(ok=True, duration=ttft, probe=probe)
+            return
+        raise last_error or CircuitOpenError(
+            f"All candidate models are unavailable: {', '.join(candidates)}"
+        )
+
+    async def _hedged_stream(
+        self,
+        model: str,
+        messages: MutableSequence[ChatMessage],
+        options: ChatOptions,
+    ) -> AsyncIterable[ChatResponseUpdate]:
+        """Stream one call, racing a duplicate if the first chunk is late.
+
+        Each attempt is pumped by its own task into a shared queue, so the
+        loser can be cancelled (and its HTTP stream closed) from here.
+        """
+        queue: asyncio.Queue[tuple[int, ChatResponseUpdate | _End | _Failure]] = (
+            asyncio.Queue()
+        )
+
+        async def pump(index: int) -> None:
+            try:
+                async for update in self._stream_once(model, messages, options):
+                    await queue.put((index, update))
+            except Exception as exc:
+                _llm_requests.inc(model=model, outcome="error")
+                await queue.put((index, _Failure(exc)))
+            else:
+                _llm_requests.inc(model=model, outcome="ok")
+                await queue.put((index, _End()))
+
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(pump(0))]
+        failed: set[int] = set()
+        hedge_delay = self._hedge_delay(model)
+        try:
+            while True:
+                timeout = None
+                if hedge_delay is not None and len(tasks) == 1:
+                    timeout = max(0.0, started + hedge_delay - time.perf_counter())
+                try:
+                    index, item = await asyncio.wait_for(queue.get(), timeout)
+                except TimeoutError:
+                    remaining = remaining_time()
+                    if remaining is not None and remaining <= 0:
+                        hedge_delay = None
+                        continue
+                    _llm_hedges.inc(model=model)
+                    tasks.append(asyncio.create_task(pump(1)))
+                    continue
+                if isinstance(item, _Failure):
+                    failed.add(index)
+                    # 另一路仍在进行时等待它，否则把错误交给上层做回退
+                    if len(failed) == len(tasks):
+                        raise item.exc
+                    continue
+                winner = index
+                break
+
+            for i, task in enumerate(tasks):
+                if i != winner:
+                    task.cancel()
+                    if not task.done():
+                        _llm_requests.inc(model=model, outcome="cancelled")
+            if winner:
+                _llm_hedge_wins.inc(model=model)
+            ttft = time.perf_counter() - started
+            _latency(model).add(ttft)
+            _llm_ttft.observe(ttft, model=model)
+
+            while True:
+                if isinstance(item, _End):
+                    return
+                if isinstance(item, _Failure):
+                    raise item.exc
+                yield item
+                index, item = await queue.get()
+                while index != winner:
+                    index, item = await queue.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _inner_get_response(
+        self,
+        *,
+        messages: MutableSequence[ChatMessage],
+        chat_options: ChatOptions,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        last_error: Exception | None = None
+        candidates = self._candidates(chat_options)
+        for i, model in enumerate(candidates):
+            # 请求截止时间已过：客户端不会再等这个回答，不再占用上游
+            check_deadline("llm")
+            breaker = _breaker(model, self.policy)
+            if not breaker.allow():
+                self._count_fallback(candidates, i, "circuit_open")
+                continue
+            probe = breaker.state is CircuitState.HALF_OPEN
+            started = time.perf_counter()
+            try:
+                response = await self._hedged_call(
+                    model, messages, self._options_for(chat_options, model), kwargs
+                )
+            except asyncio.CancelledError:
+                if probe:
+                    breaker.release()
+                raise
+            except Exception as exc:
+                if _deadline_expired(exc) or not _is_retryable(exc):
+                    if probe:
+                        breaker.release()
+                    raise
+                breaker.record(ok=False, probe=probe)
+                last_error = exc
+                self._count_fallback(candidates, i, "error")
+                continue
+            breaker.record(ok=True, duration=time.perf_counter() - started, probe=probe)
+            return response
+        raise last_error or CircuitOpenError(
+            f"All candidate models are unavailable: {', '.join(candidates)}"
+        )
+
+    async def _hedged_call(
+        self,
+        model: str,
+        messages: MutableSequence[ChatMessage],
+        options: ChatOptions,
+        kwargs: dict[str, Any],
+    ) -> ChatResponse:
+        parent = super()._inner_get_response
+
+        async def attempt() -> ChatResponse:
+            try:
+                response = await parent(
+                    messages=messages, chat_options=_with_deadline(options), **kwargs
+                )
+            except Exception:
+                _llm_requests.inc(model=model, outcome="error")
+                raise
+            _llm_requests.inc(model=model, outcome="ok")
+            if usage := response.usage_details:
+                usage_tracker.record(
+                    model, usage.input_token_count or 0, usage.output_token_count or 0
+                )
+            return response
+
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(attempt())]
+        hedge_delay = self._hedge_delay(model)
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            remaining = remaining_time()
+            if not done and (remaining is None or remaining > 0):
+                _llm_hedges.inc(model=model)
+                tasks.append(asyncio.create_task(attempt()))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            _llm_hedge_wins.inc(model=model)
+                        elapsed = time.perf_counter() - started
+                        _latency(model).add(elapsed)
+                        _llm_ttft.observe(elapsed, model=model)
+                        return task.result()
+            # 所有尝试都失败：抛出最先发起的那一路的错误
+            raise tasks[0].exception()  # type: ignore[misc]
+        finally:
+            for task in tasks:
+                if not task.done():
+                    _llm_requests.inc(model=model, outcome="cancelled")
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _stream_once(
+        self,
+        model: str,
+        messages: MutableSequence[ChatMessage],
+        chat_options: ChatOptions,
+    ) -> AsyncIterable[ChatResponseUpdate]:
+        """One streaming completion through the parent implementation.
+
+        The parent's generator is closed explicitly when the consumer stops,
+        which closes the HTTP response; that is what actually aborts a hedge
+        loser or an abandoned run instead of leaving it to garbage collection.
+        """
+        stream = cast(
+            AsyncGenerator[ChatResponseUpdate, None],
+            super()._inner_get_streaming_response(
+                messages=messages, chat_options=_with_deadline(chat_options)
+            ),
+        )
+        async with aclosing(stream):
+            async for update in stream:
+                for content in update.contents:
+                    if isinstance(content, UsageContent):
+                        usage_tracker.record(
+                            model,
+                            content.details.input_token_count or 0,
+                            content.details.output_token_count or 0,
+                        )
+                yield update
+
+    def _count_fallback(self, candidates: list[str], index: int, reason: str) -> None:
+        if index + 1 < len(candidates):
+            _llm_fallbacks.inc(
+                from_model=candidates[index],
+                to_model=candidates[index + 1],
+                reason=reason,
+            )
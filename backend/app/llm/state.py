@@ -0,0 +1,160 @@
+"""Server-side reducer for the agent's shared AG-UI state.
+
+Tools never send the whole state back. Each tool call applies one small action
+to the canonical state of the current run, and the resulting JSON Patch
+(RFC 6902) operations are queued until the AG-UI layer streams them to the
+client as a ``StateDeltaEvent``.
+"""
+
+from __future__ import annotations
+
+import copy
+from collections.abc import MutableSequence
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from ag_ui.core import StateDeltaEvent, StateSnapshotEvent
+from agent_framework import ChatMessage, Context, ContextProvider
+
+JsonPatchOp = dict[str, Any]
+
+PROVERBS_KEY = "proverbs"
+
+
+class StateReducerError(ValueError):
+    """Raised when an action cannot be applied to the current state."""
+
+
+@dataclass
+class SharedState:
+    """Canonical state of one agent run plus the patch ops not yet streamed."""
+
+    values: dict[str, Any]
+    pending: list[JsonPatchOp] = field(default_factory=list)
+    # The client did not send a usable base to apply deltas on, so the next
+    # update must be a full snapshot.
+    needs_snapshot: bool = False
+
+    @classmethod
+    def from_input(
+        cls, state: dict[str, Any] | None, schema: dict[str, Any]
+    ) -> SharedState:
+        values = copy.deepcopy(state) if isinstance(state, dict) else {}
+        needs_snapshot = False
+        for key, key_schema in schema.items():
+            if key in values:
+                continue
+            needs_snapshot = True
+            is_array = (
+                isinstance(key_schema, dict) and key_schema.get("type") == "array"
+            )
+            values[key] = [] if is_array else {}
+        return cls(values=values, needs_snapshot=needs_snapshot)
+
+    @property
+    def proverbs(self) -> list[str]:
+        return self.values.setdefault(PROVERBS_KEY, [])
+
+    def flush_event(self) -> StateDeltaEvent | StateSnapshotEvent | None:
+        """Turn the queued ops into one AG-UI event, or ``None`` if nothing changed."""
+        if self.needs_snapshot:
+            return self.snapshot_event()
+        if not self.pending:
+            return None
+        ops, self.pending = self.pending, []
+        return StateDeltaEvent(delta=ops)
+
+    def snapshot_event(self) -> StateSnapshotEvent:
+        self.pending.clear()
+        self.needs_snapshot = False
+        return StateSnapshotEvent(snapshot=copy.deepcopy(self.values))
+
+
+_current_state: ContextVar[SharedState | None] = ContextVar(
+    "agent_shared_state", default=None
+)
+
+
+def bind_shared_state(state: SharedState) -> None:
+    """Make ``state`` the canonical state for tools running in this context.
+
+    Every agent run is streamed from its own request task, so the binding never
+    leaks into another run.
+    """
+    _current_state.set(state)
+
+
+def current_shared_state() -> SharedState:
+    state = _current_state.get()
+    if state is None:
+        raise RuntimeError("No shared state bound to the current agent run.")
+    return state
+
+
+class SharedStateContextProvider(ContextProvider):
+    """Show the model the canonical state, indexed so tools can address items."""
+
+    async def invoking(
+        self,
+        messages: ChatMessage | MutableSequence[ChatMessage],  # noqa: ARG002
+        **kwargs: Any,  # noqa: ARG002
+    ) -> Context:
+        shared = _current_state.get()
+        if shared is None:
+            return Context()
+        listing = "\n".join(f"{i}: {p}" for i, p in enumerate(shared.proverbs))
+        return Context(
+            instructions=("Current proverbs (index: text):\n" + (listing or "(empty)"))
+        )
+
+
+def _path(index: int | str) -> str:
+    return f"/{PROVERBS_KEY}/{index}"
+
+
+def _check_index(proverbs: list[str], index: int, *, allow_end: bool = False) -> None:
+    upper = len(proverbs) if allow_end else len(proverbs) - 1
+    if not 0 <= index <= upper:
+        raise StateReducerError(
+            f"Index {index} is out of range; valid indices are 0..{upper}."
+        )
+
+
+def add_proverb(
+    proverbs: list[str], proverb: str, index: int | None = None
+) -> list[JsonPatchOp]:
+    if index is None or index == len(proverbs):
+        proverbs.append(proverb)
+        return [{"op": "add", "path": _path("-"), "value": proverb}]
+    _check_index(proverbs, index, allow_end=True)
+    proverbs.insert(index, proverb)
+    return [{"op": "add", "path": _path(index), "value": proverb}]
+
+
+def remove_proverb(proverbs: list[str], index: int) -> list[JsonPatchOp]:
+    _check_index(proverbs, index)
+    del proverbs[index]
+    return [{"op": "remove", "path": _path(index)}]
+
+
+def move_proverb(
+    proverbs: list[str], from_index: int, to_index: int
+) -> list[JsonPatchOp]:
+    _check_index(proverbs, from_index)
+    _check_index(proverbs, to_index)
+    if from_index == to_index:
+        return []
+    proverbs.insert(to_index, proverbs.pop(from_index))
+    return [{"op": "move", "from": _path(from_index), "path": _path(to_index)}]
+
+
+def replace_proverb(proverbs: list[str], index: int, proverb: str) -> list[JsonPatchOp]:
+    _check_index(proverbs, index)
+    proverbs[index] = proverb
+    return [{"op": "replace", "path": _path(index), "value": proverb}]
+
+
+def set_proverbs(proverbs: list[str], new_proverbs: list[str]) -> list[JsonPatchOp]:
+    proverbs[:] = new_proverbs
+    return [{"op": "replace", "path": f"/{PROVERBS_KEY}", "value": list(new_proverbs)}]
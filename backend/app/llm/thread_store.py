@@ -0,0 +1,347 @@
+"""Server-side persistence for AG-UI threads.
+
+AG-UI clients normally resend the whole message history and state on every
+run. With the thread store the server keeps the canonical history, so a client
+only has to send the messages added since the last acknowledged one; the
+endpoint rebuilds the full context before running the agent.
+
+Every thread belongs to the user that created it: loads and saves are
+scoped to ``(user_id, thread_id)`` and a thread owned by someone else is
+reported as not found.
+
+Hot threads are kept in a per-worker LRU. Each cached entry carries the row
+``version``, and a load only re-reads the (potentially large) JSON columns
+when another worker has written the thread since.
+
+Saves are conditional on the version the run started from. If another run
+wrote the thread in the meantime, the run's new messages are re-applied on
+top of the current history instead of overwriting it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlmodel import col, select, update
+
+from app.api.models import SOFT_DELETE_DATETIME
+from app.api.schemas.error import APIException
+from app.core.db import SessionLocal
+from app.core.logger import logger
+from app.core.metrics import counter
+from app.llm.models import AgentThread
+
+Message = dict[str, Any]
+
+MYSQL_DEADLOCK_ERRNO = 1213
+# 并发写入同一线程时，条件更新失败后重新合并的次数上限
+_SAVE_ATTEMPTS = 5
+
+_thread_loads = counter(
+    "agent_thread_loads_total",
+    "Thread history loads, by where the history came from.",
+    ["source"],
+)
+_thread_save_conflicts = counter(
+    "agent_thread_save_conflicts_total",
+    "Thread saves re-merged because another run wrote the thread first.",
+)
+_thread_compactions = counter(
+    "agent_thread_compactions_total", "Background thread compactions."
+)
+_thread_compacted_messages = counter(
+    "agent_thread_compacted_messages_total",
+    "Messages dropped from stored threads by compaction.",
+)
+
+
+class ThreadNotFoundError(APIException):
+    """The thread does not exist or belongs to another user."""
+
+    def __init__(self) -> None:
+        super().__init__(status_code=HTTPStatus.NOT_FOUND, detail="Thread not found")
+
+
+def _is_deadlock(exc: OperationalError) -> bool:
+    args: tuple[Any, ...] = getattr(exc.orig, "args", ())
+    return bool(args) and args[0] == MYSQL_DEADLOCK_ERRNO
+
+
+@dataclass(frozen=True)
+class ThreadRecord:
+    thread_id: str
+    user_id: UUID | None
+    messages: list[Message]
+    state: dict[str, Any] | None
+    version: int
+
+
+def merge_messages(stored: list[Message], incoming: list[Message]) -> list[Message]:
+    """Rebuild the full history from the stored thread and a client request.
+
+    If none of the incoming messages is known, the request is a delta and is
+    appended. Otherwise the client resent (part of) the history: everything
+    before the first known message was compacted away server-side, and from
+    that message on the client's copy wins, so edits and regenerations that
+    truncate the tail are honoured.
+    """
+    positions = {m["id"]: i for i, m in enumerate(stored) if m.get("id")}
+    for j, message in enumerate(incoming):
+        k = positions.get(message.get("id"))
+        if k is not None:
+            return stored[:k] + incoming[j:]
+    return stored + incoming
+
+
+def rebase_messages(current: list[Message], messages: list[Message]) -> list[Message]:
+    """Re-apply a run's messages on top of a thread that changed since its load.
+
+    The run's own messages are those after the last one the current thread
+    already has (compaction may have dropped the older ones); they are
+    appended, so the messages written by the concurrent run are kept.
+    """
+    known = {m["id"] for m in current if m.get("id")}
+    last = max((i for i, m in enumerate(messages) if m.get("id") in known), default=-1)
+    return current + messages[last + 1 :]
+
+
+def compact_messages(messages: list[Message], keep: int) -> list[Message]:
+    """Keep roughly the last ``keep`` messages, cutting at a user turn.
+
+    Cutting right before a user message guarantees no tool result is left
+    without the assistant message that issued its call.
+    """
+    if len(messages) <= keep:
+        return messages
+    start = len(messages) - keep
+    user_turns = [i for i, m in enumerate(messages) if m.get("role") == "user"]
+    after = [i for i in user_turns if i >= start]
+    before = [i for i in user_turns if 0 < i < start]
+    if after:
+        return messages[after[0] :]
+    if before:
+        return messages[before[-1] :]
+    return messages
+
+
+class ThreadStore:
+    """AG-UI thread history backed by ``agent_thread`` with an LRU in front."""
+
+    def __init__(self, *, maxsize: int, compact_threshold: int, keep_messages: int):
+        if keep_messages >= compact_threshold:
+            raise ValueError("keep_messages must be smaller than compact_threshold.")
+        self.maxsize = maxsize
+        self.compact_threshold = compact_threshold
+        self.keep_messages = keep_messages
+        self._cache: OrderedDict[str, ThreadRecord] = OrderedDict()
+        self._lock = threading.Lock()
+        self._compacting: set[str] = set()
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def _cache_get(self, thread_id: str) -> ThreadRecord | None:
+        with self._lock:
+            record = self._cache.get(thread_id)
+            if record is not None:
+                self._cache.move_to_end(thread_id)
+            return record
+
+    def _cache_put(self, record: ThreadRecord) -> None:
+        with self._lock:
+            current = self._cache.get(record.thread_id)
+            # 压缩任务与请求并发写入时，只保留较新的版本
+            if current is not None and current.version > record.version:
+                return
+            self._cache[record.thread_id] = record
+            self._cache.move_to_end(record.thread_id)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def _cache_drop(self, thread_id: str) -> None:
+        with self._lock:
+            self._cache.pop(thread_id, None)
+
+    async def load(self, thread_id: str, user_id: UUID) -> ThreadRecord | None:
+        """Stored thread of ``user_id``; None if the thread does not exist yet.
+
+        Raises ``ThreadNotFoundError`` if another user owns the thread.
+        """
+        return await asyncio.to_thread(self._load, thread_id, user_id)
+
+    async def save(
+        self,
+        thread_id: str,
+        user_id: UUID,
+        messages: list[Message],
+        state: dict[str, Any] | None,
+        *,
+        version: int | None = None,
+    ) -> ThreadRecord:
+        """Write the thread; ``version`` is the one ``messages`` were merged onto.
+
+        ``None`` means the run started without a stored thread.
+        """
+        record = await asyncio.to_thread(
+            self._save, thread_id, user_id, messages, state, version
+        )
+        if len(record.messages) > self.compact_threshold:
+            self._schedule_compaction(thread_id)
+        return record
+
+    def _load(self, thread_id: str, user_id: UUID) -> ThreadRecord | None:
+        with SessionLocal() as session:
+            head = session.exec(
+                select(AgentThread.version, AgentThread.user_id).where(
+                    AgentThread.thread_id == thread_id
+                )
+            ).first()
+            if head is None:
+                self._cache_drop(thread_id)
+                return None
+            version, owner = head
+            # 线程ID由客户端生成，不属于当前用户的线程一律按不存在处理
+            if owner != user_id:
+                raise ThreadNotFoundError()
+
+            cached = self._cache_get(thread_id)
+            if cached is not None and cached.version == version:
+                _thread_loads.inc(source="cache")
+                return cached
+
+            row = session.exec(
+                select(AgentThread).where(AgentThread.thread_id == thread_id)
+            ).first()
+            if row is None:
+                return None
+            record = ThreadRecord(
+                thread_id=thread_id,
+                user_id=user_id,
+                messages=row.messages,
+                state=row.state,
+                version=row.version,
+            )
+        _thread_loads.inc(source="database")
+        self._cache_put(record)
+        return record
+
+    def _save(
+        self,
+        thread_id: str,
+        user_id: UUID,
+        messages: list[Message],
+        state: dict[str, Any] | None,
+        expected: int | None,
+    ) -> ThreadRecord:
+        for _ in range(_SAVE_ATTEMPTS):
+            with SessionLocal() as session:
+                try:
+                    if expected is None:
+                        row = AgentThread(
+                            thread_id=thread_id,
+                            user_id=user_id,
+                            messages=messages,
+                            state=state,
+                        )
+                        session.add(row)
+                        session.commit()
+                        written = True
+                    else:
+                        result = session.exec(
+                            update(AgentThread)  # type: ignore[call-overload]
+                            .where(
+                                col(AgentThread.thread_id) == thread_id,
+                                col(AgentThread.user_id) == user_id,
+                                col(AgentThread.version) == expected,
+                                col(AgentThread.deleted_at) == SOFT_DELETE_DATETIME,
+                            )
+                            .values(
+                                messages=messages, state=state, version=expected + 1
+                            )
+                        )
+                        session.commit()
+                        written = result.rowcount == 1
+                except (IntegrityError, OperationalError) as exc:
+                    # 两个请求同时创建同一线程时唯一索引冲突（或间隙锁互相等待导致死锁），
+                    # 重新读取对方写入的行后合并
+                    if isinstance(exc, OperationalError) and not _is_deadlock(exc):
+                        raise
+                    session.rollback()
+                    written = False
+                if written:
+                    record = ThreadRecord(
+                        thread_id=thread_id,
+                        user_id=user_id,
+                        messages=messages,
+                        state=state,
+                        version=1 if expected is None else expected + 1,
+                    )
+                    self._cache_put(record)
+                    return record
+
+                # 版本已变化：在当前历史之上重新追加本次运行的消息
+                current = session.exec(
+                    select(AgentThread).where(AgentThread.thread_id == thread_id)
+                ).first()
+                if current is None:
+                    expected = None
+                    continue
+                if current.user_id != user_id:
+                    raise ThreadNotFoundError()
+                _thread_save_conflicts.inc()
+                messages = rebase_messages(current.messages, messages)
+                expected = current.version
+        raise APIException(
+            HTTPStatus.CONFLICT, f"Thread {thread_id} is being written concurrently"
+        )
+
+    def _schedule_compaction(self, thread_id: str) -> None:
+        if thread_id in self._compacting:
+            return
+        self._compacting.add(thread_id)
+        task = asyncio.get_running_loop().create_task(self._run_compaction(thread_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_compaction(self, thread_id: str) -> None:
+        try:
+            await asyncio.to_thread(self._compact, thread_id)
+        except Exception:
+            logger.exception(f"Compacting agent thread {thread_id} failed")
+        finally:
+            self._compacting.discard(thread_id)
+
+    def _compact(self, thread_id: str) -> None:
+        with SessionLocal() as session:
+            # 加行锁重新读取，避免覆盖压缩期间写入的新消息
+            row = session.exec(
+                select(AgentThread)
+                .where(AgentThread.thread_id == thread_id)
+                .with_for_update()
+            ).first()
+            if row is None or len(row.messages) <= self.compact_threshold:
+                return
+            kept = compact_messages(row.messages, self.keep_messages)
+            dropped = len(row.messages) - len(kept)
+            if not dropped:
+                return
+            row.messages = kept
+            row.compacted_messages += dropped
+            row.version += 1
+            record = ThreadRecord(
+                thread_id=thread_id,
+                user_id=row.user_id,
+                messages=kept,
+                state=row.state,
+                version=row.version,
+            )
+            session.commit()
+        _thread_compactions.inc()
+        _thread_compacted_messages.inc(dropped)
+        self._cache_put(record)
+        logger.info(f"Compacted agent thread {thread_id}: dropped {dropped} message(s)")
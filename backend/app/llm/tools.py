@@ -0,0 +1,188 @@
+"""Tool execution helpers: result memoization and per-tool stats.
+
+``agent_framework`` already runs every tool call of one model turn through
+``asyncio.gather``. Synchronous tools block the event loop though, so several
+calls in one turn still run one after another. ``cached_ai_function`` turns a
+tool into a coroutine that runs sync bodies in a worker thread, making those
+calls actually overlap, and memoizes results in a bounded TTL cache.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from functools import wraps
+from typing import Any
+
+from agent_framework import (
+    AIFunction,
+    FunctionInvocationContext,
+    ai_function,
+    function_middleware,
+)
+
+from app.core.metrics import counter, gauge, histogram
+
+_tool_latency = histogram(
+    "agent_tool_latency_seconds",
+    "Wall-clock latency of agent tool invocations.",
+    ["tool"],
+)
+_tool_errors = counter(
+    "agent_tool_errors_total", "Agent tool invocations that raised.", ["tool"]
+)
+_tool_cache_requests = counter(
+    "agent_tool_cache_requests_total",
+    "Cached tool lookups, by result.",
+    ["tool", "result"],
+)
+_tool_cache_entries = gauge(
+    "agent_tool_cache_entries", "Results currently held per tool cache.", ["tool"]
+)
+
+
+class ToolResultCache:
+    """Bounded, async-safe TTL cache with single-flight loading.
+
+    Concurrent misses for the same key share one in-flight computation instead
+    of running the tool several times. Only successful results are stored.
+    """
+
+    def __init__(self, *, name: str, maxsize: int, ttl: float):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key: Hashable) -> tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        _tool_cache_entries.set(len(self._entries), tool=self.name)
+
+    async def get_or_load(
+        self, key: Hashable, load: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        hit, value = self._lookup(key)
+        if hit:
+            _tool_cache_requests.inc(tool=self.name, result="hit")
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            _tool_cache_requests.inc(tool=self.name, result="shared")
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # 只有共享的加载被取消时才自行加载；自身被取消则继续向上抛出
+                if not inflight.cancelled():
+                    raise
+            return await load()
+
+        _tool_cache_requests.inc(tool=self.name, result="miss")
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await load()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # 避免无人等待时出现 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        else:
+            self._store(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+
+def _default_key(*args: Any, **kwargs: Any) -> Hashable:
+    return (args, tuple(sorted(kwargs.items())))
+
+
+def cached_ai_function(
+    *,
+    ttl: float,
+    key: Callable[..., Hashable] | None = None,
+    maxsize: int = 256,
+    **ai_function_kwargs: Any,
+) -> Callable[[Callable[..., Any]], AIFunction[Any, Any]]:
+    """``ai_function`` with result memoization and non-blocking execution.
+
+    Args:
+        ttl: Seconds a result stays valid.
+        key: Builds the cache key from the tool arguments. Defaults to all
+            arguments; pass a normalizing function to share entries between
+            equivalent inputs.
+        maxsize: Maximum number of cached results (LRU eviction).
+        **ai_function_kwargs: Forwarded to ``ai_function``.
+    """
+    if ai_function_kwargs.get("approval_mode") == "always_require":
+        # 需要人工审批的工具每次都必须经过审批流程，不能被缓存短路
+        raise ValueError("Tools that require approval cannot be cached.")
+
+    key_func = key or _default_key
+
+    def decorator(func: Callable[..., Any]) -> AIFunction[Any, Any]:
+        cache = ToolResultCache(
+            name=ai_function_kwargs.get("name") or func.__name__,
+            maxsize=maxsize,
+            ttl=ttl,
+        )
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            if inspect.iscoroutinefunction(func):
+                return await func(*args, **kwargs)
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return await cache.get_or_load(
+                key_func(*args, **kwargs), lambda: call(*args, **kwargs)
+            )
+
+        return ai_function(wrapper, **ai_function_kwargs)
+
+    return decorator
+
+
+@function_middleware
+async def tool_stats_middleware(
+    context: FunctionInvocationContext,
+    next: Callable[[FunctionInvocationContext], Awaitable[None]],
+) -> None:
+    """Record latency and failures of every tool call the agent makes."""
+    name = context.function.name
+    start = time.perf_counter()
+    try:
+        await next(context)
+    except Exception:
+        _tool_errors.inc(tool=name)
+        raise
+    finally:
+        _tool_latency.observe(time.perf_counter() - start, tool=name)
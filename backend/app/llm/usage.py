@@ -0,0 +1,335 @@
+"""Token usage accounting and per-user quotas.
+
+Every completion reports its usage here (``ResilientChatClient`` feeds both
+non-streaming responses and the usage chunk of streams). Usage is aggregated
+in memory per user, model and UTC day, and a background task flushes the
+deltas to ``llm_usage`` with one multi-row upsert per interval.
+
+Quota checks only read the in-memory totals. Each flush also reloads the
+day's per-user totals, so usage from other workers shows up within one flush
+interval without putting a query on the request path.
+
+Anonymous runs are persisted under ``ANONYMOUS_USER_ID`` and limited per
+client address by a separate quota. With ``SHARED_CACHE_ENABLED`` those
+counters live in the host's shared-memory cache, so every worker enforces the
+same budget; otherwise each worker counts on its own.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from datetime import UTC, date, datetime
+from hashlib import blake2b
+from http import HTTPStatus
+from uuid import UUID, uuid7  # type: ignore[attr-defined]
+
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert
+from sqlmodel import select
+
+from app.api.schemas.error import APIErrorType, APIException
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.metrics import counter, histogram
+from app.core.shared_cache import CacheBusyError, get_shared_cache
+from app.llm.models import LLMUsage
+
+# 匿名调用统一记在该 ID 下，配额按客户端地址单独计算
+ANONYMOUS_USER_ID = UUID(int=0)
+# 共享缓存中匿名计数的保留时间，键中带日期，过期只是为了回收槽位
+_ANONYMOUS_COUNTER_TTL = 2 * 86400
+
+_llm_tokens = counter(
+    "llm_tokens_total", "Tokens reported by the provider.", ["model", "kind"]
+)
+_quota_rejections = counter(
+    "llm_quota_rejections_total", "Agent runs refused because of the token quota."
+)
+_usage_flushes = counter(
+    "llm_usage_flushes_total", "Batched usage flushes, by outcome.", ["outcome"]
+)
+_run_tokens = histogram(
+    "agent_run_tokens",
+    "Total tokens spent by one agent run.",
+    buckets=(100, 500, 1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000),
+)
+_run_llm_calls = histogram(
+    "agent_run_llm_calls",
+    "Model calls per agent run (one per tool-loop iteration).",
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 24),
+)
+
+
+@dataclass
+class UsageTotals:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    requests: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, other: UsageTotals) -> None:
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.requests += other.requests
+
+
+@dataclass
+class RunUsage:
+    """Usage of a single agent run, across its whole tool loop."""
+
+    user_id: UUID | None
+    # 匿名运行的客户端地址，用于匿名配额
+    client: str | None = None
+    totals: UsageTotals = field(default_factory=UsageTotals)
+
+
+_current_run: ContextVar[RunUsage | None] = ContextVar("llm_run_usage", default=None)
+
+
+def bind_run_usage(run: RunUsage) -> Token[RunUsage | None]:
+    return _current_run.set(run)
+
+
+def observe_run(run: RunUsage) -> None:
+    if run.totals.requests:
+        _run_tokens.observe(run.totals.total_tokens)
+        _run_llm_calls.observe(run.totals.requests)
+
+
+class QuotaExceededError(APIException):
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=HTTPStatus.TOO_MANY_REQUESTS,
+            detail="Daily LLM token quota exceeded",
+            error_type=APIErrorType.QUOTA_EXCEEDED,
+        )
+
+
+def _today() -> date:
+    return datetime.now(UTC).date()
+
+
+def _anonymous_key(day: date, client: str) -> bytes:
+    # 地址取摘要，键长固定，不受 IPv6 地址长度与 SHARED_CACHE_KEY_BYTES 影响
+    digest = blake2b(client.encode(), digest_size=8).hexdigest()
+    return f"llm-anon:{day:%Y%m%d}:{digest}".encode()
+
+
+def _merge(target: dict[UUID, int], counts: dict[UUID, int], sign: int = 1) -> None:
+    for user_id, tokens in counts.items():
+        value = target.get(user_id, 0) + sign * tokens
+        if value:
+            target[user_id] = value
+        else:
+            target.pop(user_id, None)
+
+
+class UsageTracker:
+    """In-memory usage aggregation with batched persistence."""
+
+    def __init__(self, *, daily_quota: int | None, anonymous_quota: int | None = None):
+        self.daily_quota = daily_quota
+        self.anonymous_quota = anonymous_quota
+        self._lock = threading.Lock()
+        # 尚未写入数据库的增量
+        self._pending: dict[tuple[UUID, str, date], UsageTotals] = {}
+        # 当天各用户已用 token：数据库中的合计 + 本 worker 尚未反映在合计中的增量。
+        # 增量依次经过 未写入 -> 写入中 -> 已写入，直到 refresh() 重新读取合计才清除，
+        # 以免 flush 期间或刷新失败时少算
+        self._day = _today()
+        self._flushed: dict[UUID, int] = {}
+        self._unflushed: dict[UUID, int] = {}
+        self._flushing: dict[UUID, int] = {}
+        self._written: dict[UUID, int] = {}
+        # 当天各客户端地址的匿名用量（未启用共享缓存时仅本 worker）
+        self._anonymous: dict[str, int] = {}
+
+    def _roll_day(self) -> None:
+        today = _today()
+        if today != self._day:
+            self._day = today
+            self._flushed.clear()
+            self._unflushed.clear()
+            self._flushing.clear()
+            self._written.clear()
+            self._anonymous.clear()
+
+    def record(self, model: str, prompt_tokens: int, completion_tokens: int) -> None:
+        """Account one completion to the user of the current run."""
+        run = _current_run.get()
+        user_id = run.user_id if run is not None and run.user_id else ANONYMOUS_USER_ID
+        delta = UsageTotals(prompt_tokens, completion_tokens, 1)
+        if run is not None:
+            run.totals.add(delta)
+        _llm_tokens.inc(prompt_tokens, model=model, kind="prompt")
+        _llm_tokens.inc(completion_tokens, model=model, kind="completion")
+        with self._lock:
+            self._roll_day()
+            key = (user_id, model, self._day)
+            self._pending.setdefault(key, UsageTotals()).add(delta)
+            self._unflushed[user_id] = (
+                self._unflushed.get(user_id, 0) + delta.total_tokens
+            )
+            day = self._day
+        if user_id == ANONYMOUS_USER_ID and run is not None and run.client:
+            self._count_anonymous(day, run.client, delta.total_tokens)
+
+    def _count_anonymous(self, day: date, client: str, tokens: int) -> None:
+        shared = get_shared_cache()
+        if shared is not None:
+            try:
+                shared.incr(
+                    _anonymous_key(day, client), tokens, ttl=_ANONYMOUS_COUNTER_TTL
+                )
+                return
+            except CacheBusyError:
+                logger.warning("Shared cache busy, counting anonymous usage locally")
+        with self._lock:
+            self._roll_day()
+            self._anonymous[client] = self._anonymous.get(client, 0) + tokens
+
+    def used_today(self, user_id: UUID) -> int:
+        with self._lock:
+            self._roll_day()
+            return sum(
+                counts.get(user_id, 0)
+                for counts in (
+                    self._flushed,
+                    self._written,
+                    self._flushing,
+                    self._unflushed,
+                )
+            )
+
+    def used_today_anonymous(self, client: str) -> int:
+        with self._lock:
+            self._roll_day()
+            day, used = self._day, self._anonymous.get(client, 0)
+        shared = get_shared_cache()
+        if shared is not None:
+            used += shared.get_int(_anonymous_key(day, client))
+        return used
+
+    def check_quota(self, user_id: UUID | None, client: str | None = None) -> None:
+        """Refuse a run whose user (or anonymous client) used up today's quota.
+
+        Only reads memory.
+        """
+        if user_id is None:
+            if self.anonymous_quota is None or client is None:
+                return
+            used, quota = self.used_today_anonymous(client), self.anonymous_quota
+        else:
+            if self.daily_quota is None:
+                return
+            used, quota = self.used_today(user_id), self.daily_quota
+        if used >= quota:
+            _quota_rejections.inc()
+            raise QuotaExceededError()
+
+    def flush(self) -> int:
+        """Write pending deltas in one upsert, then refresh today's totals.
+
+        Returns the number of rows written. Blocking; run it in a thread.
+        """
+        from app.core.db import SessionLocal
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            unflushed, self._unflushed = self._unflushed, {}
+            _merge(self._flushing, unflushed)
+        if pending:
+            now = datetime.now(UTC)
+            rows = [
+                {
+                    "id": uuid7(),
+                    "user_id": user_id,
+                    "model": model,
+                    "usage_date": usage_date,
+                    "prompt_tokens": totals.prompt_tokens,
+                    "completion_tokens": totals.completion_tokens,
+                    "requests": totals.requests,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for (user_id, model, usage_date), totals in pending.items()
+            ]
+            stmt = insert(LLMUsage).values(rows)
+            stmt = stmt.on_duplicate_key_update(
+                prompt_tokens=LLMUsage.prompt_tokens + stmt.inserted.prompt_tokens,
+                completion_tokens=LLMUsage.completion_tokens
+                + stmt.inserted.completion_tokens,
+                requests=LLMUsage.requests + stmt.inserted.requests,
+                updated_at=stmt.inserted.updated_at,
+            )
+            try:
+                with SessionLocal() as session:
+                    session.exec(stmt)  # type: ignore[call-overload]
+                    session.commit()
+            except Exception:
+                # 写入失败时把增量放回，下一轮重试
+                with self._lock:
+                    for key, value in pending.items():
+                        self._pending.setdefault(key, UsageTotals()).add(value)
+                    _merge(self._flushing, unflushed, -1)
+                    _merge(self._unflushed, unflushed)
+                _usage_flushes.inc(outcome="error")
+                raise
+            _usage_flushes.inc(outcome="ok")
+        with self._lock:
+            _merge(self._flushing, unflushed, -1)
+            _merge(self._written, unflushed)
+        self.refresh()
+        return len(pending)
+
+    def refresh(self) -> None:
+        """Reload today's per-user totals, including other workers' usage."""
+        from app.core.db import SessionLocal
+
+        day = _today()
+        with self._lock:
+            # 查询之前已提交的增量会包含在合计中
+            written = dict(self._written)
+        with SessionLocal() as session:
+            totals = session.exec(
+                select(
+                    LLMUsage.user_id,
+                    func.sum(LLMUsage.prompt_tokens + LLMUsage.completion_tokens),
+                )
+                .where(
+                    LLMUsage.usage_date == day, LLMUsage.user_id != ANONYMOUS_USER_ID
+                )
+                .group_by(LLMUsage.user_id)  # type: ignore[arg-type]
+            ).all()
+        with self._lock:
+            self._roll_day()
+            if self._day == day:
+                self._flushed = {user_id: int(used or 0) for user_id, used in totals}
+                _merge(self._written, written, -1)
+
+    async def run_flusher(self, interval: float) -> None:
+        """Flush periodically until cancelled, then flush one last time."""
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await asyncio.to_thread(self.flush)
+                except Exception:
+                    logger.exception("Flushing LLM usage failed")
+        finally:
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception:
+                logger.exception("Final LLM usage flush failed")
+
+
+usage_tracker = UsageTracker(
+    daily_quota=settings.LLM_DAILY_TOKEN_QUOTA,
+    anonymous_quota=settings.LLM_ANONYMOUS_DAILY_TOKEN_QUOTA,
+)
@@ -1,20 +1,74 @@
-from agent_framework_ag_ui import add_agent_framework_fastapi_endpoint
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.handlers import general_exception_handler
 from app.api.main import api_router
-from app.api.middlewares import LoggingMiddleware, RequestIDMiddleware
+from app.api.middlewares import (
+    IdempotencyMiddleware,
+    LoggingMiddleware,
+    RequestIDMiddleware,
+)
+from app.api.routes.auth.revocation import revocation_list
+from app.api.routes.auth.router import access_token_replayable
+from app.api.routes.user.cache import current_user_cache
 from app.core.config import settings
-from app.core.logger import setup_logger
+from app.core.logger import logger, setup_logger
+from app.core.purge import run_purger
+from app.core.warmup import run_warmup
 from app.llm.agent import create_agent
 from app.llm.chat_client import get_chat_client
+from app.llm.endpoint import add_agent_endpoint
+from app.llm.thread_store import ThreadStore
+from app.llm.usage import usage_tracker
 
 # 初始化日志配置
 setup_logger()
 
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    # lifespan 启动完成前 uvicorn 不会 accept，预热期间请求留在监听队列中
+    if settings.WARMUP_ENABLED:
+        await asyncio.to_thread(run_warmup, settings.DB_POOL_SIZE)
+    # 载入当天各用户的 token 用量，配额检查只读内存
+    try:
+        await asyncio.to_thread(usage_tracker.refresh)
+    except Exception:
+        logger.exception("Loading LLM usage failed")
+    # 载入已吊销令牌的 Bloom 过滤器，之后按间隔增量刷新
+    try:
+        await asyncio.to_thread(revocation_list.rebuild)
+    except Exception:
+        logger.exception("Loading revoked tokens failed")
+    tasks = [
+        asyncio.create_task(
+            usage_tracker.run_flusher(settings.LLM_USAGE_FLUSH_INTERVAL)
+        ),
+        asyncio.create_task(
+            revocation_list.run_refresher(settings.TOKEN_REVOCATION_REFRESH_INTERVAL)
+        ),
+        asyncio.create_task(
+            current_user_cache.run_poller(
+                settings.CURRENT_USER_INVALIDATION_POLL_INTERVAL
+            )
+        ),
+    ]
+    if settings.PURGE_ENABLED:
+        tasks.append(asyncio.create_task(run_purger(settings.PURGE_INTERVAL)))
+    yield
+    # 取消后 run_flusher 会在退出前写入剩余用量，清理任务在当前段结束后退出
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
 app = FastAPI(
+    lifespan=lifespan,
     # 生产环境不暴露 OpenAPI 接口
     openapi_url=None if settings.ENV == "production" else "/openapi.json",
 )
@@ -28,12 +82,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Request-ID"],
+    expose_headers=["X-Request-ID", "ETag"],
 )
 
 # 注意：FastAPI/Starlette 中间件是“后添加先执行”（最后 add 的在最外层）。
 # 因此要让 RequestIDMiddleware 先执行并写入 request.state.request_id，
 # 需要先添加 LoggingMiddleware，再添加 RequestIDMiddleware。
+# IdempotencyMiddleware 在最内层：回放的响应同样经过日志与 request_id 处理。
+if settings.IDEMPOTENCY_ENABLED:
+    # 登录重试复用已签发的令牌（不再执行 argon2），前提是该令牌此后没有被吊销
+    app.add_middleware(
+        IdempotencyMiddleware,
+        replay_checks={
+            f"{settings.API_V1_STR}/auth/access-token": access_token_replayable
+        },
+    )
 app.add_middleware(LoggingMiddleware)
 app.add_middleware(RequestIDMiddleware)
 
@@ -49,8 +112,13 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 
 my_agent = create_agent(get_chat_client())
 
-add_agent_framework_fastapi_endpoint(
+add_agent_endpoint(
     app=app,
     agent=my_agent,
     path=f"{settings.API_V1_STR}/agent",
+    thread_store=ThreadStore(
+        maxsize=settings.AGENT_THREAD_CACHE_SIZE,
+        compact_threshold=settings.AGENT_THREAD_COMPACT_THRESHOLD,
+        keep_messages=settings.AGENT_THREAD_KEEP_MESSAGES,
+    ),
 )
@@ -0,0 +1,35 @@
+"""数据库与缓存相关的基准测试脚本，结果以 JSON 输出"""
+
+import json
+import math
+from pathlib import Path
+from typing import Any
+
+from app.core.logger import logger
+
+
+def percentiles(values: list[float]) -> dict[str, float | None]:
+    """最近秩（nearest-rank）百分位，单位毫秒"""
+    if not values:
+        return {"p50": None, "p90": None, "p99": None, "max": None}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        index = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+        return round(ordered[index] * 1000, 4)
+
+    return {
+        "p50": rank(50),
+        "p90": rank(90),
+        "p99": rank(99),
+        "max": round(ordered[-1] * 1000, 4),
+    }
+
+
+def emit(result: dict[str, Any], output: Path | None) -> None:
+    text = json.dumps(result, indent=2, default=str)
+    if output:
+        output.write_text(text + "\n")
+        logger.info(f"Benchmark results written to {output}")
+    else:
+        print(text)  # noqa: T201
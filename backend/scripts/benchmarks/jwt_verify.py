@@ -0,0 +1,93 @@
+"""
+访问令牌签名与校验延迟基准
+
+在临时目录中生成 Ed25519 与 RSA 2048 密钥，对 HS256（当前默认）、EdDSA、RS256 三种密钥环
+分别测量：
+
+- sign：签发 --tokens 个令牌
+- verify_cold：逐个校验这些令牌（首次出现，完整的签名校验）
+- verify_warm：再校验一遍（命中已校验令牌缓存，即同一令牌后续请求的开销）
+
+    uv run python -m scripts.benchmarks.jwt_verify --tokens 5000 --output jwt.json
+"""
+
+import argparse
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+from app.api.routes.auth.keys import Keyring
+from scripts.benchmarks import emit, percentiles
+
+
+def _write_key(directory: Path, kid: str, private_key: Any) -> None:
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    (directory / f"{kid}.pem").write_bytes(pem)
+
+
+def _measure(
+    fn: Callable[[Any], Any], items: list[Any]
+) -> tuple[list[Any], list[float]]:
+    results, latencies = [], []
+    for item in items:
+        started = time.perf_counter()
+        results.append(fn(item))
+        latencies.append(time.perf_counter() - started)
+    return results, latencies
+
+
+def _run(keyring: Keyring, tokens: int) -> dict[str, Any]:
+    expires = datetime.now(UTC) + timedelta(hours=1)
+    claims = [
+        {"exp": expires, "sub": str(uuid4()), "jti": uuid4().hex, "iat": time.time()}
+        for _ in range(tokens)
+    ]
+    signed, sign_latencies = _measure(keyring.sign, claims)
+    _, cold = _measure(keyring.verify, signed)
+    _, warm = _measure(keyring.verify, signed)
+    return {
+        "token_bytes": len(signed[0]),
+        "sign_ms": percentiles(sign_latencies),
+        "verify_cold_ms": percentiles(cold),
+        "verify_warm_ms": percentiles(warm),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=5000)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    secret = uuid4().hex
+    with tempfile.TemporaryDirectory() as tmp:
+        keys_dir = Path(tmp)
+        _write_key(keys_dir, "ed", ed25519.Ed25519PrivateKey.generate())
+        _write_key(keys_dir, "rsa", rsa.generate_private_key(65537, 2048))
+        # 缓存容量覆盖全部令牌，warm 一轮全部命中
+        options = {"secret": secret, "verified_cache_size": args.tokens}
+        keyrings = {
+            "HS256": Keyring(**options),
+            "EdDSA": Keyring(**options, keys_dir=keys_dir, active_kid="ed"),
+            "RS256": Keyring(**options, keys_dir=keys_dir, active_kid="rsa"),
+        }
+        result = {
+            "tokens": args.tokens,
+            **{name: _run(keyring, args.tokens) for name, keyring in keyrings.items()},
+        }
+    emit(result, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+大表回填方式的基准：单条 UPDATE 与 `online_migration.backfill` 分段回填
+
+创建临时表 `bench_backfill_<随机>` 并写入 --rows 行（BINARY(16) 主键 + email），然后分别执行
+
+- single：`UPDATE ... SET email_lower_a = LOWER(email)`（迁移中直接 op.execute 的写法）
+- chunked：`backfill(...)` 按 --batch-size 分段、段间休眠 --throttle 秒
+
+执行期间另一个线程持续对随机行做主键更新，模拟线上写入，记录其延迟与锁等待超时次数。
+结束后删除临时表。
+
+    uv run python -m scripts.benchmarks.online_backfill --rows 1000000 --output backfill.json
+"""
+
+import argparse
+import random
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+from uuid import uuid4, uuid7  # type: ignore[attr-defined]
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.core.db import engine
+from app.core.online_migration import backfill
+from app.core.purge import Checkpoint
+from scripts.benchmarks import emit, percentiles
+
+SEED_BATCH = 10_000
+
+
+def _seed(table: str, rows: int) -> list[bytes]:
+    """建表并写入 rows 行，返回抽样的主键（供并发写入线程使用）"""
+    sample: list[bytes] = []
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            f"CREATE TABLE `{table}` ("
+            "id BINARY(16) NOT NULL PRIMARY KEY, "
+            "email VARCHAR(255) NOT NULL, "
+            "email_lower_a VARCHAR(255) NULL, "
+            "email_lower_b VARCHAR(255) NULL)"
+        )
+    insert = text(f"INSERT INTO `{table}` (id, email) VALUES (:id, :email)")
+    for start in range(0, rows, SEED_BATCH):
+        batch = [
+            {"id": uuid7().bytes, "email": f"User-{start + i}@Example.com"}
+            for i in range(min(SEED_BATCH, rows - start))
+        ]
+        with engine.begin() as conn:
+            conn.execute(insert, batch)
+        sample.extend(row["id"] for row in random.sample(batch, min(100, len(batch))))
+    return sample
+
+
+def _concurrent_writer(
+    table: str, ids: list[bytes], stop: threading.Event, result: dict[str, Any]
+) -> None:
+    latencies: list[float] = []
+    timeouts = 0
+    statement = text(f"UPDATE `{table}` SET email = email WHERE id = :id")
+    with engine.connect() as conn:
+        conn.exec_driver_sql("SET SESSION innodb_lock_wait_timeout = 5")
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                conn.execute(statement, {"id": random.choice(ids)})
+                conn.commit()
+            except OperationalError:
+                conn.rollback()
+                timeouts += 1
+            latencies.append(time.perf_counter() - started)
+            time.sleep(0.01)
+    result.update(
+        writes=len(latencies),
+        write_latency_ms=percentiles(latencies),
+        lock_wait_timeouts=timeouts,
+    )
+
+
+def _measure(table: str, ids: list[bytes], run: Callable[[], int]) -> dict[str, Any]:
+    stop = threading.Event()
+    writer: dict[str, Any] = {}
+    thread = threading.Thread(
+        target=_concurrent_writer, args=(table, ids, stop, writer)
+    )
+    thread.start()
+    started = time.perf_counter()
+    try:
+        rows = run()
+    finally:
+        elapsed = time.perf_counter() - started
+        stop.set()
+        thread.join()
+    return {"rows": rows, "seconds": round(elapsed, 3), "concurrent_writer": writer}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--throttle", type=float, default=0.05)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    table = f"bench_backfill_{uuid4().hex[:8]}"
+    try:
+        seed_started = time.perf_counter()
+        ids = _seed(table, args.rows)
+        seed_seconds = time.perf_counter() - seed_started
+
+        def single() -> int:
+            with engine.begin() as conn:
+                return conn.execute(
+                    text(f"UPDATE `{table}` SET email_lower_a = LOWER(email)")
+                ).rowcount
+
+        def chunked() -> int:
+            with engine.connect() as conn:
+                autocommit = conn.execution_options(isolation_level="AUTOCOMMIT")
+                return backfill(
+                    table,
+                    "email_lower_b = LOWER(email)",
+                    where="email_lower_b IS NULL",
+                    batch_size=args.batch_size,
+                    throttle=args.throttle,
+                    checkpoint=Checkpoint(),
+                    connection=autocommit,
+                ).rows
+
+        result = {
+            "rows": args.rows,
+            "batch_size": args.batch_size,
+            "throttle": args.throttle,
+            "seed_seconds": round(seed_seconds, 3),
+            "single": _measure(table, ids, single),
+            "chunked": _measure(table, ids, chunked),
+        }
+    finally:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS `{table}`")
+    emit(result, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+共享内存缓存在多进程争用下的读写延迟基准
+
+创建一个临时的共享缓存段，预先写入 --keys 个键，然后对 --processes 中的每个进程数 P
+启动 P 个进程，各自持续 --duration 秒随机读写这些键（写入比例 --write-ratio，写入中
+一半为 set、一半为 incr），分别统计读、写延迟与吞吐。结束后删除共享内存段。
+
+    uv run python -m scripts.benchmarks.shared_cache --processes 1 2 4 8 --output shm.json
+"""
+
+import argparse
+import multiprocessing
+import random
+import time
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+from app.core.shared_cache import SharedCache
+from scripts.benchmarks import emit, percentiles
+
+
+def _worker(
+    name: str,
+    geometry: dict[str, int],
+    keys: int,
+    write_ratio: float,
+    duration: float,
+    start_at: float,
+    results: Any,
+) -> None:
+    cache = SharedCache(name, **geometry)
+    rng = random.Random()
+    value = b"x" * 200
+    reads: list[float] = []
+    writes: list[float] = []
+    hits = 0
+    # 所有进程同时开始，保证测量期间确实存在争用
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = time.perf_counter() + duration
+    while (now := time.perf_counter()) < deadline:
+        key = f"key-{rng.randrange(keys)}".encode()
+        roll = rng.random()
+        if roll < write_ratio / 2:
+            cache.set(key, value, ttl=300)
+            writes.append(time.perf_counter() - now)
+        elif roll < write_ratio:
+            cache.incr(b"counter-" + key, ttl=300)
+            writes.append(time.perf_counter() - now)
+        else:
+            hits += cache.get(key) is not None
+            reads.append(time.perf_counter() - now)
+    cache.close()
+    results.put({"reads": reads, "writes": writes, "hits": hits})
+
+
+def _run(
+    name: str,
+    geometry: dict[str, int],
+    processes: int,
+    args: argparse.Namespace,
+) -> dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    start_at = time.time() + 1.0
+    workers = [
+        context.Process(
+            target=_worker,
+            args=(
+                name,
+                geometry,
+                args.keys,
+                args.write_ratio,
+                args.duration,
+                start_at,
+                results,
+            ),
+        )
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    collected = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    reads = [latency for item in collected for latency in item["reads"]]
+    writes = [latency for item in collected for latency in item["writes"]]
+    return {
+        "ops_per_second": round((len(reads) + len(writes)) / args.duration),
+        "reads": len(reads),
+        "read_hit_rate": round(
+            sum(item["hits"] for item in collected) / max(1, len(reads)), 4
+        ),
+        "read_latency_ms": percentiles(reads),
+        "writes": len(writes),
+        "write_latency_ms": percentiles(writes),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--keys", type=int, default=10_000)
+    parser.add_argument("--slots", type=int, default=65_536)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    name = f"bench-shared-cache-{uuid4().hex[:8]}"
+    geometry = {"slots": args.slots, "key_bytes": 64, "value_bytes": 448}
+    cache = SharedCache(name, **geometry)
+    try:
+        for i in range(args.keys):
+            cache.set(f"key-{i}".encode(), b"x" * 200, ttl=300)
+        result = {
+            "keys": args.keys,
+            "slots": args.slots,
+            "write_ratio": args.write_ratio,
+            "duration_seconds": args.duration,
+            "by_processes": {
+                str(processes): _run(name, geometry, processes, args)
+                for processes in args.processes
+            },
+        }
+    finally:
+        cache.unlink()
+        cache.close()
+    emit(result, args.output)
+
+
+if __name__ == "__main__":
+    main()
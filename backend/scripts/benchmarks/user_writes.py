@@ -0,0 +1,128 @@
+"""
+用户写入路径的数据库往返次数基准
+
+对比两种写入方式，每种执行 --rows 次「创建用户 → 更新用户 → 序列化为 UserPublic」：
+
+- refresh：expire_on_commit=True，提交后 `session.refresh`（原写入路径）
+- current：`SessionLocal`（expire_on_commit=False）+ `create_user` / `update_user`
+
+往返次数按引擎上执行的语句数与 COMMIT 数统计，另外记录每次写入的耗时（两种方式都包含
+一次 argon2 哈希）。结束后删除写入的行。
+
+    uv run python -m scripts.benchmarks.user_writes --rows 1000 --output writes.json
+"""
+
+import argparse
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+from sqlalchemy import delete, event
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import Session, col
+
+from app.api.routes.user import service
+from app.api.routes.user.models import User
+from app.api.routes.user.schemas import UserCreate, UserPublic, UserUpdate
+from app.core.db import SessionLocal, engine
+from scripts.benchmarks import emit, percentiles
+
+
+class _RoundTrips:
+    def __init__(self) -> None:
+        self.statements = 0
+        self.commits = 0
+
+    def _on_execute(self, *_: Any) -> None:
+        self.statements += 1
+
+    def _on_commit(self, *_: Any) -> None:
+        self.commits += 1
+
+    @contextmanager
+    def counting(self) -> Iterator[None]:
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+        try:
+            yield
+        finally:
+            event.remove(engine, "before_cursor_execute", self._on_execute)
+            event.remove(engine, "commit", self._on_commit)
+
+
+def _write_with_refresh(session: Session, email: str) -> None:
+    user = User.model_validate(
+        UserCreate(email=email, password="benchmark-password"),
+        update={"hashed_password": service.get_password_hash("benchmark-password")},
+    )
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    user.sqlmodel_update({"full_name": "Benchmark User"})
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    UserPublic.model_validate(user)
+
+
+def _write_current(session: Session, email: str) -> None:
+    user = service.create_user(
+        session=session,
+        user_create=UserCreate(email=email, password="benchmark-password"),
+    )
+    user = service.update_user(
+        session=session, db_user=user, user_in=UserUpdate(full_name="Benchmark User")
+    )
+    UserPublic.model_validate(user)
+
+
+def _run(
+    name: str,
+    make_session: Callable[[], Session],
+    write: Callable[[Session, str], None],
+    rows: int,
+    prefix: str,
+) -> dict[str, Any]:
+    counter = _RoundTrips()
+    latencies: list[float] = []
+    with make_session() as session, counter.counting():
+        for i in range(rows):
+            started = time.perf_counter()
+            write(session, f"{prefix}-{name}-{i}@example.com")
+            latencies.append(time.perf_counter() - started)
+    return {
+        "writes": rows,
+        "statements_per_write": counter.statements / rows,
+        "commits_per_write": counter.commits / rows,
+        "round_trips_per_write": (counter.statements + counter.commits) / rows,
+        "latency_ms": percentiles(latencies),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    prefix = f"bench-{uuid4().hex[:8]}"
+    legacy_sessions = sessionmaker(bind=engine, class_=Session, expire_on_commit=True)
+    try:
+        result = {
+            "rows": args.rows,
+            "refresh": _run(
+                "refresh", legacy_sessions, _write_with_refresh, args.rows, prefix
+            ),
+            "current": _run("current", SessionLocal, _write_current, args.rows, prefix),
+        }
+    finally:
+        with engine.begin() as conn:
+            conn.execute(delete(User).where(col(User.email).startswith(prefix)))
+    emit(result, args.output)
+
+
+if __name__ == "__main__":
+    main()
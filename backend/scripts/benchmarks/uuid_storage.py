@@ -0,0 +1,140 @@
+"""
+UUID 主键存储格式基准：CHAR(32)（`sa.Uuid`）对比 BINARY(16)（`BinaryUUID`）
+
+在当前配置的数据库中创建两张结构与 user 表相同的临时表，各写入 --rows 行
+（uuid7 主键 + email 二级索引），然后比较：
+
+- 数据与索引大小（information_schema，ANALYZE 之后）
+- 写入耗时
+- `session.get(Model, id)` 主键点查延迟（每次查询前清空 identity map）
+
+    uv run python -m scripts.benchmarks.uuid_storage --rows 10000000 --output uuid.json
+"""
+
+import argparse
+import random
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+from uuid import UUID, uuid7  # type: ignore[attr-defined]
+
+import sqlalchemy as sa
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+
+from app.core.db import engine
+from app.core.logger import logger
+from app.core.types import BinaryUUID
+from scripts.benchmarks import emit, percentiles
+
+
+class _Base(DeclarativeBase):
+    pass
+
+
+class CharUser(_Base):
+    __tablename__ = "bench_uuid_char32"
+    __table_args__ = (sa.Index("ix_bench_uuid_char32_email", "email"),)
+
+    id: Mapped[UUID] = mapped_column(sa.Uuid(), primary_key=True)
+    email: Mapped[str] = mapped_column(sa.String(255))
+    created_at: Mapped[datetime] = mapped_column(sa.DateTime())
+
+
+class BinaryUser(_Base):
+    __tablename__ = "bench_uuid_binary16"
+    __table_args__ = (sa.Index("ix_bench_uuid_binary16_email", "email"),)
+
+    id: Mapped[UUID] = mapped_column(BinaryUUID(), primary_key=True)
+    email: Mapped[str] = mapped_column(sa.String(255))
+    created_at: Mapped[datetime] = mapped_column(sa.DateTime())
+
+
+def _load(
+    model: type[_Base], rows: int, batch: int, sample_every: int
+) -> tuple[float, list[UUID]]:
+    table = model.__table__
+    sample: list[UUID] = []
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch):
+            now = datetime.now(UTC)
+            chunk: list[dict[str, Any]] = []
+            for i in range(offset, min(offset + batch, rows)):
+                row_id = uuid7()
+                if i % sample_every == 0:
+                    sample.append(row_id)
+                chunk.append(
+                    {"id": row_id, "email": f"user{i}@example.com", "created_at": now}
+                )
+            conn.execute(table.insert(), chunk)  # type: ignore[attr-defined]
+            if offset and offset % (batch * 100) == 0:
+                logger.info(f"{table.name}: {offset} rows")  # type: ignore[attr-defined]
+    return time.perf_counter() - started, sample
+
+
+def _sizes(table: str) -> dict[str, int]:
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"ANALYZE TABLE `{table}`")
+        data, index = conn.execute(
+            sa.text(
+                "SELECT DATA_LENGTH, INDEX_LENGTH FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+            ),
+            {"table": table},
+        ).one()
+    return {"data_bytes": int(data), "index_bytes": int(index)}
+
+
+def _lookups(model: type[_Base], ids: list[UUID], lookups: int) -> list[float]:
+    timings: list[float] = []
+    with Session(engine) as session:
+        for row_id in random.choices(ids, k=lookups):
+            session.expunge_all()
+            started = time.perf_counter()
+            assert session.get(model, row_id) is not None
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def run_benchmark(*, rows: int, batch: int, lookups: int, keep: bool) -> dict[str, Any]:
+    _Base.metadata.drop_all(engine)
+    _Base.metadata.create_all(engine)
+    sample_every = max(1, rows // 100_000)
+    result: dict[str, Any] = {"rows": rows, "lookups": lookups}
+    try:
+        for name, model in (("char32", CharUser), ("binary16", BinaryUser)):
+            load_seconds, sample = _load(model, rows, batch, sample_every)
+            _lookups(model, sample, min(lookups, 1000))  # 预热 buffer pool
+            result[name] = {
+                "load_seconds": round(load_seconds, 2),
+                **_sizes(model.__tablename__),
+                "get_ms": percentiles(_lookups(model, sample, lookups)),
+            }
+            logger.info(f"{name}: {result[name]}")
+    finally:
+        if not keep:
+            _Base.metadata.drop_all(engine)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare CHAR(32) and BINARY(16) UUID keys"
+    )
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark tables")
+    parser.add_argument("--output", type=Path, help="Write JSON results to this file")
+    args = parser.parse_args()
+    emit(
+        run_benchmark(
+            rows=args.rows, batch=args.batch, lookups=args.lookups, keep=args.keep
+        ),
+        args.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
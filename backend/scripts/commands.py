@@ -1,8 +1,13 @@
 """项目命令行工具入口"""
 
+import importlib.util
+import math
 import os
 import subprocess
 import sys
+from pathlib import Path
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
 
 
 def lint():
@@ -21,10 +26,87 @@ def dev():
     os.execvp("fastapi", ["fastapi", "dev"])
 
 
+def _cgroup_cpu_limit(root: Path) -> float | None:
+    """容器的 CPU 限额（核数），未限制时返回 None"""
+    # cgroup v2: "<quota> <period>" 或 "max <period>"
+    cpu_max = root / "cpu.max"
+    if cpu_max.is_file():
+        quota, _, period = cpu_max.read_text().strip().partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+    # cgroup v1
+    for directory in (root / "cpu", root / "cpu,cpuacct"):
+        quota_file = directory / "cpu.cfs_quota_us"
+        period_file = directory / "cpu.cfs_period_us"
+        if quota_file.is_file() and period_file.is_file():
+            quota_us = int(quota_file.read_text())
+            if quota_us > 0:
+                return quota_us / int(period_file.read_text())
+            return None
+    return None
+
+
+def available_cpus(cgroup_root: Path = CGROUP_ROOT) -> float:
+    """当前进程实际可用的 CPU 数：CPU 亲和性与 cgroup 限额取较小值"""
+    if hasattr(os, "sched_getaffinity"):
+        cpus: float = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    try:
+        limit = _cgroup_cpu_limit(cgroup_root)
+    except (OSError, ValueError):
+        limit = None
+    if limit is not None:
+        cpus = min(cpus, limit)
+    return cpus
+
+
+def default_workers(cgroup_root: Path = CGROUP_ROOT) -> int:
+    # 向下取整：超出 cgroup 限额的 worker 只会被限流，并拉高尾延迟
+    return max(1, math.floor(available_cpus(cgroup_root)))
+
+
 def start():
-    """启动生产服务器"""
+    """启动生产服务器
+
+    worker 数按可用 CPU（含 cgroup 限额）计算，可用 SERVER_WORKERS 覆盖；
+    安装了 uvloop / httptools 时优先使用。每个 worker 在 lifespan 中完成预热后才开始接收请求。
+    """
     os.environ["ENV"] = "production"
-    os.execvp("fastapi", ["fastapi", "start"])
+    import uvicorn
+
+    from app.core.config import settings
+    from app.core.shared_cache import remove_segment
+
+    workers = settings.SERVER_WORKERS or default_workers()
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    print(  # noqa: T201
+        f"Starting {workers} worker(s) on {settings.SERVER_HOST}:{settings.SERVER_PORT} "
+        f"(loop={loop}, http={http})"
+    )
+    if settings.SHARED_CACHE_ENABLED:
+        # 上次未正常退出时残留的共享内存段（布局可能已随配置改变）
+        remove_segment(settings.SHARED_CACHE_NAME)
+    try:
+        uvicorn.run(
+            "app.main:app",
+            host=settings.SERVER_HOST,
+            port=settings.SERVER_PORT,
+            workers=workers,
+            loop=loop,
+            http=http,
+            timeout_keep_alive=settings.SERVER_KEEPALIVE,
+            backlog=settings.SERVER_BACKLOG,
+            proxy_headers=True,
+            # 请求日志已由 LoggingMiddleware 记录
+            access_log=False,
+        )
+    finally:
+        # 所有 worker 都已退出，共享缓存不再需要
+        if settings.SHARED_CACHE_ENABLED:
+            remove_segment(settings.SHARED_CACHE_NAME)
 
 
 def migrate_dev():
@@ -39,6 +121,24 @@ def migrate_prod():
     os.execvp("alembic", ["alembic", "upgrade", "head"])
 
 
+def migrate_phase():
+    """只升级到指定阶段为止：`uv run migrate-phase expand|backfill|contract`
+
+    迁移模块通过 `phase = "..."` 声明阶段（默认 expand），见 app/core/online_migration.py
+    """
+    from alembic.config import Config
+
+    from app.core.online_migration import PHASES, phase_target
+
+    if len(sys.argv) != 2 or sys.argv[1] not in PHASES:
+        sys.exit(f"usage: migrate-phase {{{'|'.join(PHASES)}}}")
+    target = phase_target(Config("alembic.ini"), sys.argv[1])
+    if target is None:
+        print(f"No pending migrations for the {sys.argv[1]} phase")  # noqa: T201
+        return
+    os.execvp("alembic", ["alembic", "upgrade", target])
+
+
 def make_migrations():
     """生成迁移脚本（开发环境）"""
     os.environ["ENV"] = "development"
@@ -0,0 +1,72 @@
+"""
+用户导出命令行工具
+
+    uv run export-users --format csv --output users.csv.gz
+    uv run export-users --include-deleted > users.ndjson
+
+输出文件名以 .gz 结尾（或指定 --gzip）时边导出边压缩。
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import BinaryIO
+
+from app.api.routes.user.export import CHUNK_SIZE, export_users, gzip_stream
+from app.core.logger import logger
+
+
+async def _write(
+    out: BinaryIO, *, fmt: str, include_deleted: bool, gzip: bool, chunk_size: int
+) -> int:
+    body = export_users(fmt=fmt, include_deleted=include_deleted, chunk_size=chunk_size)  # type: ignore[arg-type]
+    if gzip:
+        body = gzip_stream(body)
+    written = 0
+    async for chunk in body:
+        out.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export users as NDJSON or CSV")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--include-deleted", action="store_true")
+    parser.add_argument("--output", type=Path, help="Output file (default: stdout)")
+    parser.add_argument("--gzip", action="store_true", help="Gzip the output")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    gzip = args.gzip or (args.output is not None and args.output.suffix == ".gz")
+    started = time.perf_counter()
+    if args.output is None:
+        written = asyncio.run(
+            _write(
+                sys.stdout.buffer,
+                fmt=args.format,
+                include_deleted=args.include_deleted,
+                gzip=gzip,
+                chunk_size=args.chunk_size,
+            )
+        )
+    else:
+        with args.output.open("wb") as out:
+            written = asyncio.run(
+                _write(
+                    out,
+                    fmt=args.format,
+                    include_deleted=args.include_deleted,
+                    gzip=gzip,
+                    chunk_size=args.chunk_size,
+                )
+            )
+    logger.info(
+        f"export-users: {written} bytes written in {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
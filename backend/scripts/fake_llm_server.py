@@ -0,0 +1,379 @@
+"""
+本地 OpenAI 兼容的假 LLM 服务
+
+用于压测与测试：以可配置的速率流式返回 chat.completions 分片，可模拟首 token 延迟分布、
+工具调用与错误注入，不消耗真实模型额度。
+
+用法：
+    uv run fake-llm --port 9000 --tokens-per-second 40 --tool-call-rate 0.2
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1 OPENAI_API_KEY=fake uv run dev
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+_WORDS = (
+    "the quick brown fox jumps over a lazy dog while patient rivers carve "
+    "stone and early birds share proverbs about wisdom kindness and time"
+).split()
+
+
+@dataclass
+class FakeLLMConfig:
+    tokens_per_second: float = 50.0
+    response_tokens: int = 64
+    # 首 token 延迟服从对数正态分布：中位数 ttft_ms，离散程度 ttft_sigma
+    ttft_ms: float = 300.0
+    ttft_sigma: float = 0.5
+    tool_call_rate: float = 0.0
+    error_rate: float = 0.0
+    stream_error_rate: float = 0.0
+    # 每 stall_every 个请求中的第一个在首 token 前额外卡顿 stall_ms（0 表示关闭）
+    stall_every: int = 0
+    stall_ms: float = 5000.0
+    # 逗号分隔的模型名，请求这些模型时一律返回 500，模拟单个档位故障
+    fail_models: str = ""
+    seed: int | None = None
+
+
+@dataclass
+class FakeLLMStats:
+    requests: int = 0
+    completed: int = 0
+    # 客户端在流结束前断开
+    aborted: int = 0
+    errors: int = 0
+    active_streams: int = 0
+    tokens_sent: int = 0
+    last_abort_at: float | None = None
+    # 最近的请求记录（模型、到达时间），供测试断言路由/回退行为
+    request_log: deque[dict[str, Any]] = field(
+        default_factory=lambda: deque(maxlen=1024)
+    )
+
+
+def _sample_ttft(config: FakeLLMConfig, rng: random.Random) -> float:
+    if config.ttft_ms <= 0:
+        return 0.0
+    return rng.lognormvariate(math.log(config.ttft_ms), config.ttft_sigma) / 1000
+
+
+def _estimate_prompt_tokens(messages: list[dict[str, Any]]) -> int:
+    chars = sum(len(json.dumps(m.get("content") or "")) for m in messages)
+    return max(1, chars // 4)
+
+
+def _sample_value(schema: dict[str, Any]) -> Any:
+    match schema.get("type"):
+        case "integer":
+            return 0
+        case "number":
+            return 0.0
+        case "boolean":
+            return True
+        case "array":
+            return []
+        case "object":
+            return {}
+        case _:
+            return "Paris"
+
+
+def _fake_tool_call(tools: list[dict[str, Any]], rng: random.Random) -> dict[str, Any]:
+    function = rng.choice(tools)["function"]
+    params = function.get("parameters") or {}
+    properties = params.get("properties") or {}
+    arguments = {
+        name: _sample_value(properties.get(name, {}))
+        for name in params.get("required", [])
+    }
+    return {
+        "id": f"call_{uuid.uuid4().hex[:24]}",
+        "name": function["name"],
+        "arguments": json.dumps(arguments),
+    }
+
+
+def _chunk(
+    completion_id: str, model: str, delta: dict[str, Any], finish_reason: str | None
+) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def create_app(config: FakeLLMConfig | None = None) -> FastAPI:
+    """创建假 LLM 应用；统计信息挂在 `app.state.stats` 上，便于测试断言"""
+
+    config = config or FakeLLMConfig()
+    rng = random.Random(config.seed)
+    app = FastAPI(openapi_url=None)
+    app.state.config = config
+    app.state.stats = FakeLLMStats()
+
+    def _ttft(stalled: bool) -> float:
+        return _sample_ttft(config, rng) + (config.stall_ms / 1000 if stalled else 0)
+
+    async def _stream(
+        body: dict[str, Any],
+        tool_call: dict[str, Any] | None,
+        prompt_tokens: int,
+        stalled: bool,
+    ) -> AsyncIterator[str]:
+        stats: FakeLLMStats = app.state.stats
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = body.get("model", "fake-model")
+        interval = 1 / config.tokens_per_second if config.tokens_per_second > 0 else 0
+        abort_at = (
+            rng.randint(1, config.response_tokens)
+            if rng.random() < config.stream_error_rate
+            else None
+        )
+        sent = 0
+        finished = injected = False
+        stats.active_streams += 1
+        try:
+            await asyncio.sleep(_ttft(stalled))
+            yield _chunk(completion_id, model, {"role": "assistant"}, None)
+
+            if tool_call is not None:
+                yield _chunk(
+                    completion_id,
+                    model,
+                    {
+                        "tool_calls": [
+                            {
+                                "index": 0,
+                                "id": tool_call["id"],
+                                "type": "function",
+                                "function": {
+                                    "name": tool_call["name"],
+                                    "arguments": "",
+                                },
+                            }
+                        ]
+                    },
+                    None,
+                )
+                yield _chunk(
+                    completion_id,
+                    model,
+                    {
+                        "tool_calls": [
+                            {
+                                "index": 0,
+                                "function": {"arguments": tool_call["arguments"]},
+                            }
+                        ]
+                    },
+                    None,
+                )
+                sent = 1
+                finish_reason = "tool_calls"
+            else:
+                for i in range(config.response_tokens):
+                    if abort_at is not None and i == abort_at:
+                        stats.errors += 1
+                        injected = True
+                        # 模拟上游在流中途断开
+                        raise ConnectionResetError("injected stream failure")
+                    await asyncio.sleep(interval)
+                    word = _WORDS[i % len(_WORDS)]
+                    yield _chunk(completion_id, model, {"content": f"{word} "}, None)
+                    sent += 1
+                    stats.tokens_sent += 1
+                finish_reason = "stop"
+
+            yield _chunk(completion_id, model, {}, finish_reason)
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": sent,
+                        "total_tokens": prompt_tokens + sent,
+                    },
+                }
+                yield f"data: {json.dumps(usage)}\n\n"
+            yield "data: [DONE]\n\n"
+            finished = True
+            stats.completed += 1
+        finally:
+            stats.active_streams -= 1
+            if not finished and not injected:
+                stats.aborted += 1
+                stats.last_abort_at = time.monotonic()
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats: FakeLLMStats = app.state.stats
+        stats.requests += 1
+        stats.request_log.append({"model": body.get("model"), "at": time.monotonic()})
+
+        stalled = (
+            bool(config.stall_every) and (stats.requests - 1) % config.stall_every == 0
+        )
+        failing = {m.strip() for m in config.fail_models.split(",") if m.strip()}
+
+        if body.get("model") in failing or rng.random() < config.error_rate:
+            stats.errors += 1
+            return JSONResponse(
+                status_code=500,
+                content={
+                    "error": {"message": "injected error", "type": "server_error"}
+                },
+            )
+
+        messages = body.get("messages") or []
+        prompt_tokens = _estimate_prompt_tokens(messages)
+        tools = body.get("tools") or []
+        last_role = messages[-1].get("role") if messages else None
+        tool_call = (
+            _fake_tool_call(tools, rng)
+            if tools and last_role != "tool" and rng.random() < config.tool_call_rate
+            else None
+        )
+
+        if body.get("stream"):
+            return StreamingResponse(
+                _stream(body, tool_call, prompt_tokens, stalled),
+                media_type="text/event-stream",
+            )
+
+        await asyncio.sleep(_ttft(stalled))
+        completion_tokens = 1 if tool_call else config.response_tokens
+        message: dict[str, Any] = {"role": "assistant", "content": None}
+        if tool_call:
+            message["tool_calls"] = [
+                {
+                    "id": tool_call["id"],
+                    "type": "function",
+                    "function": {
+                        "name": tool_call["name"],
+                        "arguments": tool_call["arguments"],
+                    },
+                }
+            ]
+        else:
+            message["content"] = " ".join(
+                _WORDS[i % len(_WORDS)] for i in range(completion_tokens)
+            )
+        stats.completed += 1
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake-model"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": message,
+                    "finish_reason": "tool_calls" if tool_call else "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    @app.get("/v1/models")
+    async def list_models() -> dict[str, Any]:
+        return {"object": "list", "data": [{"id": "fake-model", "object": "model"}]}
+
+    @app.get("/stats")
+    async def read_stats() -> dict[str, Any]:
+        stats = asdict(app.state.stats)
+        stats.pop("request_log")
+        return stats
+
+    return app
+
+
+@dataclass
+class FakeLLMServer:
+    base_url: str
+    app: FastAPI
+
+    @property
+    def stats(self) -> FakeLLMStats:
+        return self.app.state.stats
+
+
+@contextmanager
+def serve_in_thread(
+    config: FakeLLMConfig | None = None, host: str = "127.0.0.1"
+) -> Iterator[FakeLLMServer]:
+    """在后台线程中启动假 LLM 服务（随机端口），供测试通过真实 HTTP 连接访问"""
+    import uvicorn
+
+    app = create_app(config)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind((host, 0))
+    port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+    thread = threading.Thread(
+        target=server.run, kwargs={"sockets": [sock]}, daemon=True
+    )
+    thread.start()
+    try:
+        while not server.started:
+            if not thread.is_alive():
+                raise RuntimeError("Fake LLM server failed to start")
+            time.sleep(0.01)
+        yield FakeLLMServer(base_url=f"http://{host}:{port}/v1", app=app)
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+        sock.close()
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI-compatible fake LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    defaults = FakeLLMConfig()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}",
+            type=int if name == "seed" else type(value),
+            default=value,
+        )
+    args = vars(parser.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+    uvicorn.run(
+        create_app(FakeLLMConfig(**args)), host=host, port=port, log_level="warning"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+用户批量导入命令行工具
+
+    uv run import-users users.csv --batch-size 1000 --upsert
+    gunzip -c users.ndjson.gz | uv run import-users - --format ndjson
+
+输入按流读取，密码在进程池中并行哈希，每批一条多行 INSERT 并提交一次。
+单行错误写入 --errors 文件（NDJSON）或日志，不会中断导入。
+"""
+
+import argparse
+import io
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+
+from app.api.routes.user.bulk import ImportFormat, create_users_bulk, read_user_rows
+from app.core.db import SessionLocal
+from app.core.logger import logger
+from scripts.commands import default_workers
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk import users from CSV or NDJSON")
+    parser.add_argument("input", help="Input file, or - for stdin")
+    parser.add_argument("--format", choices=["ndjson", "csv"])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument(
+        "--upsert",
+        action="store_true",
+        help="Update existing (not deleted) users with the same email",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Hashing processes (default: CPUs)"
+    )
+    parser.add_argument("--errors", type=Path, help="Write per-row errors as NDJSON")
+    args = parser.parse_args()
+
+    fmt: ImportFormat = args.format or (
+        "csv" if args.input.endswith(".csv") else "ndjson"
+    )
+    workers = args.workers or default_workers()
+    if args.input == "-":
+        lines = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    else:
+        lines = open(args.input, encoding="utf-8", newline="")
+
+    started = time.perf_counter()
+    with (
+        lines,
+        ProcessPoolExecutor(max_workers=workers) as executor,
+        SessionLocal() as session,
+    ):
+        result = create_users_bulk(
+            session=session,
+            rows=read_user_rows(lines, fmt),
+            executor=executor,
+            workers=workers,
+            batch_size=args.batch_size,
+            upsert=args.upsert,
+        )
+    elapsed = time.perf_counter() - started
+
+    if args.errors:
+        with args.errors.open("w") as out:
+            for error in result.errors:
+                out.write(json.dumps(asdict(error)) + "\n")
+    else:
+        for error in result.errors:
+            logger.warning(f"row {error.row} ({error.email or '-'}): {error.error}")
+
+    summary = {
+        "written": result.written,
+        "errors": len(result.errors),
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(result.written / elapsed, 1) if elapsed else None,
+        "hash_wait_seconds": round(result.hash_seconds, 2),
+        "write_seconds": round(result.write_seconds, 2),
+        "workers": workers,
+        "batch_size": args.batch_size,
+    }
+    print(json.dumps(summary))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+AG-UI 智能体端点压测脚本
+
+以固定并发对 `/agent` 发起流式请求，统计首 token 延迟（TTFT）、token 间隔、
+事件吞吐与服务进程（含全部 worker 子进程）的内存占用，结果以 JSON 输出，便于与历史结果对比。
+不加载应用配置，只需要目标服务的地址。
+
+配合 `fake-llm` 可完全离线运行：
+    uv run fake-llm --port 9000 &
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1 OPENAI_API_KEY=fake uv run start &
+    uv run load-agent --concurrency 50 --runs 500 --server-pid <pid> --output result.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+logger = logging.getLogger("load-agent")
+
+
+@dataclass
+class RunResult:
+    ok: bool = False
+    error: str | None = None
+    ttft: float | None = None
+    inter_token: list[float] = field(default_factory=list)
+    events: int = 0
+
+
+def _percentiles(values: list[float]) -> dict[str, float | None]:
+    """最近秩（nearest-rank）百分位，单位毫秒"""
+    if not values:
+        return {"p50": None, "p90": None, "p99": None, "max": None}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        index = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+        return round(ordered[index] * 1000, 2)
+
+    return {
+        "p50": rank(50),
+        "p90": rank(90),
+        "p99": rank(99),
+        "max": round(ordered[-1] * 1000, 2),
+    }
+
+
+def _process_tree(pid: int) -> list[int]:
+    """pid 及其全部子孙进程（多 worker 时 uvicorn 主进程 fork 出各 worker）"""
+    children: dict[int, list[int]] = {}
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # comm 可能包含空格与括号，ppid 是最后一个 ")" 之后的第二个字段
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry.name))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def _read_rss_kb(pid: int) -> int | None:
+    """进程树的 VmRSS 之和；pid 不存在时返回 None"""
+    total, found = 0, False
+    for member in _process_tree(pid):
+        try:
+            status = Path(f"/proc/{member}/status").read_text()
+        except OSError:
+            continue
+        for line in status.splitlines():
+            if line.startswith("VmRSS:"):
+                total += int(line.split()[1])
+                found = True
+                break
+    return total if found else None
+
+
+def _run_input(prompt: str) -> dict[str, Any]:
+    return {
+        "threadId": str(uuid.uuid4()),
+        "runId": str(uuid.uuid4()),
+        "messages": [{"id": str(uuid.uuid4()), "role": "user", "content": prompt}],
+        "state": {"proverbs": []},
+        "tools": [],
+        "context": [],
+        "forwardedProps": {},
+    }
+
+
+async def _run_once(
+    client: httpx.AsyncClient, url: str, prompt: str, headers: dict[str, str]
+) -> RunResult:
+    result = RunResult()
+    start = time.perf_counter()
+    last_token: float | None = None
+    try:
+        async with client.stream(
+            "POST", url, json=_run_input(prompt), headers=headers
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                result.error = f"HTTP {response.status_code}"
+                return result
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[5:])
+                result.events += 1
+                match event.get("type"):
+                    case "TEXT_MESSAGE_CONTENT":
+                        now = time.perf_counter()
+                        if last_token is None:
+                            result.ttft = now - start
+                        else:
+                            result.inter_token.append(now - last_token)
+                        last_token = now
+                    case "RUN_ERROR":
+                        result.error = event.get("message") or "RUN_ERROR"
+                    case "RUN_FINISHED":
+                        result.ok = result.error is None
+    except (httpx.HTTPError, json.JSONDecodeError) as exc:
+        result.error = f"{type(exc).__name__}: {exc}"
+    return result
+
+
+async def _sample_rss(pid: int, peak: list[int], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        rss = _read_rss_kb(pid)
+        if rss is not None and rss > peak[0]:
+            peak[0] = rss
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.1)
+        except TimeoutError:
+            pass
+
+
+async def run_load(
+    *,
+    url: str,
+    concurrency: int,
+    runs: int,
+    prompt: str,
+    token: str | None = None,
+    server_pid: int | None = None,
+    timeout: float = 120.0,
+) -> dict[str, Any]:
+    """以 `concurrency` 个并发流执行共 `runs` 次运行，返回汇总结果"""
+
+    headers = {"Accept": "text/event-stream"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(runs):
+        queue.put_nowait(i)
+    results: list[RunResult] = []
+
+    baseline_rss = _read_rss_kb(server_pid) if server_pid else None
+    peak_rss = [baseline_rss or 0]
+    stop = asyncio.Event()
+    sampler = (
+        asyncio.create_task(_sample_rss(server_pid, peak_rss, stop))
+        if server_pid and baseline_rss is not None
+        else None
+    )
+
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+
+        async def worker() -> None:
+            while True:
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                results.append(await _run_once(client, url, prompt, headers))
+                if len(results) % max(1, runs // 10) == 0:
+                    logger.info("load-agent: %d/%d runs finished", len(results), runs)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        duration = time.perf_counter() - started
+
+    stop.set()
+    if sampler is not None:
+        await sampler
+
+    errors: dict[str, int] = {}
+    for r in results:
+        if not r.ok:
+            reason = r.error or "stream ended without RUN_FINISHED"
+            errors[reason] = errors.get(reason, 0) + 1
+
+    total_events = sum(r.events for r in results)
+    memory: dict[str, Any] | None = None
+    if baseline_rss is not None:
+        memory = {
+            "baseline_rss_kb": baseline_rss,
+            "peak_rss_kb": peak_rss[0],
+            "rss_per_stream_kb": round((peak_rss[0] - baseline_rss) / concurrency, 1),
+        }
+
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "runs": runs,
+        "succeeded": sum(r.ok for r in results),
+        "failed": sum(not r.ok for r in results),
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "runs_per_second": round(len(results) / duration, 2) if duration else None,
+        "events_per_second": round(total_events / duration, 2) if duration else None,
+        "ttft_ms": _percentiles([r.ttft for r in results if r.ttft is not None]),
+        "inter_token_ms": _percentiles([g for r in results for g in r.inter_token]),
+        "memory": memory,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the AG-UI agent endpoint")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/api/v1/agent")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--prompt", default="Tell me a proverb about patience.")
+    parser.add_argument("--token", help="Bearer token sent with every request")
+    parser.add_argument(
+        "--server-pid",
+        type=int,
+        help="Sample the summed VmRSS of this process and its children",
+    )
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", type=Path, help="Write JSON results to this file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    result = asyncio.run(
+        run_load(
+            url=args.url,
+            concurrency=args.concurrency,
+            runs=args.runs,
+            prompt=args.prompt,
+            token=args.token,
+            server_pid=args.server_pid,
+            timeout=args.timeout,
+        )
+    )
+    text = json.dumps(result, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+        logger.info("load-agent: results written to %s", args.output)
+    else:
+        print(text)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
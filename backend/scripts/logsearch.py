@@ -0,0 +1,116 @@
+"""
+日志检索命令行工具
+
+查询前先增量更新索引（活动文件只解析新增的行，归档只在第一次出现时索引）。
+
+    uv run logsearch req 3f0c9a7e-...                          # 某个请求的所有日志行
+    uv run logsearch requests --path /auth --min-ms 500 --since 1h
+    uv run logsearch requests --status 5xx --since 2026-10-19T08:00
+    uv run logsearch index                                     # 只更新索引
+
+默认输出 loguru 格式化后的文本，`--json` 输出原始 JSON 行。
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.log_index import LogIndex
+
+_RELATIVE = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_time(value: str) -> int:
+    """`90s` / `15m` / `1h` / `2d`（距现在）或 ISO 8601 时间，返回 Unix 时间戳"""
+    if match := _RELATIVE.match(value):
+        return int(time.time() - float(match.group(1)) * _UNITS[match.group(2)])
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time: {value!r}") from None
+
+
+def parse_status(value: str) -> tuple[int, int]:
+    """`500` 或 `5xx`"""
+    if re.fullmatch(r"[1-5]xx", value):
+        low = int(value[0]) * 100
+        return low, low + 99
+    if value.isdigit():
+        return int(value), int(value)
+    raise argparse.ArgumentTypeError(f"invalid status: {value!r}")
+
+
+def _print(lines: list[bytes], raw: bool) -> None:
+    out = sys.stdout
+    for line in lines:
+        if raw:
+            out.write(line.decode("utf-8", errors="replace") + "\n")
+        else:
+            out.write(json.loads(line).get("text", "").rstrip("\n") + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Search the serialized log files")
+    parser.add_argument("--log-dir", type=Path, default=Path("logs"))
+    parser.add_argument("--env", default=settings.ENV)
+    parser.add_argument("--json", action="store_true", help="Print raw JSON lines")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("index", help="Update the index only")
+
+    by_request = commands.add_parser("req", help="All lines logged for a request id")
+    by_request.add_argument("req_id")
+
+    requests = commands.add_parser(
+        "requests", help="Request log lines matching filters"
+    )
+    requests.add_argument("--path", help="Path prefix, with or without the API prefix")
+    requests.add_argument("--status", type=parse_status, help="e.g. 500 or 5xx")
+    requests.add_argument(
+        "--min-ms", type=float, help="Minimum duration in milliseconds"
+    )
+    requests.add_argument("--limit", type=int, default=100)
+
+    for command in (by_request, requests):
+        command.add_argument(
+            "--since", type=parse_time, help="e.g. 1h or 2026-10-19T08:00"
+        )
+        command.add_argument("--until", type=parse_time)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with LogIndex(args.log_dir, args.env) as index:
+        added = index.update()
+        indexed = time.perf_counter()
+        if args.command == "req":
+            lines = index.by_request(args.req_id, since=args.since, until=args.until)
+        elif args.command == "requests":
+            lines = index.requests(
+                path=args.path,
+                api_prefix=settings.API_V1_STR,
+                status=args.status,
+                min_ms=args.min_ms,
+                since=args.since,
+                until=args.until,
+                limit=args.limit,
+            )
+        else:
+            lines = []
+    finished = time.perf_counter()
+
+    _print(lines, args.json)
+    print(  # noqa: T201
+        f"{len(lines)} lines; indexed {added} new lines in "
+        f"{(indexed - started) * 1000:.1f}ms, query {(finished - indexed) * 1000:.1f}ms",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
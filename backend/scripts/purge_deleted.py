@@ -0,0 +1,82 @@
+"""
+软删除数据清理命令行工具
+
+    uv run purge-deleted --retention-days 30
+    uv run purge-deleted --archive-dir archive/ --table user
+
+进度写入检查点文件，中断（Ctrl+C）后再次执行会从断点继续。
+"""
+
+import argparse
+from datetime import timedelta
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.purge import Checkpoint, TableProgress, purge_soft_deleted
+
+
+def _report(table: str, progress: TableProgress) -> None:
+    logger.info(
+        f"purge-deleted: {table} scanned={progress.scanned} purged={progress.purged} "
+        f"skipped_chunks={progress.skipped_chunks}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Physically remove soft-deleted rows older than the retention period"
+    )
+    parser.add_argument(
+        "--retention-days", type=float, default=settings.PURGE_RETENTION_DAYS
+    )
+    parser.add_argument("--batch-size", type=int, default=settings.PURGE_BATCH_SIZE)
+    parser.add_argument(
+        "--throttle",
+        type=float,
+        default=settings.PURGE_THROTTLE,
+        help="Seconds to sleep between chunks",
+    )
+    parser.add_argument(
+        "--archive-dir",
+        type=Path,
+        help="Append purged rows to <table>.ndjson here first",
+    )
+    parser.add_argument(
+        "--table",
+        action="append",
+        dest="tables",
+        help="Only purge this table (repeatable)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        default=Path(".purge-checkpoint.json"),
+        help="Progress file used to resume an interrupted run",
+    )
+    args = parser.parse_args()
+
+    try:
+        stats = purge_soft_deleted(
+            retention=timedelta(days=args.retention_days),
+            batch_size=args.batch_size,
+            throttle=args.throttle,
+            checkpoint=Checkpoint(args.checkpoint),
+            archive_dir=args.archive_dir,
+            tables=args.tables,
+            on_progress=_report,
+        )
+    except KeyboardInterrupt:
+        logger.warning(
+            f"purge-deleted: interrupted, progress saved to {args.checkpoint}"
+        )
+        raise SystemExit(130) from None
+    if stats is None:
+        raise SystemExit("purge-deleted: another purge is running")
+    logger.info(
+        f"purge-deleted: removed {stats.purged} rows deleted before {stats.cutoff:%Y-%m-%d %H:%M}"
+    )
+
+
+if __name__ == "__main__":
+    main()
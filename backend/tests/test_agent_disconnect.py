@@ -0,0 +1,71 @@
+import asyncio
+import time
+from typing import Any
+
+from ag_ui.encoder import EventEncoder
+
+from app.llm.agent import create_agent
+from app.llm.endpoint import stream_until_disconnect
+from app.llm.resilience import ResiliencePolicy, ResilientChatClient
+from scripts.fake_llm_server import FakeLLMConfig, serve_in_thread
+
+
+def _run_input() -> dict[str, Any]:
+    return {
+        "threadId": "t-disconnect",
+        "runId": "r-1",
+        "messages": [{"id": "m-1", "role": "user", "content": "Tell me a story"}],
+        "state": {"proverbs": []},
+        "tools": [],
+        "context": [],
+        "forwardedProps": {},
+    }
+
+
+async def test_disconnect_aborts_agent_run_and_upstream_stream():
+    # 400 个 token、每秒 20 个：不取消的话上游要跑 20 秒
+    config = FakeLLMConfig(ttft_ms=0, tokens_per_second=20, response_tokens=400)
+    with serve_in_thread(config) as server:
+        client = ResilientChatClient(
+            model_id="fake-flash",
+            api_key="fake",
+            base_url=server.base_url,
+            policy=ResiliencePolicy(hedge_enabled=False),
+        )
+        agent = create_agent(client)
+        encoder = EventEncoder()
+
+        async def events():
+            async for event in agent.run_agent(_run_input()):
+                yield encoder.encode(event)
+
+        disconnected = asyncio.Event()
+
+        async def is_disconnected() -> bool:
+            return disconnected.is_set()
+
+        interrupted: list[bool] = []
+        content_chunks = 0
+        disconnected_at = 0.0
+        async for chunk in stream_until_disconnect(
+            events(),
+            is_disconnected,
+            poll_interval=0.05,
+            on_disconnect=lambda: interrupted.append(True),
+        ):
+            if "TEXT_MESSAGE_CONTENT" in chunk:
+                content_chunks += 1
+                if content_chunks == 3:
+                    disconnected.set()
+                    disconnected_at = time.perf_counter()
+
+        assert interrupted == [True]
+        assert time.perf_counter() - disconnected_at < 0.5
+
+        # 上游连接被主动关闭，而不是把剩余 token 生成完
+        deadline = time.monotonic() + 1.0
+        while server.stats.aborted == 0 and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+        assert server.stats.aborted == 1
+        assert server.stats.completed == 0
+        assert server.stats.tokens_sent < 40
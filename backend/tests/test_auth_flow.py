@@ -67,3 +67,33 @@ async def test_me_without_token_returns_standard_error(client):  # noqa: ANN001
     assert payload["data"] is None
     assert payload["error"] == "HTTP_STATUS_ERROR"
     assert isinstance(payload["message"], str)
+
+
+async def test_read_me_supports_conditional_get(client, db_session):  # noqa: ANN001
+    password = "test-password-123"
+    email = _create_test_user(session=db_session, password=password)
+    token = (
+        await client.post(
+            "/api/v1/auth/access-token",
+            data={"username": email, "password": password},
+        )
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    first = await client.get("/api/v1/user/me", headers=headers)
+    assert first.status_code == HTTPStatus.OK
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    cached = await client.get(
+        "/api/v1/user/me", headers={**headers, "If-None-Match": etag}
+    )
+    assert cached.status_code == HTTPStatus.NOT_MODIFIED
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+
+    stale = await client.get(
+        "/api/v1/user/me", headers={**headers, "If-None-Match": 'W/"other"'}
+    )
+    assert stale.status_code == HTTPStatus.OK
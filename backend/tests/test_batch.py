@@ -0,0 +1,59 @@
+from http import HTTPStatus
+from uuid import uuid4
+
+from sqlmodel import Session
+
+from app.api.routes.user.schemas import UserCreate
+from app.api.routes.user.service import create_user
+
+
+async def _login(client, session: Session) -> tuple[str, str]:  # noqa: ANN001
+    email = f"it-{uuid4().hex}@example.com"
+    password = "test-password-123"
+    create_user(session=session, user_create=UserCreate(email=email, password=password))
+    resp = await client.post(
+        "/api/v1/auth/access-token", data={"username": email, "password": password}
+    )
+    return email, resp.json()["access_token"]
+
+
+async def test_batch_dispatches_sub_requests_with_shared_auth(client, db_session):  # noqa: ANN001
+    email, token = await _login(client, db_session)
+
+    resp = await client.post(
+        "/api/v1/batch",
+        headers={"Authorization": f"Bearer {token}"},
+        json={
+            "requests": [
+                {"id": "me", "path": "/user/me"},
+                {"path": "/user/me"},
+                {"id": "missing", "path": "/does-not-exist"},
+                {"id": "after", "path": "/user/me", "depends_on": ["missing"]},
+            ]
+        },
+    )
+    assert resp.status_code == HTTPStatus.OK
+    batch_request_id = resp.headers["X-Request-ID"]
+    items = {item["id"]: item for item in resp.json()["responses"]}
+
+    assert items["me"]["status"] == HTTPStatus.OK
+    assert items["me"]["body"]["data"]["email"] == email
+    assert items["me"]["request_id"] == f"{batch_request_id}-me"
+    assert items["1"]["body"]["data"]["email"] == email
+    assert items["missing"]["status"] == HTTPStatus.NOT_FOUND
+    assert items["missing"]["body"]["error"] == "HTTP_STATUS_ERROR"
+    assert items["after"]["status"] == HTTPStatus.FAILED_DEPENDENCY
+
+
+async def test_batch_rejects_forward_dependencies(client):  # noqa: ANN001
+    resp = await client.post(
+        "/api/v1/batch",
+        json={
+            "requests": [
+                {"path": "/user/me", "depends_on": ["later"]},
+                {"id": "later", "path": "/user/me"},
+            ]
+        },
+    )
+    assert resp.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert resp.json()["error"] == "VALIDATION_ERROR"
@@ -0,0 +1,24 @@
+from uuid import uuid7  # type: ignore[attr-defined]
+
+from sqlalchemy.dialects import mysql
+
+from app.api.routes.user.models import User
+from app.core.types import BinaryUUID
+
+
+def test_binary_uuid_round_trip_preserves_uuid7_order():
+    column_type = BinaryUUID()
+    dialect = mysql.dialect()
+    ids = [uuid7() for _ in range(100)]
+
+    stored = [column_type.process_bind_param(value, dialect) for value in ids]
+    assert all(isinstance(raw, bytes) and len(raw) == 16 for raw in stored)
+    # 字节序与生成顺序一致，写入始终追加在聚簇索引末尾
+    assert stored == sorted(stored)
+    assert [column_type.process_result_value(raw, dialect) for raw in stored] == ids
+    assert column_type.process_bind_param(str(ids[0]), dialect) == ids[0].bytes
+
+
+def test_user_primary_key_is_binary16():
+    compiled = User.__table__.c.id.type.compile(dialect=mysql.dialect())
+    assert compiled == "BINARY(16)"
@@ -0,0 +1,92 @@
+import threading
+import time
+from uuid import uuid4
+
+from sqlalchemy import event
+
+from app.api.routes.user.cache import CurrentUserCache, current_user_cache
+from app.api.routes.user.schemas import UserCreate, UserUpdate
+from app.api.routes.user.service import create_user, update_user
+from app.core.db import SessionLocal, engine
+
+
+def _new_user():  # noqa: ANN202
+    with SessionLocal() as session:
+        return create_user(
+            session=session,
+            user_create=UserCreate(
+                email=f"cache-{uuid4().hex}@example.com", password="test-password-123"
+            ),
+        )
+
+
+def test_hit_needs_no_query_and_updates_invalidate():
+    user = _new_user()
+    with SessionLocal() as session:
+        assert current_user_cache.get(session, user.id) is not None
+
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, *args):  # noqa: ANN001, ARG001
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with SessionLocal() as session:
+            cached = current_user_cache.get(session, user.id)
+            assert cached is not None
+            assert cached.email == user.email
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert statements == []
+
+    # 本 worker 提交后立即失效；其他 worker 在轮询后失效
+    other_worker = CurrentUserCache(maxsize=10, ttl=60)
+    with SessionLocal() as session:
+        other_worker.get(session, user.id)
+    with SessionLocal() as session:
+        db_user = current_user_cache.get(session, user.id)
+        update_user(
+            session=session, db_user=db_user, user_in=UserUpdate(full_name="New")
+        )
+    with SessionLocal() as session:
+        assert current_user_cache.get(session, user.id).full_name == "New"
+        assert other_worker.get(session, user.id).full_name is None
+    assert other_worker.poll() >= 1
+    with SessionLocal() as session:
+        assert other_worker.get(session, user.id).full_name == "New"
+
+
+def test_concurrent_misses_load_once():
+    user = _new_user()
+    cache = CurrentUserCache(maxsize=10, ttl=60)
+    loads: list[str] = []
+
+    def slow_user_select(conn, cursor, statement, *args):  # noqa: ANN001, ARG001
+        if (
+            statement.lstrip().upper().startswith("SELECT")
+            and "FROM `user`" in statement
+        ):
+            loads.append(statement)
+            time.sleep(0.2)
+
+    results: list[str] = []
+    barrier = threading.Barrier(5)
+
+    def lookup() -> None:
+        barrier.wait()
+        with SessionLocal() as session:
+            results.append(cache.get(session, user.id).email)
+
+    event.listen(engine, "before_cursor_execute", slow_user_select)
+    try:
+        threads = [threading.Thread(target=lookup) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        event.remove(engine, "before_cursor_execute", slow_user_select)
+
+    assert results == [user.email] * 5
+    assert len(loads) == 1
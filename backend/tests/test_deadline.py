@@ -0,0 +1,53 @@
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from app.api.routes.user.models import User
+from app.api.routes.user.service import get_password_hash
+from app.api.schemas.error import APIErrorType, DeadlineExceededError
+from app.core.db import engine
+from app.core.deadline import RequestDeadline, bind_deadline, reset_deadline
+
+
+async def test_expired_request_fails_fast(client):  # noqa: ANN001
+    resp = await client.post(
+        "/api/v1/auth/access-token",
+        data={"username": "nobody@example.com", "password": "x"},
+        headers={"X-Request-Timeout": "0"},
+    )
+    assert resp.status_code == HTTPStatus.GATEWAY_TIMEOUT
+    assert resp.json()["error"] == APIErrorType.DEADLINE_EXCEEDED
+    assert resp.headers.get("X-Request-ID")
+
+
+def test_select_carries_remaining_budget_as_hint(db_session: Session):
+    statements: list[str] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):  # noqa: ANN001, ARG001
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    token = bind_deadline(RequestDeadline(5))
+    try:
+        db_session.exec(select(User).limit(1)).all()
+    finally:
+        reset_deadline(token)
+        event.remove(engine, "before_cursor_execute", capture)
+
+    hinted = [s for s in statements if "MAX_EXECUTION_TIME(" in s]
+    assert hinted
+    assert hinted[-1].lstrip().startswith("SELECT /*+ MAX_EXECUTION_TIME(")
+
+
+def test_expired_deadline_skips_db_and_argon2_work(db_session: Session):
+    token = bind_deadline(RequestDeadline(0))
+    try:
+        with pytest.raises(DeadlineExceededError):
+            get_password_hash("secret")
+        with pytest.raises(DeadlineExceededError):
+            db_session.exec(select(User).limit(1)).all()
+    finally:
+        reset_deadline(token)
+    db_session.rollback()
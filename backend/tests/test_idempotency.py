@@ -0,0 +1,129 @@
+import asyncio
+import json
+from http import HTTPStatus
+
+import httpx
+from fastapi import FastAPI, Request
+
+from app.api.middlewares.idempotency import (
+    REPLAYED_HEADER,
+    IdempotencyMiddleware,
+    InMemoryIdempotencyStore,
+    StoredResponse,
+)
+
+
+def _make_app(revoked: set[str] | None = None) -> tuple[FastAPI, list[bytes]]:
+    calls: list[bytes] = []
+    revoked = revoked if revoked is not None else set()
+
+    async def token_replayable(stored: StoredResponse) -> bool:
+        return json.loads(stored.body)["token"] not in revoked
+
+    app = FastAPI()
+    app.add_middleware(
+        IdempotencyMiddleware,
+        store=InMemoryIdempotencyStore(maxsize=16, ttl=60),
+        replay_checks={"/auth/access-token": token_replayable},
+    )
+
+    @app.post("/orders")
+    async def create_order(request: Request) -> dict[str, int]:
+        calls.append(await request.body())
+        await asyncio.sleep(0.1)
+        return {"order": len(calls)}
+
+    @app.post("/auth/access-token")
+    async def issue_token() -> dict[str, str]:
+        # 代替 argon2 校验密码
+        calls.append(b"hash")
+        return {"token": f"t-{len(calls)}"}
+
+    @app.post("/flaky")
+    async def flaky() -> None:
+        calls.append(b"flaky")
+        raise RuntimeError("boom")
+
+    return app, calls
+
+
+def _client(app: FastAPI) -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+async def test_concurrent_duplicates_execute_once_and_replay():
+    app, calls = _make_app()
+    headers = {"Idempotency-Key": "k-1"}
+    async with _client(app) as client:
+        responses = await asyncio.gather(
+            *(client.post("/orders", json={"n": 1}, headers=headers) for _ in range(5))
+        )
+        retry = await client.post("/orders", json={"n": 1}, headers=headers)
+        other_key = await client.post(
+            "/orders", json={"n": 1}, headers={"Idempotency-Key": "k-2"}
+        )
+
+    assert len(calls) == 2
+    assert all(r.status_code == HTTPStatus.OK for r in responses)
+    assert {r.json()["order"] for r in responses} == {1}
+    assert sum(r.headers.get(REPLAYED_HEADER) == "true" for r in responses) == 4
+    assert retry.json() == {"order": 1}
+    assert retry.headers[REPLAYED_HEADER] == "true"
+    assert other_key.json() == {"order": 2}
+
+
+async def test_key_reuse_with_different_body_is_rejected():
+    app, calls = _make_app()
+    headers = {"Idempotency-Key": "k-1"}
+    async with _client(app) as client:
+        first = await client.post("/orders", json={"n": 1}, headers=headers)
+        reused = await client.post("/orders", json={"n": 2}, headers=headers)
+
+    assert first.status_code == HTTPStatus.OK
+    assert reused.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert reused.json()["error"] == "IDEMPOTENCY_KEY_REUSED"
+    assert len(calls) == 1
+
+
+async def test_failed_request_is_not_stored():
+    app, calls = _make_app()
+    headers = {"Idempotency-Key": "k-1"}
+    async with _client(app) as client:
+        first = await client.post("/flaky", headers=headers)
+        retry = await client.post("/flaky", headers=headers)
+
+    assert first.status_code == HTTPStatus.INTERNAL_SERVER_ERROR
+    assert retry.status_code == HTTPStatus.INTERNAL_SERVER_ERROR
+    assert len(calls) == 2
+
+
+async def test_retried_login_is_replayed_without_hashing_again():
+    app, calls = _make_app()
+    headers = {"Idempotency-Key": "k-1"}
+    async with _client(app) as client:
+        first = await client.post("/auth/access-token", headers=headers)
+        retry = await client.post("/auth/access-token", headers=headers)
+
+    assert first.json() == {"token": "t-1"}
+    assert retry.json() == {"token": "t-1"}
+    assert retry.headers[REPLAYED_HEADER] == "true"
+    assert calls == [b"hash"]
+
+
+async def test_revoked_token_is_not_replayed():
+    revoked: set[str] = set()
+    app, calls = _make_app(revoked)
+    headers = {"Idempotency-Key": "k-1"}
+    async with _client(app) as client:
+        first = await client.post("/auth/access-token", headers=headers)
+        revoked.add(first.json()["token"])
+        retry = await client.post("/auth/access-token", headers=headers)
+        again = await client.post("/auth/access-token", headers=headers)
+
+    # 保存的令牌已吊销：重新执行并保存新的响应
+    assert retry.json() == {"token": "t-2"}
+    assert REPLAYED_HEADER not in retry.headers
+    assert again.json() == {"token": "t-2"}
+    assert again.headers[REPLAYED_HEADER] == "true"
+    assert len(calls) == 2
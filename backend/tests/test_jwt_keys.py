@@ -0,0 +1,106 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from http import HTTPStatus
+from pathlib import Path
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from jwt.exceptions import InvalidTokenError
+
+from app.api.routes.auth.keys import Keyring
+
+
+def _write_key(
+    directory: Path, kid: str, private_key, *, public_only: bool = False
+) -> None:  # noqa: ANN001
+    if public_only:
+        pem = private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+    else:
+        pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    (directory / f"{kid}.pem").write_bytes(pem)
+
+
+def _claims() -> dict:
+    return {"sub": "user", "exp": int(time.time()) + 60}
+
+
+def test_rotation_keeps_tokens_from_retiring_key_valid(tmp_path):
+    _write_key(tmp_path, "old", ed25519.Ed25519PrivateKey.generate())
+    _write_key(tmp_path, "new", rsa.generate_private_key(65537, 2048))
+
+    old_token = Keyring(secret="s", keys_dir=tmp_path, active_kid="old").sign(_claims())
+    rotated = Keyring(secret="s", keys_dir=tmp_path, active_kid="new")
+    new_token = rotated.sign(_claims())
+
+    assert jwt.get_unverified_header(new_token) == {
+        "alg": "RS256",
+        "kid": "new",
+        "typ": "JWT",
+    }
+    assert rotated.verify(old_token)["sub"] == "user"
+    assert rotated.verify(new_token)["sub"] == "user"
+    jwks = jwt.PyJWKSet.from_json(rotated.jwks.decode())
+    assert {key.key_id for key in jwks.keys} == {"new", "old"}
+
+    # 退役密钥的文件删除后，它签发的令牌不再有效
+    (tmp_path / "old.pem").unlink()
+    with pytest.raises(InvalidTokenError):
+        Keyring(secret="s", keys_dir=tmp_path, active_kid="new").verify(old_token)
+
+
+def test_legacy_hs256_and_algorithm_confusion(tmp_path):
+    private_key = ed25519.Ed25519PrivateKey.generate()
+    _write_key(tmp_path, "ed", private_key)
+    legacy = Keyring(secret="secret").sign(_claims())
+
+    assert Keyring(secret="secret", keys_dir=tmp_path, active_kid="ed").verify(legacy)
+    with pytest.raises(InvalidTokenError):
+        Keyring(
+            secret="secret", keys_dir=tmp_path, active_kid="ed", accept_hs256=False
+        ).verify(legacy)
+
+    # 用公开的公钥作为 HMAC 密钥伪造的令牌不被接受
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    signing_input = b".".join(
+        base64.urlsafe_b64encode(json.dumps(part).encode()).rstrip(b"=")
+        for part in ({"alg": "HS256", "kid": "ed"}, _claims())
+    )
+    signature = hmac.new(public_pem, signing_input, hashlib.sha256).digest()
+    forged = (
+        signing_input + b"." + base64.urlsafe_b64encode(signature).rstrip(b"=")
+    ).decode()
+    with pytest.raises(InvalidTokenError):
+        Keyring(secret="secret", keys_dir=tmp_path, active_kid="ed").verify(forged)
+
+
+def test_active_kid_requires_private_key(tmp_path):
+    _write_key(tmp_path, "pub", ed25519.Ed25519PrivateKey.generate(), public_only=True)
+
+    with pytest.raises(ValueError):
+        Keyring(secret="s", keys_dir=tmp_path, active_kid="pub")
+    assert Keyring(secret="s", keys_dir=tmp_path).keys["pub"].private_key is None
+
+
+async def test_jwks_endpoint_is_cacheable(client):  # noqa: ANN001
+    resp = await client.get("/api/v1/auth/jwks.json")
+    assert resp.status_code == HTTPStatus.OK
+    assert resp.headers["cache-control"].startswith("public, max-age=")
+    assert all("d" not in key and "k" not in key for key in resp.json()["keys"])
+
+    revalidated = await client.get(
+        "/api/v1/auth/jwks.json", headers={"If-None-Match": resp.headers["etag"]}
+    )
+    assert revalidated.status_code == HTTPStatus.NOT_MODIFIED
@@ -0,0 +1,25 @@
+from pathlib import Path
+
+from scripts.commands import available_cpus, default_workers
+
+
+def test_workers_follow_cgroup_cpu_quota(tmp_path: Path):
+    (tmp_path / "cpu.max").write_text("250000 100000\n")
+    assert available_cpus(tmp_path) <= 2.5
+    assert default_workers(tmp_path) <= 2
+
+    (tmp_path / "cpu.max").write_text("50000 100000\n")
+    assert default_workers(tmp_path) == 1
+
+
+def test_workers_without_cgroup_limit_use_cpu_affinity(tmp_path: Path):
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    unlimited = available_cpus(tmp_path)
+    assert unlimited == available_cpus(tmp_path / "missing")
+    assert default_workers(tmp_path) == max(1, int(unlimited))
+
+    v1 = tmp_path / "v1" / "cpu"
+    v1.mkdir(parents=True)
+    (v1 / "cpu.cfs_quota_us").write_text("100000\n")
+    (v1 / "cpu.cfs_period_us").write_text("100000\n")
+    assert default_workers(tmp_path / "v1") == 1
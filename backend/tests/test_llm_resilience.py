@@ -0,0 +1,135 @@
+import asyncio
+import time
+from collections.abc import Iterator
+
+import pytest
+from agent_framework.exceptions import ServiceResponseException
+
+from app.core.deadline import RequestDeadline, bind_deadline, reset_deadline
+from app.llm import resilience
+from app.llm.resilience import (
+    CircuitBreaker,
+    CircuitState,
+    ResiliencePolicy,
+    ResilientChatClient,
+)
+from scripts.fake_llm_server import FakeLLMConfig, serve_in_thread
+
+
+@pytest.fixture(autouse=True)
+def _reset_resilience_state() -> Iterator[None]:
+    resilience.reset_state()
+    yield
+    resilience.reset_state()
+
+
+async def _wait_for(predicate, timeout: float = 2.0) -> bool:  # noqa: ANN001
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(0.02)
+    return predicate()
+
+
+async def test_hedged_request_beats_stalled_primary_and_cancels_it():
+    # 第 1 个请求卡顿 3 秒，第 2 个（对冲请求）立即返回
+    config = FakeLLMConfig(
+        ttft_ms=0, tokens_per_second=0, response_tokens=5, stall_every=2, stall_ms=3000
+    )
+    with serve_in_thread(config) as server:
+        client = ResilientChatClient(
+            model_id="fake-flash",
+            api_key="fake",
+            base_url=server.base_url,
+            policy=ResiliencePolicy(hedge_default_delay=0.2),
+        )
+        wins_before = resilience._llm_hedge_wins.value(model="fake-flash")
+
+        start = time.perf_counter()
+        text = "".join([u.text async for u in client.get_streaming_response("hi")])
+        elapsed = time.perf_counter() - start
+
+        assert text.split() == ["the", "quick", "brown", "fox", "jumps"]
+        assert elapsed < 1.5
+        assert server.stats.requests == 2
+        assert resilience._llm_hedge_wins.value(model="fake-flash") == wins_before + 1
+        # 落败的请求被主动断开，而不是等它跑完
+        assert await _wait_for(lambda: server.stats.aborted == 1)
+
+
+async def test_failing_tier_falls_back_and_breaker_skips_it():
+    config = FakeLLMConfig(ttft_ms=0, response_tokens=3, fail_models="tier-a")
+    with serve_in_thread(config) as server:
+        client = ResilientChatClient(
+            model_id="tier-a",
+            fallback_model_ids=["tier-b"],
+            api_key="fake",
+            base_url=server.base_url,
+            policy=ResiliencePolicy(
+                hedge_enabled=False, breaker_min_calls=2, open_seconds=60
+            ),
+        )
+
+        for _ in range(3):
+            response = await client.get_response("hi")
+            assert response.text
+
+        models = [entry["model"] for entry in server.stats.request_log]
+        assert models == ["tier-a", "tier-b", "tier-a", "tier-b", "tier-b"]
+        assert resilience._breakers["tier-a"].state is CircuitState.OPEN
+
+
+async def test_deadline_expiry_does_not_count_against_breaker():
+    config = FakeLLMConfig(ttft_ms=2000, response_tokens=3)
+    with serve_in_thread(config) as server:
+        client = ResilientChatClient(
+            model_id="fake-slow",
+            fallback_model_ids=["fake-other"],
+            api_key="fake",
+            base_url=server.base_url,
+            policy=ResiliencePolicy(hedge_enabled=False, breaker_min_calls=1),
+        )
+        token = bind_deadline(RequestDeadline(0.2))
+        try:
+            with pytest.raises(ServiceResponseException):
+                [u async for u in client.get_streaming_response("hi")]
+        finally:
+            reset_deadline(token)
+
+        # 超时是请求预算用完，不是模型故障：不计入熔断，也不回退到下一档
+        assert resilience._breakers["fake-slow"].state is CircuitState.CLOSED
+        assert [e["model"] for e in server.stats.request_log] == ["fake-slow"]
+
+
+def test_breaker_half_open_probe_closes_or_reopens():
+    now = [0.0]
+    breaker = CircuitBreaker(
+        "m",
+        window=4,
+        min_calls=2,
+        failure_rate=0.5,
+        slow_call_seconds=1.0,
+        open_seconds=10.0,
+        clock=lambda: now[0],
+    )
+    breaker.record(ok=True, duration=5.0)  # 慢调用也算失败
+    breaker.record(ok=False)
+    assert breaker.state is CircuitState.OPEN
+    assert not breaker.allow()
+
+    now[0] = 11.0
+    assert breaker.allow()
+    assert breaker.state is CircuitState.HALF_OPEN
+    assert not breaker.allow()  # 只放行一个探测请求
+    breaker.record(ok=False, probe=True)
+    assert breaker.state is CircuitState.OPEN
+
+    now[0] = 22.0
+    assert breaker.allow()
+    # 熔断之前发出、此时才结束的调用不能代替探测请求的结果
+    breaker.record(ok=True, duration=0.1)
+    assert breaker.state is CircuitState.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record(ok=True, duration=0.1, probe=True)
+    assert breaker.state is CircuitState.CLOSED
@@ -0,0 +1,130 @@
+from contextvars import copy_context
+from uuid import uuid4
+
+import pytest
+
+from app.api.schemas.error import APIErrorType, APIException
+from app.core import db
+from app.llm import resilience
+from app.llm.resilience import ResiliencePolicy, ResilientChatClient
+from app.llm.usage import (
+    ANONYMOUS_USER_ID,
+    RunUsage,
+    UsageTracker,
+    bind_run_usage,
+    usage_tracker,
+)
+from scripts.fake_llm_server import FakeLLMConfig, serve_in_thread
+
+
+def test_usage_is_aggregated_per_user_and_model_and_enforces_quota():
+    copy_context().run(_aggregate_and_check_quota)
+
+
+def _aggregate_and_check_quota() -> None:
+    tracker = UsageTracker(daily_quota=100)
+    user_id = uuid4()
+    run = RunUsage(user_id)
+    bind_run_usage(run)
+
+    tracker.record("fake-flash", 30, 10)
+    tracker.record("fake-flash", 20, 5)
+    tracker.record("fake-plus", 10, 10)
+
+    assert run.totals.requests == 3
+    assert run.totals.total_tokens == 85
+    assert tracker.used_today(user_id) == 85
+    pending = {key[:2]: value for key, value in tracker._pending.items()}
+    assert pending[(user_id, "fake-flash")].prompt_tokens == 50
+    assert pending[(user_id, "fake-flash")].requests == 2
+    tracker.check_quota(user_id)
+
+    tracker.record("fake-flash", 10, 5)
+    with pytest.raises(APIException) as exc_info:
+        tracker.check_quota(user_id)
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.error_type == APIErrorType.QUOTA_EXCEEDED
+    # 匿名请求与其他用户不受影响
+    tracker.check_quota(None)
+    tracker.check_quota(uuid4())
+
+
+def test_usage_being_flushed_still_counts_against_quota(monkeypatch):
+    tracker = UsageTracker(daily_quota=100)
+    user_id = uuid4()
+    seen: list[int] = []
+
+    class _Session:
+        def __enter__(self) -> "_Session":
+            return self
+
+        def __exit__(self, *exc_info: object) -> None:
+            return None
+
+        def exec(self, statement):  # noqa: ANN001, ANN202
+            if statement.is_insert:
+                seen.append(tracker.used_today(user_id))
+                return None
+            raise RuntimeError("refresh failed")
+
+        def commit(self) -> None:
+            return None
+
+    monkeypatch.setattr(db, "SessionLocal", _Session)
+    copy_context().run(_record_for, tracker, user_id)
+
+    # 写入成功但刷新合计失败：增量仍计入，直到下一次成功刷新
+    with pytest.raises(RuntimeError):
+        tracker.flush()
+    assert seen == [85]
+    assert tracker.used_today(user_id) == 85
+    assert not tracker._pending
+
+
+def _record_for(tracker: UsageTracker, user_id) -> None:  # noqa: ANN001
+    bind_run_usage(RunUsage(user_id))
+    tracker.record("fake-flash", 50, 35)
+
+
+def test_anonymous_runs_are_limited_per_client():
+    copy_context().run(_anonymous_quota_per_client)
+
+
+def _anonymous_quota_per_client() -> None:
+    tracker = UsageTracker(daily_quota=None, anonymous_quota=50)
+    bind_run_usage(RunUsage(None, "203.0.113.7"))
+
+    tracker.record("fake-flash", 30, 10)
+    tracker.check_quota(None, "203.0.113.7")
+    tracker.record("fake-flash", 5, 5)
+    with pytest.raises(APIException) as exc_info:
+        tracker.check_quota(None, "203.0.113.7")
+    assert exc_info.value.error_type == APIErrorType.QUOTA_EXCEEDED
+    # 其他客户端与登录用户各自计数
+    tracker.check_quota(None, "198.51.100.1")
+    tracker.check_quota(uuid4())
+    assert tracker.used_today(ANONYMOUS_USER_ID) == 50
+
+
+async def test_streaming_usage_chunk_is_recorded_for_the_run():
+    resilience.reset_state()
+    run = RunUsage(None)
+    bind_run_usage(run)
+    before = usage_tracker.used_today(ANONYMOUS_USER_ID)
+
+    config = FakeLLMConfig(ttft_ms=0, tokens_per_second=0, response_tokens=7)
+    with serve_in_thread(config) as server:
+        client = ResilientChatClient(
+            model_id="fake-flash",
+            api_key="fake",
+            base_url=server.base_url,
+            policy=ResiliencePolicy(hedge_enabled=False),
+        )
+        [u async for u in client.get_streaming_response("hi")]
+
+    assert run.totals.requests == 1
+    assert run.totals.completion_tokens == 7
+    assert run.totals.prompt_tokens > 0
+    assert (
+        usage_tracker.used_today(ANONYMOUS_USER_ID) == before + run.totals.total_tokens
+    )
@@ -0,0 +1,93 @@
+import json
+import os
+import time
+
+from app.core.log_index import LogIndex
+from app.core.logger import compress_log
+
+
+def _line(
+    ts: float, req_id: str, path: str | None = None, status: int = 200, ms: float = 1.0
+) -> str:
+    extra: dict = {"req_id": req_id}
+    message = "working"
+    if path is not None:
+        extra |= {
+            "req": {"path": path},
+            "resp": {"status_code": status},
+            "duration_ms": ms,
+        }
+        message = f"GET {path}: {status} ({ms:.2f}ms)"
+    record = {
+        "extra": extra,
+        "level": {"name": "INFO", "no": 20},
+        "message": message,
+        "time": {"timestamp": ts},
+    }
+    return json.dumps({"text": f"{message}\n", "record": record}) + "\n"
+
+
+def _write_requests(path, tag: str, count: int, start: float) -> None:  # noqa: ANN001
+    with open(path, "a") as out:
+        for i in range(count):
+            out.write(_line(start + i, f"{tag}-{i}"))
+            out.write(
+                _line(
+                    start + i,
+                    f"{tag}-{i}",
+                    path="/api/v1/auth/access-token" if i % 2 else "/api/v1/user/me",
+                    status=500 if i % 10 == 0 else 200,
+                    ms=float(i * 10),
+                )
+            )
+
+
+def test_index_queries_active_file_and_blocked_gzip_archives(tmp_path):
+    now = time.time()
+    archive = tmp_path / "testing.2026-10-19_00-00-00_000000.log"
+    _write_requests(archive, "old", 200, now - 7200)
+    compress_log(str(archive))
+    _write_requests(tmp_path / "testing.log", "new", 100, now - 600)
+
+    with LogIndex(tmp_path, "testing") as index:
+        assert index.update() == 600
+        assert index.update() == 0
+
+        lines = index.by_request("old-42")
+        req_ids = [json.loads(line)["record"]["extra"]["req_id"] for line in lines]
+        assert req_ids == ["old-42"] * 2
+
+        slow_auth = index.requests(
+            path="/auth",
+            api_prefix="/api/v1",
+            min_ms=500,
+            since=int(now - 3600),
+            limit=None,
+        )
+        # 只有活动文件在最近一小时内：奇数 i 且 i * 10 >= 500
+        assert len(slow_auth) == len([i for i in range(50, 100) if i % 2])
+        assert len(index.requests(status=(500, 599), limit=None)) == 30
+
+
+def test_index_follows_appends_and_rotation(tmp_path):
+    now = time.time()
+    active = tmp_path / "testing.log"
+    _write_requests(active, "a", 5, now)
+    with open(active, "a") as out:
+        out.write('{"partial')
+
+    with LogIndex(tmp_path, "testing") as index:
+        assert index.update() == 10
+        # 批量请求的子请求 id 由父请求派生
+        with open(active, "a") as out:
+            out.write('": true}\n' + _line(now, "a-1-0") + _line(now, "a-10"))
+        assert index.update() == 2
+        assert len(index.by_request("a-1")) == 3
+
+        rotated = tmp_path / "testing.2026-10-19_00-00-00_000000.log"
+        os.rename(active, rotated)
+        compress_log(str(rotated))
+        _write_requests(active, "b", 1, now)
+        index.update()
+        assert len(index.by_request("a-1")) == 3
+        assert len(index.by_request("b-0")) == 2
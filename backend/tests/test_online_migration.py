@@ -0,0 +1,62 @@
+from uuid import UUID, uuid4, uuid7  # type: ignore[attr-defined]
+
+import pytest
+from sqlalchemy import text
+
+from app.core.db import engine
+from app.core.online_migration import backfill, plan_phase
+from app.core.purge import Checkpoint
+
+
+def test_plan_phase_stops_before_later_phases():
+    pending = [("a", "expand"), ("b", "backfill"), ("c", "expand"), ("d", "contract")]
+
+    assert plan_phase(pending, "expand") == "a"
+    assert plan_phase(pending, "backfill") == "c"
+    assert plan_phase(pending, "contract") == "d"
+    assert plan_phase([("x", "contract")], "expand") is None
+
+
+@pytest.fixture
+def scratch_table():
+    table = f"test_backfill_{uuid4().hex[:8]}"
+    ids = sorted(uuid7().bytes for _ in range(25))
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            f"CREATE TABLE `{table}` (id BINARY(16) NOT NULL PRIMARY KEY, "
+            "n INT NOT NULL, doubled INT NULL)"
+        )
+        conn.execute(
+            text(f"INSERT INTO `{table}` (id, n) VALUES (:id, :n)"),
+            [{"id": row_id, "n": i} for i, row_id in enumerate(ids)],
+        )
+    yield table, ids
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DROP TABLE `{table}`")
+
+
+def test_backfill_runs_in_chunks_and_resumes_from_checkpoint(scratch_table, tmp_path):  # noqa: ANN001
+    table, ids = scratch_table
+    checkpoint = Checkpoint(tmp_path / "checkpoint.json")
+    # 模拟中断：前 10 行已处理
+    checkpoint.set("doubled", UUID(bytes=ids[9]))
+
+    with engine.connect() as conn:
+        stats = backfill(
+            table,
+            "doubled = n * :factor",
+            params={"factor": 2},
+            name="doubled",
+            batch_size=4,
+            throttle=0,
+            checkpoint=checkpoint,
+            connection=conn.execution_options(isolation_level="AUTOCOMMIT"),
+        )
+
+    assert stats.rows == 15
+    assert stats.chunks == 4
+    assert checkpoint.get("doubled") is None
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT n, doubled FROM `{table}` ORDER BY id")).all()
+    assert [doubled for _, doubled in rows[:10]] == [None] * 10
+    assert all(doubled == n * 2 for n, doubled in rows[10:])
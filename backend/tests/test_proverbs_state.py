@@ -0,0 +1,46 @@
+import pytest
+from ag_ui.core import StateDeltaEvent, StateSnapshotEvent
+
+from app.llm import state as proverbs_state
+from app.llm.agent import STATE_SCHEMA
+from app.llm.state import SharedState, StateReducerError
+
+
+def test_add_to_large_list_emits_constant_size_delta():
+    shared = SharedState.from_input(
+        {"proverbs": [f"p{i}" for i in range(500)]}, STATE_SCHEMA
+    )
+    shared.pending.extend(proverbs_state.add_proverb(shared.proverbs, "new"))
+
+    event = shared.flush_event()
+    assert isinstance(event, StateDeltaEvent)
+    assert event.delta == [{"op": "add", "path": "/proverbs/-", "value": "new"}]
+    assert shared.proverbs[-1] == "new"
+    assert shared.flush_event() is None
+
+
+def test_reducer_actions_keep_canonical_state_in_sync():
+    proverbs = ["a", "b", "c"]
+
+    assert proverbs_state.move_proverb(proverbs, 0, 2) == [
+        {"op": "move", "from": "/proverbs/0", "path": "/proverbs/2"}
+    ]
+    assert proverbs == ["b", "c", "a"]
+
+    proverbs_state.replace_proverb(proverbs, 1, "x")
+    proverbs_state.remove_proverb(proverbs, 0)
+    proverbs_state.add_proverb(proverbs, "y", 0)
+    assert proverbs == ["y", "x", "a"]
+
+    with pytest.raises(StateReducerError):
+        proverbs_state.remove_proverb(proverbs, 3)
+
+
+def test_missing_client_state_falls_back_to_snapshot():
+    shared = SharedState.from_input(None, STATE_SCHEMA)
+    shared.pending.extend(proverbs_state.add_proverb(shared.proverbs, "a"))
+
+    event = shared.flush_event()
+    assert isinstance(event, StateSnapshotEvent)
+    assert event.snapshot == {"proverbs": ["a"]}
+    assert shared.flush_event() is None
@@ -0,0 +1,59 @@
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import event, update
+from sqlmodel import Session, col
+
+from app.api.routes.user.models import User
+from app.api.routes.user.schemas import UserCreate
+from app.api.routes.user.service import create_user
+from app.core.db import ReadOnlySessionError, ReadSessionLocal, read_engine
+
+
+def test_read_session_reads_in_one_round_trip(db_session: Session):
+    user = create_user(
+        session=db_session,
+        user_create=UserCreate(
+            email=f"read-{uuid4().hex}@example.com", password="test-password-123"
+        ),
+    )
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, *args):  # noqa: ANN001, ARG001
+        statements.append(statement)
+
+    with ReadSessionLocal() as warm:  # 建立连接时的会话设置不计入
+        warm.get(User, user.id)
+    event.listen(read_engine, "before_cursor_execute", record)
+    try:
+        with ReadSessionLocal() as session:
+            loaded = session.get(User, user.id)
+            assert loaded is not None
+            assert loaded.email == user.email
+    finally:
+        event.remove(read_engine, "before_cursor_execute", record)
+
+    # 没有 BEGIN / ROLLBACK，只有一条带软删除过滤的 SELECT
+    assert len(statements) == 1
+    assert "deleted_at" in statements[0]
+
+
+def test_read_session_rejects_writes(db_session: Session):
+    user = create_user(
+        session=db_session,
+        user_create=UserCreate(
+            email=f"read-{uuid4().hex}@example.com", password="test-password-123"
+        ),
+    )
+    with ReadSessionLocal() as session:
+        loaded = session.get(User, user.id)
+        assert loaded is not None
+        loaded.full_name = "changed"
+        with pytest.raises(ReadOnlySessionError):
+            session.commit()
+        session.rollback()
+
+        with pytest.raises(ReadOnlySessionError):
+            session.exec(
+                update(User).where(col(User.id) == user.id).values(full_name="x")
+            )
@@ -0,0 +1,84 @@
+import multiprocessing
+import time
+from uuid import uuid4
+
+import pytest
+
+from app.core.shared_cache import SharedCache, remove_segment
+
+
+@pytest.fixture
+def shared_cache():
+    cache = SharedCache(
+        f"test-shared-cache-{uuid4().hex[:8]}", slots=64, value_bytes=64
+    )
+    yield cache
+    cache.unlink()
+    cache.close()
+
+
+def _increment(name: str, times: int) -> None:
+    cache = SharedCache(name, slots=64, value_bytes=64)
+    for _ in range(times):
+        cache.incr(b"hits")
+    cache.set(b"worker", b"done")
+    cache.close()
+
+
+def test_set_get_delete_and_expiry(shared_cache):
+    shared_cache.set(b"user:1", b"alice")
+    shared_cache.set(b"user:1", b"alice v2")
+    assert shared_cache.get(b"user:1") == b"alice v2"
+
+    shared_cache.delete(b"user:1")
+    assert shared_cache.get(b"user:1") is None
+
+    shared_cache.set(b"short", b"lived", ttl=0.05)
+    time.sleep(0.1)
+    assert shared_cache.get(b"short") is None
+
+    with pytest.raises(ValueError):
+        shared_cache.set(b"too-big", b"x" * 65)
+
+
+def test_full_window_evicts_instead_of_failing(shared_cache):
+    for i in range(200):
+        shared_cache.set(f"key-{i}".encode(), b"v", ttl=60)
+    assert shared_cache.get(b"key-199") == b"v"
+    assert (
+        sum(shared_cache.get(f"key-{i}".encode()) is not None for i in range(200)) <= 64
+    )
+
+
+def test_writes_from_other_processes_are_visible(shared_cache):
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=_increment, args=(shared_cache.name, 500))
+        for _ in range(3)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    # 各进程的 incr 在同一个键上互斥，不丢失更新
+    assert shared_cache.incr(b"hits", 0) == 1500
+    assert shared_cache.get(b"worker") == b"done"
+
+
+def test_attaching_with_different_layout_is_rejected(shared_cache):
+    with pytest.raises(RuntimeError):
+        SharedCache(shared_cache.name, slots=128, value_bytes=64)
+
+
+def test_get_int_and_remove_segment():
+    name = f"test-shared-cache-{uuid4().hex[:8]}"
+    cache = SharedCache(name, slots=64, value_bytes=64)
+    assert cache.get_int(b"tokens") == 0
+    cache.incr(b"tokens", 120)
+    assert cache.get_int(b"tokens") == 120
+    cache.close()
+
+    # 启动器在 worker 全部退出后清理，重复清理不报错
+    assert remove_segment(name) is True
+    assert remove_segment(name) is False
@@ -0,0 +1,66 @@
+import json
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+from app.api.routes.user.models import User
+from app.api.routes.user.schemas import UserCreate
+from app.api.routes.user.service import create_user
+from app.core.purge import Checkpoint, purge_soft_deleted
+
+
+def _user(db_session, deleted_at: datetime | None = None) -> User:  # noqa: ANN001
+    user = create_user(
+        session=db_session,
+        user_create=UserCreate(
+            email=f"purge-{uuid4().hex}@example.com", password="test-password-123"
+        ),
+    )
+    if deleted_at is not None:
+        user.deleted_at = deleted_at
+        db_session.add(user)
+        db_session.commit()
+    return user
+
+
+def test_purge_removes_only_expired_rows_and_archives_them(db_session, tmp_path):  # noqa: ANN001
+    now = datetime.now(UTC)
+    expired = _user(db_session, now - timedelta(days=60))
+    recent = _user(db_session, now - timedelta(days=1))
+    live = _user(db_session)
+    ids = {expired.id, recent.id, live.id}
+    checkpoint_path = tmp_path / "checkpoint.json"
+
+    stats = purge_soft_deleted(
+        retention=timedelta(days=30),
+        batch_size=2,
+        throttle=0,
+        checkpoint=Checkpoint(checkpoint_path),
+        archive_dir=tmp_path,
+        tables=["user"],
+    )
+
+    assert stats is not None
+    assert stats.tables["user"].done
+    assert stats.tables["user"].purged >= 1
+    # 完成后清除检查点，下一轮从头扫描
+    assert json.loads(checkpoint_path.read_text()) == {}
+
+    db_session.expire_all()
+    remaining = {
+        user_id
+        for user_id in ids
+        if db_session.get(User, user_id, execution_options={"include_deleted": True})
+    }
+    assert remaining == {recent.id, live.id}
+    archived = [
+        json.loads(line) for line in (tmp_path / "user.ndjson").read_text().splitlines()
+    ]
+    assert str(expired.id) in {row["id"] for row in archived}
+
+
+def test_checkpoint_resumes_after_last_processed_id(tmp_path):  # noqa: ANN001
+    path = tmp_path / "checkpoint.json"
+    last_id = uuid4()
+    Checkpoint(path).set("user", last_id)
+    assert Checkpoint(path).get("user") == last_id
+    assert Checkpoint(path).get("agent_thread") is None
@@ -0,0 +1,103 @@
+from uuid import uuid4, uuid7  # type: ignore[attr-defined]
+
+import pytest
+
+from app.llm.thread_store import (
+    ThreadNotFoundError,
+    ThreadStore,
+    compact_messages,
+    merge_messages,
+    rebase_messages,
+)
+
+
+def _msg(id_: str, role: str = "user") -> dict[str, str]:
+    return {"id": id_, "role": role, "content": id_}
+
+
+def test_merge_appends_delta_and_accepts_full_resend():
+    stored = [_msg("u1"), _msg("a1", "assistant")]
+
+    # 只发送新消息的客户端
+    assert merge_messages(stored, [_msg("u2")]) == [*stored, _msg("u2")]
+    # 仍然发送完整历史的客户端
+    assert merge_messages(stored, [*stored, _msg("u2")]) == [*stored, _msg("u2")]
+    # 重新生成：从已知消息处截断，客户端的尾部覆盖服务端
+    assert merge_messages(stored, [_msg("u1"), _msg("u1b")]) == [
+        _msg("u1"),
+        _msg("u1b"),
+    ]
+
+
+def test_merge_after_compaction_does_not_duplicate_history():
+    full = [_msg("u1"), _msg("a1", "assistant"), _msg("u2"), _msg("a2", "assistant")]
+    compacted = full[2:]
+
+    assert merge_messages(compacted, [*full, _msg("u3")]) == [*compacted, _msg("u3")]
+
+
+def test_rebase_keeps_both_runs_messages():
+    base = [_msg("u1"), _msg("a1", "assistant")]
+    current = base[1:] + [_msg("u2"), _msg("a2", "assistant")]  # 另一次运行 + 压缩
+    ours = base + [_msg("u3"), _msg("a3", "assistant")]
+
+    assert rebase_messages(current, ours) == current + ours[2:]
+    assert rebase_messages(current, current) == current
+
+
+def test_compaction_cuts_at_user_turn():
+    messages = [
+        _msg("u1"),
+        _msg("a1", "assistant"),
+        _msg("t1", "tool"),
+        _msg("a2", "assistant"),
+        _msg("u2"),
+        _msg("a3", "assistant"),
+    ]
+
+    # 保留 3 条会从工具结果开始，应顺延到下一条用户消息
+    assert compact_messages(messages, 3) == messages[4:]
+    assert compact_messages(messages, 10) == messages
+
+    with pytest.raises(ValueError):
+        ThreadStore(maxsize=1, compact_threshold=10, keep_messages=10)
+
+
+async def test_threads_are_scoped_to_their_owner():
+    store = ThreadStore(maxsize=4, compact_threshold=10, keep_messages=5)
+    owner, other = uuid7(), uuid7()
+    thread_id = f"test-{uuid4()}"
+
+    await store.save(thread_id, owner, [_msg("u1")], None)
+    record = await store.load(thread_id, owner)
+    assert record is not None
+    assert record.messages == [_msg("u1")]
+    assert await store.load(f"test-{uuid4()}", owner) is None
+
+    # 其他用户既不能读取也不能覆盖
+    with pytest.raises(ThreadNotFoundError):
+        await store.load(thread_id, other)
+    with pytest.raises(ThreadNotFoundError):
+        await store.save(thread_id, other, [_msg("x")], None)
+    record = await store.load(thread_id, owner)
+    assert record is not None
+    assert record.messages == [_msg("u1")]
+
+
+async def test_concurrent_saves_do_not_drop_messages():
+    store = ThreadStore(maxsize=4, compact_threshold=10, keep_messages=5)
+    owner = uuid7()
+    thread_id = f"test-{uuid4()}"
+    base = await store.save(thread_id, owner, [_msg("u1")], None)
+
+    # 两次运行都基于同一版本合并
+    await store.save(thread_id, owner, [_msg("u1"), _msg("u2")], None, version=1)
+    record = await store.save(
+        thread_id, owner, [_msg("u1"), _msg("u3")], None, version=base.version
+    )
+
+    assert record.version == 3
+    assert [m["id"] for m in record.messages] == ["u1", "u2", "u3"]
+    loaded = await store.load(thread_id, owner)
+    assert loaded is not None
+    assert loaded.messages == record.messages
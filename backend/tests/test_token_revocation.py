@@ -0,0 +1,57 @@
+from http import HTTPStatus
+from uuid import uuid4
+
+from app.api.routes.user.schemas import UserCreate
+from app.api.routes.user.service import create_user
+from app.core.bloom import BloomFilter
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=2_000, error_rate=0.01)
+    members = [uuid4().hex for _ in range(2_000)]
+    for member in members:
+        bloom.add(member)
+
+    assert all(member in bloom for member in members)
+    false_positives = sum(uuid4().hex in bloom for _ in range(10_000))
+    assert false_positives < 300
+    assert not bloom.saturated
+
+
+async def _login(client, email: str, password: str) -> dict[str, str]:  # noqa: ANN001
+    resp = await client.post(
+        "/api/v1/auth/access-token", data={"username": email, "password": password}
+    )
+    assert resp.status_code == HTTPStatus.OK
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+async def test_logout_and_revoke_all(client, db_session):  # noqa: ANN001
+    email, password = f"revoke-{uuid4().hex}@example.com", "test-password-123"
+    create_user(
+        session=db_session, user_create=UserCreate(email=email, password=password)
+    )
+    first = await _login(client, email, password)
+    second = await _login(client, email, password)
+
+    # 单个令牌吊销后立即失效，同一用户的其他令牌不受影响
+    assert (await client.post("/api/v1/auth/logout", headers=first)).status_code == (
+        HTTPStatus.NO_CONTENT
+    )
+    assert (await client.get("/api/v1/user/me", headers=first)).status_code == (
+        HTTPStatus.FORBIDDEN
+    )
+    assert (await client.get("/api/v1/user/me", headers=second)).status_code == (
+        HTTPStatus.OK
+    )
+
+    # 全部吊销只影响此前签发的令牌
+    resp = await client.post("/api/v1/auth/revoke-all", headers=second)
+    assert resp.status_code == HTTPStatus.NO_CONTENT
+    assert (await client.get("/api/v1/user/me", headers=second)).status_code == (
+        HTTPStatus.FORBIDDEN
+    )
+    third = await _login(client, email, password)
+    assert (await client.get("/api/v1/user/me", headers=third)).status_code == (
+        HTTPStatus.OK
+    )
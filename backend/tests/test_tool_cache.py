@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+import pytest
+
+from app.llm.tools import ToolResultCache, cached_ai_function
+
+
+async def test_cached_tool_runs_concurrently_and_memoizes():
+    calls: list[str] = []
+
+    @cached_ai_function(ttl=60, key=lambda city: city.lower(), name="slow_lookup")
+    def slow_lookup(city: str) -> str:
+        calls.append(city)
+        time.sleep(0.2)
+        return f"sunny in {city}"
+
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        slow_lookup.invoke(city="Paris"),
+        slow_lookup.invoke(city="Tokyo"),
+        slow_lookup.invoke(city="paris"),
+    )
+    elapsed = time.perf_counter() - start
+
+    # 同步工具被放到线程中执行，两个城市并行；同 key 的并发请求只执行一次
+    assert elapsed < 0.35
+    assert sorted(calls) == ["Paris", "Tokyo"]
+    assert results[0] == results[2]
+
+    await slow_lookup.invoke(city="PARIS")
+    assert len(calls) == 2
+
+
+async def test_cache_evicts_expired_and_least_recent_entries():
+    cache = ToolResultCache(name="t", maxsize=2, ttl=60)
+
+    async def load(value: int):
+        return value
+
+    for i in range(3):
+        await cache.get_or_load(i, lambda i=i: load(i))
+    assert len(cache) == 2
+
+    expired = ToolResultCache(name="t", maxsize=2, ttl=0)
+    await expired.get_or_load("k", lambda: load(1))
+    assert await expired.get_or_load("k", lambda: load(2)) == 2
+
+
+def test_approval_tools_cannot_be_cached():
+    with pytest.raises(ValueError):
+        cached_ai_function(ttl=60, approval_mode="always_require")
@@ -0,0 +1,80 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from sqlmodel import select
+
+from app.api.routes.user.bulk import BulkRowError, create_users_bulk, read_user_rows
+from app.api.routes.user.models import User
+from app.api.routes.user.service import verify_password
+
+
+def test_read_user_rows_reports_malformed_lines():
+    ndjson = io.StringIO('{"email": "a@example.com"}\n\nnot json\n[1]\n')
+    rows = list(read_user_rows(ndjson, "ndjson"))
+    assert rows[0] == (1, {"email": "a@example.com"})
+    assert [(n, type(r)) for n, r in rows[1:]] == [(3, BulkRowError), (4, BulkRowError)]
+
+    csv_rows = list(
+        read_user_rows(
+            io.StringIO("email,password,full_name\nb@example.com,pw,\n"), "csv"
+        )
+    )
+    assert csv_rows == [(2, {"email": "b@example.com", "password": "pw"})]
+
+
+def test_bulk_insert_then_upsert(db_session):  # noqa: ANN001
+    prefix = uuid4().hex
+    emails = [f"bulk-{prefix}-{i}@example.com" for i in range(5)]
+    lines = [f"{email},password-{i},User {i}" for i, email in enumerate(emails)]
+    source = "\n".join(
+        [
+            "email,password,full_name",
+            *lines,
+            f"{emails[0]},password-dup,Duplicate",
+            "not-an-email,password-x,Invalid",
+        ]
+    )
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        result = create_users_bulk(
+            session=db_session,
+            rows=read_user_rows(io.StringIO(source), "csv"),
+            executor=executor,
+            workers=2,
+            batch_size=3,
+        )
+        assert result.written == 5
+        assert sorted(error.row for error in result.errors) == [7, 8]
+
+        # 已存在的邮箱在插入模式下逐行报错，upsert 模式下更新
+        rerun = create_users_bulk(
+            session=db_session,
+            rows=read_user_rows(io.StringIO(source), "csv"),
+            executor=executor,
+            workers=2,
+            batch_size=3,
+        )
+        assert rerun.written == 0
+        assert len(rerun.errors) == 7
+
+        upserted = create_users_bulk(
+            session=db_session,
+            rows=read_user_rows(
+                io.StringIO(
+                    f"email,password,full_name\n{emails[1]},new-password,Renamed\n"
+                ),
+                "csv",
+            ),
+            executor=executor,
+            workers=2,
+            upsert=True,
+        )
+        assert upserted.written == 1
+
+    db_session.expire_all()
+    users = db_session.exec(select(User).where(User.email.in_(emails))).all()  # type: ignore[attr-defined]
+    assert len(users) == 5
+    renamed = next(user for user in users if user.email == emails[1])
+    assert renamed.full_name == "Renamed"
+    assert verify_password("new-password", renamed.hashed_password)
@@ -0,0 +1,57 @@
+import csv
+import gzip
+import io
+import json
+from datetime import UTC, datetime, timedelta
+from http import HTTPStatus
+from uuid import UUID, uuid4
+
+from app.api.routes.auth.service import create_access_token
+from app.api.routes.user.export import export_users
+from app.api.routes.user.schemas import UserCreate
+from app.api.routes.user.service import create_user
+
+
+async def test_export_streams_ndjson_and_respects_soft_delete(client, db_session):  # noqa: ANN001
+    admin = create_user(
+        session=db_session,
+        user_create=UserCreate(
+            email=f"admin-{uuid4().hex}@example.com",
+            password="test-password-123",
+            is_superuser=True,
+        ),
+    )
+    deleted = create_user(
+        session=db_session,
+        user_create=UserCreate(
+            email=f"gone-{uuid4().hex}@example.com", password="test-password-123"
+        ),
+    )
+    deleted.deleted_at = datetime.now(UTC)
+    db_session.add(deleted)
+    db_session.commit()
+    headers = {
+        "Authorization": f"Bearer {create_access_token(admin.id, timedelta(minutes=5))}"
+    }
+
+    resp = await client.get(
+        "/api/v1/user/export", headers=headers, params={"gzip": True}
+    )
+    assert resp.status_code == HTTPStatus.OK
+    assert resp.headers["content-type"] == "application/gzip"
+    rows = [json.loads(line) for line in gzip.decompress(resp.content).splitlines()]
+    ids = {row["id"] for row in rows}
+    assert str(admin.id) in ids
+    assert str(deleted.id) not in ids
+    assert "hashed_password" not in rows[0]
+
+    # 小分段也能完整、有序地覆盖全部行
+    chunks = [
+        chunk
+        async for chunk in export_users(fmt="csv", include_deleted=True, chunk_size=2)
+    ]
+    records = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    exported = [record["id"] for record in records]
+    assert str(deleted.id) in exported
+    assert exported == sorted(exported, key=lambda value: UUID(value).bytes)
+    assert len(exported) == len(set(exported))
@@ -0,0 +1,73 @@
+from datetime import timedelta
+from http import HTTPStatus
+from uuid import uuid4
+
+from sqlmodel import Session
+
+from app.api.routes.auth.service import create_access_token
+from app.api.routes.user.schemas import UserCreate
+from app.api.routes.user.service import create_user
+
+
+def _create_users(session: Session, prefix: str, count: int) -> list[str]:
+    emails = [f"{prefix}-{i}@example.com" for i in range(count)]
+    for email in emails:
+        create_user(
+            session=session,
+            user_create=UserCreate(email=email, password="test-password-123"),
+        )
+    return emails
+
+
+async def test_superuser_pages_through_users_with_cursor(client, db_session):  # noqa: ANN001
+    admin = create_user(
+        session=db_session,
+        user_create=UserCreate(
+            email=f"admin-{uuid4().hex}@example.com",
+            password="test-password-123",
+            is_superuser=True,
+        ),
+    )
+    headers = {
+        "Authorization": f"Bearer {create_access_token(admin.id, timedelta(minutes=5))}"
+    }
+    prefix = f"list-{uuid4().hex[:12]}"
+    emails = _create_users(db_session, prefix, 5)
+
+    seen: list[str] = []
+    cursor = None
+    while True:
+        params = {"email_prefix": prefix, "limit": 2, "exact_count": True}
+        if cursor:
+            params["cursor"] = cursor
+        resp = await client.get("/api/v1/user/", headers=headers, params=params)
+        assert resp.status_code == HTTPStatus.OK
+        page = resp.json()
+        assert page["count"] == 5
+        assert page["count_exact"] is True
+        seen += [user["email"] for user in page["data"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # 默认按 uuid7 主键倒序，即最新创建的在前
+    assert seen == list(reversed(emails))
+
+    bad = await client.get("/api/v1/user/", headers=headers, params={"cursor": "nope"})
+    assert bad.status_code == HTTPStatus.BAD_REQUEST
+
+
+async def test_user_listing_requires_superuser(client, db_session):  # noqa: ANN001
+    user = create_user(
+        session=db_session,
+        user_create=UserCreate(
+            email=f"plain-{uuid4().hex}@example.com", password="test-password-123"
+        ),
+    )
+    resp = await client.get(
+        "/api/v1/user/",
+        headers={
+            "Authorization": f"Bearer {create_access_token(user.id, timedelta(minutes=5))}"
+        },
+    )
+    assert resp.status_code == HTTPStatus.FORBIDDEN
@@ -0,0 +1,36 @@
+from uuid import uuid4
+
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.api.routes.user.schemas import UserCreate, UserPublic, UserUpdate
+from app.api.routes.user.service import create_user, update_user
+from app.core.db import engine
+
+
+def test_user_writes_do_not_reload_after_commit(db_session: Session):
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, *args):  # noqa: ANN001, ARG001
+        statements.append(statement.split(None, 1)[0].upper())
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        user = create_user(
+            session=db_session,
+            user_create=UserCreate(
+                email=f"writes-{uuid4().hex}@example.com", password="test-password-123"
+            ),
+        )
+        created_at = user.created_at
+        user = update_user(
+            session=db_session, db_user=user, user_in=UserUpdate(full_name="Renamed")
+        )
+        public = UserPublic.model_validate(user)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    # 创建一条 INSERT；更新一条 UPDATE 加一条当前用户缓存的失效记录；提交后访问属性不再 SELECT
+    assert statements == ["INSERT", "UPDATE", "INSERT"]
+    assert public.full_name == "Renamed"
+    assert user.updated_at >= created_at